@@ -0,0 +1 @@
+# オフライン計測用スクリプト群（python -m benchmarks.<name> で実行）
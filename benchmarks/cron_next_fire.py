@@ -0,0 +1,57 @@
+import random
+import time
+
+from utils.cron import _compile, compile_expression
+
+# ==============================
+# 次回発火時刻の一括計算
+# ==============================
+# 10k ギルド × 10 件のスケジュールについて、コンパイル（キャッシュ込み）と
+# next_after の計算コストを測る。
+# 使用例: python -m benchmarks.cron_next_fire
+
+GUILDS = 10_000
+PER_GUILD = 10
+EXPRESSIONS = (
+    "daily 09:00 JST",
+    "daily 21:30",
+    "weekly mon 09:00",
+    "weekly 金 22:00 JST",
+    "monthly 1 00:00",
+    "monthly 31 12:00",
+    "interval 3 08:00",
+    "interval 7",
+    "30 9 * * 1-5",
+    "*/15 * * * *",
+)
+TIMEZONES = (None, "Asia/Tokyo", "UTC", "America/New_York")
+
+
+def main():
+    rng = random.Random(0)
+    population = [
+        (rng.choice(EXPRESSIONS), rng.choice(TIMEZONES))
+        for _ in range(GUILDS * PER_GUILD)
+    ]
+    now = time.time()
+
+    _compile.cache_clear()
+    start = time.perf_counter()
+    compiled = [compile_expression(expr, tz) for expr, tz in population]
+    compile_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    fires = [c.next_after(now, now - 86400) for c in compiled]
+    next_elapsed = time.perf_counter() - start
+
+    n = len(population)
+    info = _compile.cache_info()
+    print(f"schedules           : {n:,}")
+    print(f"distinct compiled   : {info.currsize} (hits={info.hits:,}, misses={info.misses})")
+    print(f"compile (cached)    : {compile_elapsed:.3f}s total, {compile_elapsed / n * 1e6:.2f} µs/schedule")
+    print(f"next_after          : {next_elapsed:.3f}s total, {next_elapsed / n * 1e6:.2f} µs/schedule")
+    print(f"unschedulable       : {sum(f is None for f in fires)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+import argparse
+import asyncio
+import csv
+import gzip
+import io
+import json
+import random
+import time
+import tracemalloc
+
+from utils.export import write_export
+from utils.models import RSEntry
+
+# ==============================
+# 100k行エクスポート中のイベントループ遅延
+# ==============================
+# inline : イベントループ上で全行を1つの文字列に組み立てる（素朴な実装）
+# stream : ジェネレーター → SpooledTemporaryFile への書き出しを executor で行う（/rs-export, /ws-export）
+# 書き出しと並行して10msごとに起きるタスクを走らせ、起床の遅れ（＝その間に処理できないインタラクション）を測る。
+# 併せて、書き出しで増えたメモリのピークと、出力が元の行に戻せることを確かめる。
+# 使用例: python -m benchmarks.export_stream --rows 100000 --gzip
+
+FIELDS = ("rank", "user_id", "name", "level", "points", "team")
+TICK = 0.01
+
+
+def make_entries(n, seed=0):
+    rng = random.Random(seed)
+    entries = {2 * 10**17 + i: RSEntry(f"member{i}", rng.randint(1, 5), rng.randrange(600_000)) for i in range(n)}
+    return sorted(entries.items(), key=lambda x: x[1].points, reverse=True)
+
+
+def rows(ranked):
+    for rank, (user_id, entry) in enumerate(ranked, 1):
+        yield {"rank": rank, "user_id": user_id, "name": entry.name,
+               "level": entry.level, "points": entry.points, "team": f"RSチーム{rank % 8 + 1}"}
+
+
+def export_inline(ranked, fmt, compress):
+    buffer = io.StringIO()
+    if fmt == "csv":
+        writer = csv.DictWriter(buffer, fieldnames=FIELDS)
+        writer.writeheader()
+        writer.writerows(rows(ranked))
+    else:
+        buffer.write("".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows(ranked)))
+    payload = buffer.getvalue().encode("utf-8")
+    return gzip.compress(payload) if compress else payload
+
+
+async def watch(stop, lags):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(TICK)
+        lags.append(time.perf_counter() - start - TICK)
+
+
+async def export(mode, ranked, fmt, compress):
+    if mode == "inline":
+        payload = export_inline(ranked, fmt, compress)
+        return payload, len(payload)
+    fp, _, size = await asyncio.get_running_loop().run_in_executor(
+        None, write_export, rows(ranked), FIELDS, fmt, compress
+    )
+    return fp, size
+
+
+async def run(mode, ranked, fmt, compress):
+    # 1回目: 所要時間とループ遅延（tracemalloc なし）
+    stop, lags = asyncio.Event(), []
+    watcher = asyncio.create_task(watch(stop, lags))
+    await asyncio.sleep(TICK * 2)
+    start = time.perf_counter()
+    result, size = await export(mode, ranked, fmt, compress)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await watcher
+    if mode == "stream":
+        with result:
+            result = result.read()
+
+    # 2回目: 書き出し中のメモリのピーク
+    tracemalloc.start()
+    other, _ = await export(mode, ranked, fmt, compress)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    if mode == "stream":
+        other.close()
+    return result, size, elapsed, peak, max(lags, default=0.0)
+
+
+def check(payload, fmt, compress, count):
+    text = (gzip.decompress(payload) if compress else payload).decode("utf-8-sig")
+    if fmt == "csv":
+        parsed = list(csv.DictReader(io.StringIO(text)))
+    else:
+        parsed = [json.loads(line) for line in text.splitlines()]
+    return len(parsed) == count and int(parsed[0]["rank"]) == 1
+
+
+async def main_async(args):
+    ranked = make_entries(args.rows)
+    print(f"rows: {args.rows:,} / format: {args.format} / gzip: {args.gzip}")
+    for mode in ("inline", "stream"):
+        payload, size, elapsed, peak, lag = await run(mode, ranked, args.format, args.gzip)
+        ok = check(payload, args.format, args.gzip, args.rows)
+        print(
+            f"{mode:<6} : {elapsed:.2f}s | file {size / 2**20:.1f} MiB | peak +{peak / 2**20:.1f} MiB | "
+            f"max loop lag {lag * 1e3:.0f} ms | parsed back: {'ok' if ok else 'NG'}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--format", choices=("csv", "jsonl"), default="csv")
+    parser.add_argument("--gzip", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
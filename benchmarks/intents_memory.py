@@ -0,0 +1,130 @@
+import gc
+import random
+import sys
+import time
+import tracemalloc
+
+import discord
+
+from utils.members import GuildSnapshot, client_options
+
+# ==============================
+# Intentsプロファイルごとのメンバー保持メモリと起動時間（合成した大規模ギルド）
+# ==============================
+# full    : 起動時に全メンバーをチャンク取得してキャッシュし、presence も保持する（Intents.all()）
+# minimal : 起動時は何も取得しない。最初のコマンドで chunk(cache=False) 相当の Member を作り、
+#           MemberResolver のスナップショット（ロール所属と表示名だけ）に変換して Member は捨てる
+# どちらも discord.py の ConnectionState / Guild / Member を実際に使い、ゲートウェイの代わりに
+# GUILD_MEMBERS_CHUNK 相当のペイロードを流し込む。
+# 使用例: python -m benchmarks.intents_memory [メンバー数]
+
+GUILD_ID = 10**17
+ROLES = 40
+CHUNK = 1_000  # Discordのチャンク1回分
+ONLINE_RATE = 0.3
+
+
+def guild_payload(members):
+    roles = [{"id": str(GUILD_ID), "name": "@everyone", "permissions": "0", "position": 0}]
+    roles += [
+        {"id": str(GUILD_ID + i), "name": f"role{i}", "permissions": "0", "position": i}
+        for i in range(1, ROLES + 1)
+    ]
+    return {"id": str(GUILD_ID), "name": "synthetic", "member_count": members, "roles": roles}
+
+
+def member_chunks(members, seed=0):
+    rng = random.Random(seed)
+    chunk, presences = [], []
+    for i in range(members):
+        user_id = str(GUILD_ID * 10 + i)
+        chunk.append({
+            "user": {"id": user_id, "username": f"user{i}", "global_name": f"User {i}",
+                     "discriminator": "0", "avatar": None, "bot": i % 500 == 0},
+            "roles": [str(GUILD_ID + rng.randint(1, ROLES)) for _ in range(rng.randint(0, 4))],
+            "nick": f"nick{i}" if rng.random() < 0.2 else None,
+            "joined_at": "2023-01-01T00:00:00+00:00",
+            "deaf": False,
+            "mute": False,
+            "flags": 0,
+        })
+        if rng.random() < ONLINE_RATE:
+            presences.append({
+                "user": {"id": user_id},
+                "status": "online",
+                "client_status": {"desktop": "online"},
+                "activities": [{"name": "Hades' Star", "type": 0}],
+            })
+        if len(chunk) == CHUNK:
+            yield chunk, presences
+            chunk, presences = [], []
+    if chunk:
+        yield chunk, presences
+
+
+def make_guild(profile, members):
+    client = discord.Client(**client_options(profile))
+    state = client._connection
+    return discord.Guild(data=guild_payload(members), state=state), state
+
+
+def load_full(members):
+    """起動時のチャンク取得（presence付き）で全メンバーをキャッシュする。"""
+    guild, state = make_guild("full", members)
+    for chunk, presences in member_chunks(members):
+        for data in chunk:
+            guild._add_member(discord.Member(data=data, guild=guild, state=state))
+        for presence in presences:
+            member = guild.get_member(int(presence["user"]["id"]))
+            member._presence_update(presence, presence["user"])
+    return guild
+
+
+def load_minimal(members):
+    """chunk(cache=False) 相当で受け取った Member をスナップショットに変換する。"""
+    guild, state = make_guild("minimal", members)
+    received = []
+    for chunk, _ in member_chunks(members):
+        received.extend(discord.Member(data=data, guild=guild, state=state) for data in chunk)
+    return guild, GuildSnapshot.from_members(received)
+
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    obj = build()
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return obj, current, peak, elapsed
+
+
+def main():
+    members = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    full, full_bytes, full_peak, full_time = measure(lambda: load_full(members))
+    assert len(full.members) == members
+    del full
+    (guild, snapshot), minimal_bytes, minimal_peak, minimal_time = measure(lambda: load_minimal(members))
+    assert len(snapshot.member_roles) == members and not guild.members
+
+    role_id = GUILD_ID + 1
+    start = time.perf_counter()
+    ids = snapshot.members_of(role_id)
+    lookup = time.perf_counter() - start
+    start = time.perf_counter()
+    assert snapshot.members_of(role_id) is ids
+    cached = time.perf_counter() - start
+
+    mib = 1024 * 1024
+    print(f"members                    : {members:,} ({ROLES} roles, {ONLINE_RATE:.0%} online)")
+    print(f"full    retained / peak    : {full_bytes / mib:,.1f} MiB / {full_peak / mib:,.1f} MiB")
+    print(f"full    startup (chunking) : {full_time:.2f}s")
+    print(f"minimal retained / peak    : {minimal_bytes / mib:,.1f} MiB / {minimal_peak / mib:,.1f} MiB")
+    print(f"minimal startup            : 0.00s (first role lookup builds the snapshot: {minimal_time:.2f}s)")
+    print(f"role lookup from snapshot  : {len(ids):,} members in {lookup * 1e3:.2f} ms (cached: {cached * 1e6:.1f} µs)")
+
+
+if __name__ == "__main__":
+    main()
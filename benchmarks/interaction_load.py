@@ -0,0 +1,346 @@
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import random
+import subprocess
+import tempfile
+import time
+import tracemalloc
+
+import discord
+from discord.ext import commands
+
+from utils import instrument, store
+from utils.models import GuildEventConfig
+from utils.members import client_options
+
+# ==============================
+# イベントCogのボタン負荷（オフライン）
+# ==============================
+# Interaction / Guild / Member / Role の偽物と、遅延・429を注入できる偽のREST層を使って、
+# 実際のCogのハンドラ（ルーター → on_entry_button / on_signup_button → モーダルの on_submit）を
+# 同時に動かす。シナリオごとに
+#   throughput（インタラクション/秒）、応答（ack）までの時間の p50/p95/p99/max、3秒超えの件数、
+#   RESTの呼び出し数と429の回数、インタラクションあたりの書き込みバイト数、ピークメモリ
+# を計測し、JSONに書き出す（--compare で前回の結果との差を表示する）。
+# ack は偽のREST呼び出しが完了した時点（= Discord が応答を受け取った時点）で測る。
+# 書き込みバイト数は /proc/self/io の wchar（write系システムコールに渡したバイト数）の差分。
+# 使用例: python -m benchmarks.interaction_load --members 500 --window 10 --backend sqlite
+
+ACK_DEADLINE = 3.0
+GUILD_ID = 10**17
+ENTRY_MESSAGE_ID = GUILD_ID + 1
+COMMON_ROLE_ID = GUILD_ID + 2
+RS_LEVELS = 5
+WS_LEVELS = 5
+
+
+# ---------- 偽のREST層 ----------
+class FakeREST:
+    def __init__(self, latency, jitter, rate_limit, retry_after, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit = rate_limit  # 1回の呼び出しが429になる確率
+        self.retry_after = retry_after
+        self.rng = random.Random(seed)
+        self.calls = 0
+        self.rate_limited = 0
+
+    async def call(self, route):
+        self.calls += 1
+        # discord.py と同じく、429 は retry_after だけ待ってから同じリクエストをやり直す
+        while self.rng.random() < self.rate_limit:
+            self.rate_limited += 1
+            await asyncio.sleep(self.latency + self.retry_after)
+        await asyncio.sleep(max(0.0, self.rng.gauss(self.latency, self.jitter)))
+
+
+# ---------- Discordオブジェクトの偽物 ----------
+class FakeRole:
+    def __init__(self, guild, role_id, name):
+        self.guild = guild
+        self.id = role_id
+        self.name = name
+
+
+class FakeGuild:
+    def __init__(self, rest):
+        self.id = GUILD_ID
+        self.rest = rest
+        self._roles = {COMMON_ROLE_ID: FakeRole(self, COMMON_ROLE_ID, "common")}
+        self._next_role = COMMON_ROLE_ID + 1
+
+    @property
+    def roles(self):
+        return list(self._roles.values())
+
+    def get_role(self, role_id):
+        return self._roles.get(role_id)
+
+    def get_member(self, member_id):
+        return None
+
+    async def create_role(self, name, reason=None):
+        await self.rest.call("create_role")
+        role = self._roles[self._next_role] = FakeRole(self, self._next_role, name)
+        self._next_role += 1
+        return role
+
+
+class FakeMember:
+    def __init__(self, guild, member_id):
+        self.guild = guild
+        self.id = member_id
+        self.display_name = f"member{member_id % 100000}"
+        self.bot = False
+        self.roles = []
+
+    async def add_roles(self, *roles, reason=None):
+        for role in roles:
+            await self.guild.rest.call("add_role")
+            self.roles.append(role)
+
+
+class FakeMessage:
+    def __init__(self, message_id):
+        self.id = message_id
+
+
+class FakeResponse:
+    def __init__(self, interaction):
+        self._interaction = interaction
+        self._done = False
+
+    def is_done(self):
+        return self._done
+
+    async def _ack(self, route):
+        if self._done:
+            raise discord.InteractionResponded(self._interaction)
+        self._done = True
+        await self._interaction.guild.rest.call(route)
+        self._interaction.acked = time.perf_counter()
+
+    async def send_message(self, *args, **kwargs):
+        await self._ack("interaction_callback")
+
+    async def send_modal(self, modal):
+        self._interaction.modal = modal
+        await self._ack("interaction_callback")
+
+    async def defer(self, *args, **kwargs):
+        await self._ack("interaction_callback")
+
+
+class FakeInteraction:
+    def __init__(self, guild, user, kind, custom_id=None, message=None):
+        self.id = discord.utils.time_snowflake(datetime.datetime.now(datetime.timezone.utc))
+        self.type = kind
+        self.guild = guild
+        self.guild_id = guild.id
+        self.user = user
+        self.message = message
+        self.data = {"custom_id": custom_id} if custom_id else {}
+        self.response = FakeResponse(self)
+        self.created = time.perf_counter()
+        self.acked = None
+        self.modal = None
+
+
+# ---------- シナリオ ----------
+def _bot():
+    return commands.Bot(command_prefix="/", **client_options("minimal"))
+
+
+async def _setup_rs_event(bot, guild):
+    from cogs import rs_event
+    cog = rs_event.RSEvent(bot)
+    await cog.cog_load()
+    await cog.store.reset_guild(guild.id, GuildEventConfig(common_role=COMMON_ROLE_ID, entry_messages=[ENTRY_MESSAGE_ID]))
+    return cog, "rs", RS_LEVELS
+
+
+async def _setup_ws_event(bot, guild):
+    from cogs import ws_event
+    cog = ws_event.WSEvent(bot)
+    await cog.cog_load()
+    await cog.store.reset_guild(guild.id, GuildEventConfig(common_role=COMMON_ROLE_ID, entry_messages=[ENTRY_MESSAGE_ID]))
+    return cog, "ws", WS_LEVELS
+
+
+async def _setup_rs_module(bot, guild):
+    from cogs import rs_module
+    cog = rs_module.RSSignup(bot)
+    await cog.cog_load()
+    return cog, "rs-signup", len(rs_module.RS_LABELS)
+
+
+async def _setup_ws_module(bot, guild):
+    from cogs import ws_module
+    cog = ws_module.WSSignup(bot)
+    await cog.cog_load()
+    return cog, "ws-signup", len(ws_module.WS_LABELS)
+
+
+SCENARIOS = {
+    "rs_event": _setup_rs_event,
+    "ws_event": _setup_ws_event,
+    "rs_module": _setup_rs_module,
+    "ws_module": _setup_ws_module,
+}
+
+
+def _written_bytes():
+    try:
+        with open("/proc/self/io") as f:
+            for line in f:
+                if line.startswith("wchar:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def _percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+async def run_scenario(name, args):
+    rest = FakeREST(args.latency, args.jitter, args.rate_limit, args.retry_after, seed=args.seed)
+    guild = FakeGuild(rest)
+    bot = _bot()
+    cog, event, buckets = await SCENARIOS[name](bot, guild)
+    router = bot.component_router
+    message = FakeMessage(ENTRY_MESSAGE_ID)
+    rng = random.Random(args.seed)
+    interactions = []
+    errors = 0
+
+    async def member_flow(index):
+        nonlocal errors
+        member = FakeMember(guild, GUILD_ID * 10 + index)
+        await asyncio.sleep(rng.uniform(0, args.window))
+        click = FakeInteraction(
+            guild, member, discord.InteractionType.component,
+            f"regulus:{event}:{guild.id}:{rng.randrange(buckets)}", message
+        )
+        interactions.append(click)
+        await router.on_interaction(click)
+        modal = click.modal
+        if modal is None:
+            return
+        # モーダルに入力して送信するまでの時間
+        await asyncio.sleep(rng.uniform(0, args.think))
+        for item in modal.children:
+            item._refresh_state(None, {"value": str(rng.randrange(10_000, 600_000))})
+        submit = FakeInteraction(guild, member, discord.InteractionType.modal_submit)
+        interactions.append(submit)
+        try:
+            await modal.on_submit(submit)
+        except Exception:
+            errors += 1
+
+    tracemalloc.start()
+    written = _written_bytes()
+    started = time.perf_counter()
+    await asyncio.gather(*(member_flow(i) for i in range(args.members)))
+    await cog.cog_unload()  # 書き込み遅延型ストアの残りを書き出す
+    elapsed = time.perf_counter() - started
+    written = None if written is None else _written_bytes() - written
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    acks = [i.acked - i.created for i in interactions if i.acked is not None]
+    return {
+        "interactions": len(interactions),
+        "unacked": len(interactions) - len(acks),
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_per_s": round(len(interactions) / elapsed, 1),
+        "ack_p50_ms": round(_percentile(acks, 0.50) * 1000, 1),
+        "ack_p95_ms": round(_percentile(acks, 0.95) * 1000, 1),
+        "ack_p99_ms": round(_percentile(acks, 0.99) * 1000, 1),
+        "ack_max_ms": round(max(acks) * 1000, 1),
+        "late_acks": sum(1 for a in acks if a > ACK_DEADLINE),
+        "rest_calls": rest.calls,
+        "rate_limited": rest.rate_limited,
+        "bytes_written_per_interaction": None if written is None else round(written / len(interactions)),
+        "peak_memory_kib": round(peak / 1024),
+    }
+
+
+def _commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _print_comparison(results, path):
+    with open(path, encoding="utf-8") as f:
+        previous = json.load(f)
+    print(f"\n--- compared with {path} ({previous.get('commit')}) ---")
+    for name, current in results["scenarios"].items():
+        before = previous.get("scenarios", {}).get(name)
+        if before is None:
+            continue
+        for key in ("throughput_per_s", "ack_p99_ms", "bytes_written_per_interaction", "peak_memory_kib"):
+            if before.get(key) and current.get(key) is not None:
+                change = (current[key] - before[key]) / before[key] * 100
+                print(f"{name:10} {key:30} {before[key]:>10} -> {current[key]:>10} ({change:+.1f}%)")
+
+
+async def main_async(args):
+    # 本番のデータを触らないように、ストアは一時ディレクトリに作る
+    instrument.AUTO_DEFER_BUDGET = 0  # 偽の応答は InteractionResponse ではないので自動deferは使わない
+    results = {"commit": _commit(), "settings": vars(args), "scenarios": {}}
+    with tempfile.TemporaryDirectory() as workdir:
+        store.BACKEND = args.backend
+        store.DATABASE_PATH = os.path.join(workdir, "regulus.db")
+        from cogs import rs_event, ws_event
+        rs_event.DATA_FILE = os.path.join(workdir, "rs_data.json")
+        ws_event.DATA_FILE = os.path.join(workdir, "ws_data.json")
+        for name in args.scenarios:
+            result = results["scenarios"][name] = await run_scenario(name, args)
+            print(
+                f"{name:10} {result['interactions']:>5} interactions | {result['throughput_per_s']:>6}/s | "
+                f"ack p50 {result['ack_p50_ms']}ms p99 {result['ack_p99_ms']}ms max {result['ack_max_ms']}ms "
+                f"(>3s: {result['late_acks']}) | REST {result['rest_calls']} (429: {result['rate_limited']}) | "
+                f"{result['bytes_written_per_interaction']} B/interaction | peak {result['peak_memory_kib']:,} KiB"
+            )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--members", type=int, default=500)
+    parser.add_argument("--window", type=float, default=10.0, help="全員がボタンを押し終えるまでの秒数")
+    parser.add_argument("--think", type=float, default=2.0, help="モーダル入力にかかる最大秒数")
+    parser.add_argument("--latency", type=float, default=0.08, help="REST 1回の平均遅延（秒）")
+    parser.add_argument("--jitter", type=float, default=0.03)
+    parser.add_argument("--rate-limit", type=float, default=0.02, help="429 を返す確率")
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--backend", choices=("json", "sqlite"), default="json")
+    parser.add_argument("--scenarios", nargs="+", choices=tuple(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="interaction_load.json")
+    parser.add_argument("--compare", help="比較する前回の結果ファイル")
+    args = parser.parse_args()
+
+    results = asyncio.run(main_async(args))
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+    print(f"📝 {args.output}")
+    if args.compare:
+        _print_comparison(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
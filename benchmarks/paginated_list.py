@@ -0,0 +1,55 @@
+import random
+import time
+
+from utils.paginator import PageSnapshot
+
+# ==============================
+# 10k件ランキングのページ送りコスト
+# ==============================
+# legacy   : クリックのたびに全件をソートして説明文を組み立てる（従来の /rs-list）
+# snapshot : 変更時に1回だけソートし、クリックでは該当ページだけ整形する
+# 使用例: python -m benchmarks.paginated_list
+
+ENTRIES = 10_000
+CLICKS = 200
+
+
+def legacy_click(entries):
+    ranked = sorted(entries.values(), key=lambda x: x["points"], reverse=True)
+    total = sum(int(e["points"]) for e in ranked)
+    desc = "\n".join(f"{i+1}. {e['name']} - {e['points']} pts" for i, e in enumerate(ranked))
+    return desc, total
+
+
+def main():
+    rng = random.Random(0)
+    entries = {str(i): {"name": f"member{i}", "level": rng.randint(1, 5), "points": rng.randint(0, 600_000)}
+               for i in range(ENTRIES)}
+
+    start = time.perf_counter()
+    for _ in range(CLICKS):
+        desc, _ = legacy_click(entries)
+    legacy = (time.perf_counter() - start) / CLICKS
+
+    start = time.perf_counter()
+    snapshot = PageSnapshot(
+        sorted(entries.items(), key=lambda x: x[1]["points"], reverse=True),
+        lambda rank, row: f"{rank}. {row[1]['name']} - {row[1]['points']} pts",
+    )
+    build = time.perf_counter() - start
+
+    pages = snapshot.page_count()
+    start = time.perf_counter()
+    for i in range(CLICKS):
+        page = snapshot.render(rng.randrange(pages))
+    paged = (time.perf_counter() - start) / CLICKS
+
+    print(f"entries               : {ENTRIES:,} ({pages} pages)")
+    print(f"legacy per click      : {legacy * 1000:.3f} ms (description {len(desc):,} chars > 4096 limit)")
+    print(f"snapshot build (once) : {build * 1000:.3f} ms")
+    print(f"snapshot per click    : {paged * 1000:.4f} ms (page {len(page)} chars)")
+    print(f"speedup per click     : {legacy / paged:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+import random
+import time
+
+from utils.partition import karmarkar_karp, lpt, partition, spread
+
+# ==============================
+# RSチーム分割の所要時間と偏り
+# ==============================
+# deal : Ptsの降順に並べて順番に配る（手作業と同じやり方）
+# lpt / kk / partition（LPTとKKの良い方 ＋ 入れ替えによる仕上げ）
+# 偏り = 最大グループと最小グループの合計Ptsの差
+# 使用例: python -m benchmarks.rs_partition
+
+
+def deal(items, k):
+    groups = [[] for _ in range(k)]
+    for i, item in enumerate(sorted(items, key=lambda item: item[1], reverse=True)):
+        groups[i % k].append(item)
+    return groups
+
+
+def entries(n, seed=0):
+    rng = random.Random(seed)
+    # 申告Ptsは5区分のどこかに入る
+    ranges = ((500_000, 900_000), (250_000, 500_000), (100_000, 250_000), (50_000, 100_000), (0, 50_000))
+    return [(i, rng.randint(*rng.choice(ranges))) for i in range(n)]
+
+
+def main():
+    for n, k in ((100, 4), (1_000, 8), (10_000, 8), (10_000, 20)):
+        items = entries(n)
+        print(f"n={n:,} k={k}")
+        for name, solve in (("deal", deal), ("lpt", lpt), ("kk", karmarkar_karp), ("partition", partition)):
+            start = time.perf_counter()
+            groups = solve(items, k)
+            elapsed = time.perf_counter() - start
+            print(f"  {name:<10}: {elapsed * 1000:8.2f} ms  偏り {spread(groups):>9,} pts")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+import argparse
+import asyncio
+import datetime
+import random
+import time
+from zoneinfo import ZoneInfo
+
+from cogs.scheduler import Scheduler
+from utils.clock import SimulatedClock
+from utils.cron import DEFAULT_TIMEZONE, WEEKDAYS
+from utils.models import Schedule
+
+# ==============================
+# スケジューラの仮想時計リプレイ
+# ==============================
+# daily / weekly / monthly / interval の定期投稿を数千ギルド分（既定 100k 件）用意し、
+# 実際の Scheduler（ヒープ・再アーム・ディスパッチャ）を SimulatedClock で1か月分動かす。
+# 期待される発火時刻はスケジューラとは独立に日付を数えて求め（_expected_fires）、送信記録と突き合わせて
+#   取りこぼし（missed）/ 重複（duplicate）/ 予定外（unexpected）、tickごとのCPU時間、投稿遅延
+# を出す。仮想時計は処理に使ったCPU時間だけ進めるので、重いtickの分だけ遅延として表れる。
+# 別のエンジンを試すときも、同じ母集団と突き合わせ方でそのまま比べられる。
+# 使用例: python -m benchmarks.scheduler_replay --schedules 100000 --days 30
+
+START = datetime.datetime(2026, 6, 1, tzinfo=datetime.timezone.utc).timestamp()
+TIMEZONES = (None, "UTC", "Asia/Seoul", "America/New_York", "Europe/Berlin")
+KINDS = ("daily", "weekly", "monthly", "interval")
+CRON_WEEKDAYS = {v: k for k, v in WEEKDAYS.items() if k.isascii()}
+MATCH_TOLERANCE = 60.0  # これ以内の送信を同じ発火とみなす
+
+
+class MemoryStore:
+    def __init__(self, schedules, timezones):
+        self.schedules = schedules
+        self._timezones = timezones
+        self.touched = 0
+
+    def all(self):
+        return self.schedules
+
+    def timezones(self):
+        return dict(self._timezones)
+
+    async def touch_many(self, items):
+        self.touched += len(items)
+
+    async def close(self):
+        pass
+
+
+class FakeChannel:
+    def __init__(self, channel_id, clock, sent):
+        self.id = channel_id
+        self.clock = clock
+        self.sent = sent
+
+    async def send(self, content):
+        self.sent.append((content, self.clock.time()))
+
+
+class FakeBot:
+    def __init__(self):
+        self.channels = {}
+
+    async def wait_until_ready(self):
+        pass
+
+    def get_channel(self, channel_id):
+        return self.channels.get(channel_id)
+
+
+class ReplayClock(SimulatedClock):
+    """待ちに入るたびに、前回の待ちからのCPU時間を1tick分として記録する。"""
+
+    def __init__(self, start):
+        super().__init__(start, charge_cpu=True)
+        self.tick_cpu = []
+        self._tick_mark = None
+
+    async def wait(self, event, timeout):
+        now = time.process_time()
+        if self._tick_mark is not None:
+            self.tick_cpu.append(now - self._tick_mark)
+        try:
+            return await super().wait(event, timeout)
+        finally:
+            self._tick_mark = time.process_time()
+
+
+# ---------- 母集団 ----------
+def population(count, guilds, seed=0):
+    rng = random.Random(seed)
+    schedules, timezones, specs = {}, {}, {}
+    for n in range(count):
+        gid = 10**17 + n % guilds
+        if gid not in timezones:
+            timezones[gid] = rng.choice(TIMEZONES)
+        sid = str(n // guilds + 1)
+        kind = rng.choice(KINDS)
+        hour, minute = rng.randrange(24), rng.randrange(60)
+        clock = f"{hour:02}:{minute:02}"
+        if kind == "daily":
+            arg, expr = None, f"daily {clock}"
+        elif kind == "weekly":
+            arg = rng.randrange(7)
+            expr = f"weekly {CRON_WEEKDAYS[arg]} {clock}"
+        elif kind == "monthly":
+            arg = rng.randint(1, 31)
+            expr = f"monthly {arg} {clock}"
+        else:
+            arg = rng.randint(2, 10)
+            expr = f"interval {arg} {clock}"
+        schedules.setdefault(gid, {})[sid] = Schedule(gid * 10 + n % 3, f"{gid}/{sid}", expr=expr, created=int(START))
+        specs[f"{gid}/{sid}"] = (kind, arg, hour, minute)
+    timezones = {gid: tz for gid, tz in timezones.items() if tz}
+    return schedules, timezones, specs
+
+
+def _expected_fires(spec, tz, start, end):
+    kind, arg, hour, minute = spec
+    created = datetime.datetime.fromtimestamp(start, tz).date()
+    day = created - datetime.timedelta(days=1)
+    last = datetime.datetime.fromtimestamp(end, tz).date() + datetime.timedelta(days=1)
+    fires = []
+    while day <= last:
+        if (
+            kind == "daily"
+            or (kind == "weekly" and (day.weekday() + 1) % 7 == arg)
+            or (kind == "monthly" and day.day == arg)
+            or (kind == "interval" and day > created and (day - created).days % arg == 0)
+        ):
+            fire = datetime.datetime(day.year, day.month, day.day, hour, minute, tzinfo=tz).timestamp()
+            if start < fire <= end:
+                fires.append(fire)
+        day += datetime.timedelta(days=1)
+    return fires
+
+
+def compare(specs, timezones, sent, start, end):
+    by_key = {}
+    for content, sent_at in sent:
+        by_key.setdefault(content, []).append(sent_at)
+    tz_cache = {}
+    missed = duplicate = unexpected = expected_total = 0
+    lags = []
+    for key, spec in specs.items():
+        tz_name = timezones.get(int(key.split("/")[0])) or DEFAULT_TIMEZONE
+        tz = tz_cache.get(tz_name) or tz_cache.setdefault(tz_name, ZoneInfo(tz_name))
+        expected = _expected_fires(spec, tz, start, end)
+        expected_total += len(expected)
+        sends = sorted(by_key.get(key, ()))
+        i = 0
+        matched = set()
+        for sent_at in sends:
+            while i < len(expected) and expected[i] + MATCH_TOLERANCE < sent_at:
+                i += 1
+            if i < len(expected) and expected[i] <= sent_at:
+                if i in matched:
+                    duplicate += 1
+                else:
+                    matched.add(i)
+                    lags.append(sent_at - expected[i])
+            else:
+                unexpected += 1
+        missed += len(expected) - len(matched)
+    return expected_total, missed, duplicate, unexpected, lags
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+
+async def replay(args):
+    schedules, timezones, specs = population(args.schedules, args.guilds, args.seed)
+    clock = ReplayClock(START)
+    bot = FakeBot()
+    sent = []
+    for guild in schedules.values():
+        for data in guild.values():
+            bot.channels.setdefault(data.channel_id, FakeChannel(data.channel_id, clock, sent))
+
+    cpu = time.process_time()
+    scheduler = Scheduler(bot, store=MemoryStore(schedules, timezones), clock=clock)
+    arm_cpu = time.process_time() - cpu
+
+    end = START + args.days * 86400
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    await scheduler.cog_load()
+    # 終了時刻ちょうどの発火も送られるように少し先まで進める（発火は分単位なので次の発火は含まれない）
+    await clock.advance(end + MATCH_TOLERANCE)
+    replay_cpu = time.process_time() - cpu
+    replay_wall = time.perf_counter() - wall
+    await scheduler.cog_unload()
+
+    sent = [(content, sent_at) for content, sent_at in sent if sent_at <= end + MATCH_TOLERANCE / 2]
+    expected, missed, duplicate, unexpected, lags = compare(specs, timezones, sent, START, end)
+    ticks = clock.tick_cpu
+    print(f"schedules      : {args.schedules:,} in {args.guilds:,} guilds, {args.days} simulated days")
+    print(f"initial arming : {arm_cpu:.2f}s CPU")
+    print(f"replay         : {replay_wall:.2f}s wall / {replay_cpu:.2f}s CPU, {len(ticks):,} ticks")
+    print(f"fires          : expected {expected:,} / sent {len(sent):,}")
+    print(f"missed / duplicate / unexpected : {missed:,} / {duplicate:,} / {unexpected:,}")
+    print(
+        f"CPU per tick   : mean {sum(ticks) / max(1, len(ticks)) * 1e3:.3f} ms / "
+        f"p99 {_percentile(ticks, 0.99) * 1e3:.2f} ms / max {max(ticks, default=0) * 1e3:.2f} ms"
+    )
+    print(
+        f"dispatch lag   : p50 {_percentile(lags, 0.5) * 1e3:.2f} ms / "
+        f"p99 {_percentile(lags, 0.99) * 1e3:.2f} ms / max {max(lags, default=0) * 1e3:.2f} ms"
+    )
+    return missed + duplicate + unexpected == 0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--schedules", type=int, default=100_000)
+    parser.add_argument("--guilds", type=int, default=5_000)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    ok = asyncio.run(replay(args))
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import random
+import time
+import tracemalloc
+
+from utils.signups import SignupIndex
+
+# ==============================
+# サインアップ保持のメモリと所属確認の比較（50k人、65k回のクリック）
+# ==============================
+# legacy : {ボタン番号: [member_id, ...]} に押された回数だけ append（従来方式）
+# index  : SignupIndex（重複なし、array('Q') ＋ id→位置の dict）
+# index は dict の分だけ legacy より大きい。得られるのは重複の排除と O(1) の所属確認・移動。
+# 使用例: python -m benchmarks.signup_memory
+
+LABELS = ["⭐️", "1️⃣", "2️⃣", "3️⃣", "4️⃣"]
+SIGNUPS = 50_000
+RECLICK_RATE = 0.3  # 押し直し・気が変わった分
+
+
+def clicks():
+    rng = random.Random(0)
+    base = 10**17
+    for _ in range(int(SIGNUPS * (1 + RECLICK_RATE))):
+        yield base + rng.randrange(SIGNUPS), rng.choice(LABELS)
+
+
+def measure(build):
+    tracemalloc.start()
+    start = time.perf_counter()
+    obj = build()
+    elapsed = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return obj, size, elapsed
+
+
+def build_legacy():
+    data = {label: [] for label in LABELS}
+    for member_id, label in clicks():
+        data[label].append(member_id)
+    return data
+
+
+def build_index():
+    index = SignupIndex(LABELS)
+    for member_id, label in clicks():
+        index.add(member_id, label)
+    return index
+
+
+def main():
+    legacy, legacy_bytes, legacy_time = measure(build_legacy)
+    index, index_bytes, index_time = measure(build_index)
+    probe = 10**17 + SIGNUPS // 2
+
+    start = time.perf_counter()
+    for _ in range(100):
+        any(probe in bucket for bucket in legacy.values())
+    legacy_lookup = (time.perf_counter() - start) / 100
+
+    start = time.perf_counter()
+    for _ in range(100):
+        index.bucket_of(probe)
+    index_lookup = (time.perf_counter() - start) / 100
+
+    print(f"clicks                : {int(SIGNUPS * (1 + RECLICK_RATE)):,}")
+    print(f"legacy  entries/bytes : {sum(map(len, legacy.values())):,} / {legacy_bytes / 1024:,.0f} KiB ({legacy_time:.3f}s)")
+    print(f"index   entries/bytes : {len(index):,} / {index_bytes / 1024:,.0f} KiB ({index_time:.3f}s)")
+    print(f"membership lookup     : legacy {legacy_lookup * 1e6:,.1f} µs / index {index_lookup * 1e6:.2f} µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from utils.models import Activity
+from utils.store import JsonEventStore, JsonScheduleStore
+
+# ==============================
+# イベント・スケジュール状態のメモリ比較（100k件）
+# ==============================
+# 同じJSONファイルを読み込んだときにプロセスに残るメモリを比べる。
+# legacy  : json.load のまま（ギルドID・ユーザーIDは str キー、1件ごとに "name" / "points" などを持つ dict）
+# records : JsonEventStore / JsonScheduleStore で読み込み、utils/models.py のレコードにしたもの（int キー、__slots__、Activity は共有）
+# ストアが書き出すJSONが元と一致すること（損失なし、無かったキーが null / 0 で増えないこと）も確かめる。
+# 使用例: python -m benchmarks.state_memory --entries 100000
+
+ACTIVITIES = [a.value for a in Activity]
+
+
+def rs_payload(entries, guilds, rng):
+    data = {}
+    for n in range(entries):
+        gid = str(10**17 + n % guilds)
+        record = data.setdefault(gid, {
+            "entry_channel": int(gid) + 1, "admin_channel": int(gid) + 2, "common_role": None,
+            "entry_messages": [int(gid) + 3], "entries": {}, "team_roles": {},
+        })
+        entry = record["entries"][str(2 * 10**17 + n)] = {"name": f"member{n}", "level": rng.randint(1, 5)}
+        if n % 10:  # 1割はポイント未登録（"points" キー無し）
+            entry["points"] = rng.randrange(600_000)
+    return json.dumps(data, ensure_ascii=False)
+
+
+def ws_payload(entries, guilds, rng):
+    data = {}
+    for n in range(entries):
+        gid = str(10**17 + n % guilds)
+        record = data.setdefault(gid, {"entry_channel": int(gid) + 1, "admin_channel": int(gid) + 2, "entries": {}, "teams": {}})
+        if n % guilds % 2:  # 半分のギルドは共通ロール未設定（"common_role" キー無し）
+            record["common_role"] = int(gid) + 4
+        record["entries"][str(2 * 10**17 + n)] = {"name": f"member{n}", "activity": rng.choice(ACTIVITIES)}
+    return json.dumps(data, ensure_ascii=False)
+
+
+def schedule_payload(entries, guilds, rng):
+    data = {}
+    for n in range(entries):
+        gid = str(10**17 + n % guilds)
+        data.setdefault(gid, {})[str(n // guilds + 1)] = {
+            "expr": f"daily {rng.randrange(24):02}:{rng.randrange(60):02}",
+            "channel_id": int(gid) * 10 + n % 3,
+            "message": f"schedule {n}",
+            "created": 1_780_000_000,
+            "last_post": 1_780_000_000 + rng.randrange(86400),
+        }
+    return json.dumps(data, ensure_ascii=False)
+
+
+def measure(build):
+    """build() の戻り値が持ち続けるメモリと、tracemalloc を切った状態での所要時間。"""
+    tracemalloc.start()
+    obj = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del obj
+    start = time.perf_counter()
+    obj = build()
+    return obj, size, time.perf_counter() - start
+
+
+def load_legacy(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+CASES = (
+    ("rs entries", rs_payload, lambda path: JsonEventStore(path, "rs", teams_key="team_roles")),
+    ("ws entries", ws_payload, lambda path: JsonEventStore(path, "ws")),
+    ("schedules", schedule_payload, JsonScheduleStore),
+)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entries", type=int, default=100_000)
+    parser.add_argument("--guilds", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    print(f"{args.entries:,} items per case in {args.guilds:,} guilds")
+    print(f"{'case':<10} | {'legacy':>9} | {'records':>9} | {'B/item':>13} | {'saved':>5} | {'load':>13} | lossless")
+    with tempfile.TemporaryDirectory() as directory:
+        for name, make, open_store in CASES:
+            path = os.path.join(directory, name.replace(" ", "_") + ".json")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(make(args.entries, args.guilds, rng))
+
+            legacy, legacy_bytes, legacy_time = measure(lambda: load_legacy(path))
+            store, record_bytes, record_time = measure(lambda: open_store(path))
+            lossless = json.loads(store.file.dumps()) == legacy
+            print(
+                f"{name:<10} | {legacy_bytes / 2**20:>5.1f} MiB | {record_bytes / 2**20:>5.1f} MiB | "
+                f"{legacy_bytes / args.entries:>5.0f} -> {record_bytes / args.entries:>4.0f} | "
+                f"{1 - record_bytes / legacy_bytes:>5.0%} | {legacy_time:.2f}s -> {record_time:.2f}s | "
+                f"{'yes' if lossless else 'NO'}"
+            )
+            del legacy, store
+
+
+if __name__ == "__main__":
+    main()
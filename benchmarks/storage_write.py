@@ -0,0 +1,93 @@
+import asyncio
+import json
+import os
+import sqlite3
+import tempfile
+import time
+
+from utils.models import RSEntry
+from utils.sqlite_store import SQLiteEventStore
+
+# ==============================
+# 1件のサインアップあたりの書き込みコスト比較
+# ==============================
+# legacy : 変更ごとに indent=4 でファイル全体を書き直す（従来方式）
+# sqlite : WALモードのSQLiteに1行UPSERT（書き込み用スレッド経由で await する、Cogと同じ経路）
+# 最後に、別プロセス（別の接続）が書き込みロックを LOCK_HOLD 秒持っている間に1件書き込み、
+# その間のイベントループの起床遅れを測る（クラスターでワーカー同士がロックを取り合う場合）。
+# 使用例: python -m benchmarks.storage_write
+
+SIZES = (100, 10_000, 100_000)
+GUILD_ID = 1
+LOCK_HOLD = 1.0
+TICK = 0.01
+
+
+def make_entries(n):
+    return {str(10**17 + i): {"name": f"member{i}", "level": i % 5 + 1, "points": (i * 7919) % 600_000} for i in range(n)}
+
+
+def bench_legacy(directory, entries, rounds):
+    path = os.path.join(directory, "rs_data.json")
+    data = {str(GUILD_ID): {"entry_channel": 1, "admin_channel": 2, "common_role": None,
+                            "entries": dict(entries), "team_roles": {}}}
+    start = time.perf_counter()
+    for i in range(rounds):
+        data[str(GUILD_ID)]["entries"][str(i)] = {"name": "new", "level": 1, "points": i}
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=4)
+    return (time.perf_counter() - start) / rounds, os.path.getsize(path)
+
+
+async def bench_sqlite(directory, entries, rounds):
+    path = os.path.join(directory, f"bench-{len(entries)}.db")
+    store = SQLiteEventStore(path, "rs")
+    with store.conn:
+        store.conn.execute("BEGIN")
+        for user_id, entry in entries.items():
+            store._put_entry(store.conn, GUILD_ID, user_id, RSEntry.from_dict(entry))
+    start = time.perf_counter()
+    for i in range(rounds):
+        await store.put_entry(GUILD_ID, i, RSEntry("new", 1, i))
+    return (time.perf_counter() - start) / rounds, os.path.getsize(path)
+
+
+async def bench_contended(directory):
+    path = os.path.join(directory, "contended.db")
+    store = SQLiteEventStore(path, "rs")
+    other = sqlite3.connect(path, isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")
+    lags, done = [], asyncio.Event()
+
+    async def watch():
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(TICK)
+            lags.append(time.perf_counter() - start - TICK)
+
+    watcher = asyncio.create_task(watch())
+    asyncio.get_running_loop().call_later(LOCK_HOLD, other.commit)
+    start = time.perf_counter()
+    await store.put_entry(GUILD_ID, 1, RSEntry("new", 1, 1))
+    waited = time.perf_counter() - start
+    done.set()
+    await watcher
+    other.close()
+    return waited, max(lags)
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"{'entries':>8} | {'legacy ms/write':>16} | {'sqlite ms/write':>16} | {'speedup':>8}")
+        for n in SIZES:
+            entries = make_entries(n)
+            legacy_rounds = max(3, 2000 // max(1, n // 100))
+            legacy, _ = bench_legacy(directory, entries, min(legacy_rounds, 200))
+            sqlite, _ = asyncio.run(bench_sqlite(directory, entries, 2000))
+            print(f"{n:>8} | {legacy * 1000:>16.3f} | {sqlite * 1000:>16.3f} | {legacy / sqlite:>7.0f}x")
+        waited, lag = asyncio.run(bench_contended(directory))
+        print(f"lock held by another worker for {LOCK_HOLD:.1f}s: write waited {waited:.2f}s, max loop lag {lag * 1e3:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+import random
+import time
+
+from utils.team_balance import ACTIVITY_LEVELS, CAPTAIN, balance_teams
+
+# ==============================
+# WSチーム自動編成の所要時間
+# ==============================
+# 使用例: python -m benchmarks.team_balance
+
+TEAMS = [f"Team{i + 1}" for i in range(8)]
+WEIGHTS = (1, 2, 4, 4, 3)  # キャプテンは少なめ
+
+
+def signups(n, seed=0):
+    rng = random.Random(seed)
+    return [(10**17 + i, rng.choices(ACTIVITY_LEVELS, WEIGHTS)[0]) for i in range(n)]
+
+
+def main():
+    for n in (100, 1_000, 5_000, 20_000):
+        entries = signups(n)
+        start = time.perf_counter()
+        plan = balance_teams(entries, TEAMS)
+        elapsed = time.perf_counter() - start
+        sizes = plan.sizes().values()
+        spread = max(
+            max(plan.levels[t][lv] for t in TEAMS) - min(plan.levels[t][lv] for t in TEAMS)
+            for lv in ACTIVITY_LEVELS
+        )
+        captains = min(plan.levels[t][CAPTAIN] for t in TEAMS)
+        print(f"{n:>6,} 人: {elapsed * 1000:7.2f} ms  人数差 {max(sizes) - min(sizes)}  区分ごとの差 <= {spread}  最少キャプテン {captains}")
+
+
+if __name__ == "__main__":
+    main()
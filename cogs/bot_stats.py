@@ -0,0 +1,62 @@
+import discord
+from discord.ext import commands
+from discord import app_commands
+
+from utils import cluster, instrument, metrics
+
+TOP_N = 15  # 埋め込みに出すキーの数（応答が遅い順）
+
+class BotStats(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+
+    # 応答時間などの計測結果を表示
+    @app_commands.command(name="bot-stats", description="コマンド・ボタンごとの応答時間や失敗数を表示します。")
+    @app_commands.default_permissions(administrator=True)
+    @app_commands.checks.has_permissions(administrator=True)
+    async def stats(self, interaction: discord.Interaction):
+        stats = instrument.snapshot()
+        if not stats:
+            await interaction.response.send_message("📭 まだ計測データがありません。", ephemeral=True)
+            return
+
+        def slowest(item):
+            return item[1].get("ack", {}).get("p99", 0.0)
+
+        lines = []
+        for key, s in sorted(stats.items(), key=slowest, reverse=True)[:TOP_N]:
+            ack = s.get("ack")
+            handler = s.get("handler")
+            rest = s.get("rest_calls")
+            line = f"`{key}` ×{s['count']}"
+            if ack:
+                line += f" | 応答 p50 ≤{ack['p50']}s / p99 ≤{ack['p99']}s"
+            if handler:
+                line += f" | 処理 p99 ≤{handler['p99']}s"
+            if rest:
+                line += f" | REST {rest['mean']:.1f}回"
+            problems = [f"{label} {s[field]}" for field, label in
+                        (("auto_deferred", "🕐自動defer"), ("late_acks", "⏰3秒超"), ("unacked", "❌未応答"),
+                         ("errors", "⚠️エラー"), ("rate_limited", "🐢429"))
+                        if s[field]]
+            if problems:
+                line += " | " + " ".join(problems)
+            lines.append(line)
+
+        embed = discord.Embed(
+            title="📈 Bot 統計（起動後の累計）",
+            description="\n".join(lines)[:4096],
+            color=discord.Color.teal()
+        )
+        latency = self.bot.latency
+        scope = cluster.scope_label()
+        embed.set_footer(text=(
+            (f"集計対象: {scope} | " if scope else "") +
+            f"ゲートウェイ遅延: {latency * 1000:.0f}ms | "
+            f"429（全体）: {sum(v for (n, _), v in metrics.counters().items() if n == 'http_rate_limited_total')} 件 | "
+            f"応答時間は受信から最初の応答まで（バケットの上限値）"
+        ))
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+async def setup(bot):
+    await bot.add_cog(BotStats(bot))
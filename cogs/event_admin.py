@@ -0,0 +1,57 @@
+import discord
+from discord.ext import commands
+from discord import app_commands
+
+from utils import cluster
+from utils.event_setup import ensure_category, run_bounded
+
+EVENT_COGS = {"rs": "RSEvent", "ws": "WSEvent"}
+
+class EventAdmin(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+
+    # 全ギルドのイベント用チャンネルを一括で揃える（Botオーナー専用）
+    @app_commands.command(name="event-setup-all", description="参加中の全サーバーでイベント用チャンネルを一括セットアップします。")
+    @app_commands.describe(category_name="使うカテゴリ名（無ければ作成します）", event="対象のイベント")
+    @app_commands.choices(event=[
+        app_commands.Choice(name="RS + WS", value="both"),
+        app_commands.Choice(name="RS", value="rs"),
+        app_commands.Choice(name="WS", value="ws"),
+    ])
+    async def event_setup_all(self, interaction: discord.Interaction, category_name: str, event: str = "both"):
+        if not await self.bot.is_owner(interaction.user):
+            await interaction.response.send_message("❌ このコマンドはBotのオーナーのみ実行できます。", ephemeral=True)
+            return
+
+        kinds = ("rs", "ws") if event == "both" else (event,)
+        cogs = [self.bot.get_cog(EVENT_COGS[k]) for k in kinds]
+        if None in cogs:
+            await interaction.response.send_message("❌ イベント用のCogが読み込まれていません。", ephemeral=True)
+            return
+
+        await interaction.response.defer(ephemeral=True, thinking=True)
+
+        async def setup_guild(guild):
+            category = await ensure_category(guild, category_name)
+            created = 0
+            for cog in cogs:
+                _, names = await cog.reconcile(category)
+                created += len(names)
+            return created
+
+        results = await run_bounded(list(self.bot.guilds), setup_guild)
+        failed = [guild.name for guild, _, error in results if error is not None]
+        created = sum(n for _, n, error in results if error is None)
+
+        text = f"✅ {len(results) - len(failed)}/{len(results)} サーバーをセットアップしました（新規チャンネル {created} 件）。"
+        scope = cluster.scope_label()
+        if scope:
+            # 他のワーカーが持つサーバーには届かない（それぞれのワーカーで実行する必要がある）
+            text += f"\nℹ️ 対象は{scope}です。他のワーカーのサーバーは含まれません。"
+        if failed:
+            text += f"\n⚠️ 失敗: {', '.join(failed[:20])}" + (" …" if len(failed) > 20 else "")
+        await interaction.followup.send(text, ephemeral=True)
+
+async def setup(bot):
+    await bot.add_cog(EventAdmin(bot))
@@ -1,43 +1,73 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
+import asyncio
+
+from utils.members import get_member_resolver
+from utils.mentions import mention_chunks
+from utils.paginator import PageSnapshot, PaginatedEmbedView, SnapshotCache
+
+PING_INTERVAL = 1.0  # followupを連続で送るときの間隔（秒）
+SILENT_MENTIONS = discord.AllowedMentions(everyone=False, users=True, roles=False, replied_user=False)
 
 class RoleUtils(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.members = get_member_resolver(bot)  # ロールの所属はリゾルバーのスナップショットから引く
+        self.snapshots = SnapshotCache()
+
+    # ---------- 一覧ページのキャッシュ ----------
+    def _invalidate(self, guild_id, role_ids):
+        for role_id in role_ids:
+            self.snapshots.invalidate((guild_id, role_id))
+
+    @commands.Cog.listener()
+    async def on_member_roles_update(self, guild_id, member_id, changed):
+        self._invalidate(guild_id, changed)
+
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role):
+        self._invalidate(role.guild.id, (role.id,))
 
     # ロールをメンションするコマンド
     @app_commands.command(name="pingrole", description="指定したロールの全メンバーを@silentでメンションします。")
     @app_commands.describe(role="メンションしたいロールを選択してください。")
     @commands.has_permissions(administrator=True)
     async def pingrole(self, interaction: discord.Interaction, role: discord.Role):
-        members = [m for m in role.members if not m.bot]
-        if not members:
+        member_ids = await self.members.role_member_ids(role)
+        if not member_ids:
             await interaction.response.send_message(f"⚠️ ロール {role.name} にメンバーはいません。", ephemeral=True)
             return
 
-        mentions = " ".join([m.mention for m in members])
-        message = f"@silent {mentions}"
-        await interaction.response.send_message(message)
+        # 2000文字を超える場合は分割し、deferした上でfollowupとして順番に送る
+        await interaction.response.defer(thinking=True)
+        for i, chunk in enumerate(mention_chunks(member_ids)):
+            if i:
+                await asyncio.sleep(PING_INTERVAL)
+            await interaction.followup.send(chunk, silent=True, allowed_mentions=SILENT_MENTIONS)
 
     # ロールに含まれるメンバーをリストアップ
     @app_commands.command(name="listrole", description="指定したロールに含まれるメンバーをリスト表示します。")
     @app_commands.describe(role="リストアップするロールを選択してください。")
     @commands.has_permissions(administrator=True)
     async def listrole(self, interaction: discord.Interaction, role: discord.Role):
-        members = [m for m in role.members if not m.bot]
-        if not members:
+        member_ids = await self.members.role_member_ids(role)
+        if not member_ids:
             await interaction.response.send_message(f"📭 ロール {role.name} に該当するメンバーはいません。", ephemeral=True)
             return
 
-        member_names = "\n".join([f"・{m.display_name}" for m in members])
-        embed = discord.Embed(
-            title=f"📋 ロール「{role.name}」のメンバー一覧",
-            description=member_names,
-            color=discord.Color.gold()
+        guild = interaction.guild
+
+        def format_row(rank, member_id):
+            name = self.members.display_name(guild, member_id)
+            return f"・{name}" if name else f"・<@{member_id}>"
+
+        snapshot = self.snapshots.get(
+            (guild.id, role.id),
+            lambda: PageSnapshot(member_ids, format_row, footer=f"合計 {len(member_ids)} 名")
         )
-        embed.set_footer(text=f"合計 {len(members)} 名")
-        await interaction.response.send_message(embed=embed, ephemeral=True)
+        view = PaginatedEmbedView(snapshot, f"📋 ロール「{role.name}」のメンバー一覧", discord.Color.gold())
+        await view.send(interaction)
 
 async def setup(bot):
     await bot.add_cog(RoleUtils(bot))
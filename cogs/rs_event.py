@@ -1,73 +1,116 @@
+import asyncio
+
 import discord
 from discord.ext import commands
 from discord import app_commands, ui
-import json
-import os
+
+from utils.event_setup import reconcile_channels
+from utils.export import post_export, team_lookup
+from utils.instrument import defer_policy
+from utils.leaderboard import Leaderboard
+from utils.paginator import PageSnapshot, PaginatedEmbedView
+from utils.partition import partition
+from utils.role_jobs import get_role_jobs
+from utils.members import get_member_resolver
+from utils.models import GuildEventConfig, RSEntry
+from utils.roles import get_role_resolver
+from utils.router import entry_view, get_router
+from utils.store import open_event_store
 
 DATA_FILE = "data/rs_data.json"
+LEVEL_LABELS = {1: "1️⃣", 2: "2️⃣", 3: "3️⃣", 4: "4️⃣", 5: "5️⃣"}
+TEAM_NAME = "RSチーム{}"
+ENTRY_INDEX_SIZE = 10  # ギルドごとに覚えておくエントリー投稿の数
+SETUP_CHANNELS = {"entry_channel": "rs-entry", "admin_channel": "rs-admin"}
+EXPORT_FIELDS = ("rank", "user_id", "name", "level", "points", "team")
 
 class RSEvent(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.data = self.load_data()
-
-    def load_data(self):
-        if not os.path.exists(DATA_FILE):
-            return {}
-        with open(DATA_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-
-    def save_data(self):
-        with open(DATA_FILE, "w", encoding="utf-8") as f:
-            json.dump(self.data, f, ensure_ascii=False, indent=4)
+        self.store = open_event_store("rs", DATA_FILE, teams_key="team_roles")
+        self.leaderboards = {}  # guild_id -> Leaderboard（初回参照時に構築）
+        self.role_jobs = get_role_jobs(bot)
+        self.roles = get_role_resolver(bot)
+        self.members = get_member_resolver(bot)
+        self.router = get_router(bot)
+
+    async def cog_load(self):
+        self.router.register("rs", self.on_entry_button)
+
+    async def cog_unload(self):
+        self.router.unregister("rs")
+        await self.store.close()
+        await self.role_jobs.flush()
+
+    def leaderboard(self, guild_id):
+        board = self.leaderboards.get(guild_id)
+        if board is None:
+            board = self.leaderboards[guild_id] = Leaderboard(
+                (uid, e.points, e.level) for uid, e in self.store.entries(guild_id).items()
+            )
+        return board
+
+    # ---------- ロール作り直しの反映 ----------
+    @commands.Cog.listener()
+    async def on_role_replaced(self, guild, old_id, new_role):
+        data = self.store.get_guild(guild.id)
+        if data is None:
+            return
+        if data.common_role == old_id:
+            await self.store.update_guild(guild.id, common_role=new_role.id)
+        for name, role_id in self.store.teams(guild.id).items():
+            if role_id == old_id:
+                await self.store.put_team(guild.id, name, new_role.id)
 
     # ---------- RS初期設定 ----------
     @app_commands.command(name="rs-event-setup", description="RSイベントの設定を開始します。")
     @app_commands.describe(category="Bot用カテゴリを選択してください。")
     async def rs_event_setup(self, interaction: discord.Interaction, category: discord.CategoryChannel):
-        guild_id = str(interaction.guild_id)
-
-        entry_channel = await category.create_text_channel("rs-entry")
-        admin_channel = await category.create_text_channel("rs-admin")
-
-        self.data[guild_id] = {
-            "entry_channel": entry_channel.id,
-            "admin_channel": admin_channel.id,
-            "common_role": None,
-            "entries": {},
-            "team_roles": {}
-        }
-        self.save_data()
+        channels, created = await self.reconcile(category)
+        entry_channel = channels["entry_channel"]
+        admin_channel = channels["admin_channel"]
 
+        status = f"作成: {', '.join(created)}" if created else "既存のチャンネルをそのまま使います。"
         embed = discord.Embed(
             title="✅ RSイベント初期設定が完了しました！",
-            description=f"{entry_channel.mention} と {admin_channel.mention} を作成しました。\n`/rs-commonrole` コマンドで共通ロールを設定してください。",
+            description=f"{entry_channel.mention} と {admin_channel.mention} を設定しました（{status}）。\n`/rs-commonrole` コマンドで共通ロールを設定してください。",
             color=discord.Color.green()
         )
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
+    async def reconcile(self, category):
+        """チャンネルを揃えて設定を更新する。既存のエントリー・チームはそのまま残す。"""
+        guild_id = category.guild.id
+        config = self.store.get_guild(guild_id)
+        channels, created = await reconcile_channels(category, SETUP_CHANNELS, config)
+        ids = {key: channel.id for key, channel in channels.items()}
+        if config is None:
+            self.leaderboards.pop(guild_id, None)
+            await self.store.reset_guild(guild_id, GuildEventConfig(**ids))
+        else:
+            await self.store.update_guild(guild_id, **ids)
+        return channels, created
+
     # ---------- 共通ロール設定 ----------
     @app_commands.command(name="rs-commonrole", description="RSイベント用の共通ロールを設定します。")
     async def rs_commonrole(self, interaction: discord.Interaction, role: discord.Role):
-        guild_id = str(interaction.guild_id)
-        if guild_id not in self.data:
+        guild_id = interaction.guild_id
+        if self.store.get_guild(guild_id) is None:
             await interaction.response.send_message("❌ まず `/rs-event-setup` を実行してください。", ephemeral=True)
             return
 
-        self.data[guild_id]["common_role"] = role.id
-        self.save_data()
+        await self.store.update_guild(guild_id, common_role=role.id)
         await interaction.response.send_message(f"🏁 共通ロールを {role.mention} に設定しました。", ephemeral=True)
 
     # ---------- エントリーメッセージ送信 ----------
     @app_commands.command(name="rs-entrypost", description="RSイベント用のエントリーメッセージを投稿します。")
     async def rs_entrypost(self, interaction: discord.Interaction):
-        guild_id = str(interaction.guild_id)
-        data = self.data.get(guild_id)
+        data = self.store.get_guild(interaction.guild_id)
         if not data:
             await interaction.response.send_message("❌ まず `/rs-event-setup` を実行してください。", ephemeral=True)
             return
 
-        entry_channel = interaction.guild.get_channel(data["entry_channel"])
+        entry_channel = interaction.guild.get_channel(data.entry_channel)
         if not entry_channel:
             await interaction.response.send_message("❌ エントリーチャンネルが見つかりません。", ephemeral=True)
             return
@@ -85,78 +128,154 @@ class RSEvent(commands.Cog):
             ),
             color=discord.Color.blue()
         )
-        view = RSButtons(self)
-        await entry_channel.send(embed=embed, view=view)
+        view = entry_view("rs", interaction.guild_id, (
+            (level, label, discord.ButtonStyle.primary) for level, label in LEVEL_LABELS.items()
+        ))
+        message = await entry_channel.send(embed=embed, view=view)
+        ids = (data.entry_messages or [])[-(ENTRY_INDEX_SIZE - 1):]
+        await self.store.update_guild(interaction.guild_id, entry_messages=ids + [message.id])
         await interaction.response.send_message("✅ RSエントリーメッセージを送信しました。", ephemeral=True)
 
+    # ---------- エントリーボタン（ルーター経由） ----------
+    @defer_policy(enabled=False)  # モーダルを返すので自動deferしない
+    async def on_entry_button(self, interaction: discord.Interaction, bucket):
+        data = self.store.get_guild(interaction.guild_id)
+        if interaction.message is None or data is None or interaction.message.id not in (data.entry_messages or ()):
+            # 索引に無い投稿（ギルド設定を作り直す前のもの・古くなったもの）
+            await interaction.response.send_message("⚠️ この募集は終了しています。最新のエントリー投稿から登録してください。", ephemeral=True)
+            return
+        await self.register_rs_entry(interaction, int(bucket))
+
     # ---------- 参加登録 ----------
     async def register_rs_entry(self, interaction: discord.Interaction, level: int):
-        guild_id = str(interaction.guild_id)
-        user_id = str(interaction.user.id)
-        data = self.data.setdefault(guild_id, {"entries": {}})
-
         # pts入力ダイアログ表示
-        modal = RSPointsModal(self, guild_id, user_id, level)
+        modal = RSPointsModal(self, interaction.guild_id, interaction.user.id, level)
         await interaction.response.send_modal(modal)
 
     # ---------- 管理者用一覧 ----------
     @app_commands.command(name="rs-list", description="RSイベント参加者一覧を表示します。")
     @commands.has_permissions(administrator=True)
     async def rs_list(self, interaction: discord.Interaction):
-        guild_id = str(interaction.guild_id)
-        if guild_id not in self.data or not self.data[guild_id]["entries"]:
+        guild_id = interaction.guild_id
+        board = self.leaderboard(guild_id)
+        if not board:
             await interaction.response.send_message("📭 登録された参加者はいません。", ephemeral=True)
             return
 
-        entries = sorted(
-            self.data[guild_id]["entries"].values(),
-            key=lambda x: x["points"],
-            reverse=True
+        # 索引は書き込み時に更新済みなので、ここではページ分の行を引くだけ
+        def format_row(rank, row):
+            user_id, points = row
+            entry = self.store.get_entry(guild_id, user_id)
+            name = entry.name if entry else f"<@{user_id}>"
+            return f"{rank}. {name} - {points} pts"
+
+        buckets = " / ".join(
+            f"{label} {board.bucket(level)[0]}名" for level, label in LEVEL_LABELS.items()
         )
-        total_points = sum([int(e["points"]) for e in entries])
+        snapshot = PageSnapshot(
+            board,
+            format_row,
+            footer=f"参加者数: {len(board)} | 合計Pts: {board.total} | {buckets}"
+        )
+        view = PaginatedEmbedView(snapshot, "🏆 RSイベント参加者ランキング", discord.Color.gold())
+        await view.send(interaction)
+
+    # ---------- チーム分け ----------
+    @app_commands.command(name="rs-team-build", description="予想Ptsの合計が均等になるようにチームを分け、ロールを付与します。")
+    @app_commands.describe(teams="チーム数")
+    @app_commands.default_permissions(administrator=True)
+    @app_commands.checks.has_permissions(administrator=True)
+    async def rs_team_build(self, interaction: discord.Interaction, teams: app_commands.Range[int, 2, 20]):
+        guild_id = interaction.guild_id
+        guild = interaction.guild
+        if self.store.get_guild(guild_id) is None:
+            await interaction.response.send_message("❌ まず `/rs-event-setup` を実行してください。", ephemeral=True)
+            return
+
+        items = [(uid, e.points) for uid, e in self.store.entries(guild_id).items()]
+        if len(items) < teams:
+            await interaction.response.send_message("⚠️ 参加者がチーム数より少ないです。", ephemeral=True)
+            return
 
-        desc = "\n".join([
-            f"{i+1}. {e['name']} - {e['points']} pts"
-            for i, e in enumerate(entries)
-        ])
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        # 1万件で0.1秒ほどかかるので、イベントループを止めないようにスレッドで計算する
+        groups = await asyncio.get_running_loop().run_in_executor(None, partition, items, teams)
+
+        # team_roles に登録済みのロールを優先し、無ければ同名のロールを使う（無ければ作る）
+        saved = self.store.teams(guild_id)
+        names = [TEAM_NAME.format(i + 1) for i in range(teams)]
+        roles = await asyncio.gather(*(
+            self._team_role(guild, name, saved.get(name)) for name in names
+        ))
+        for name, role in zip(names, roles):
+            await self.store.put_team(guild_id, name, role.id)
+
+        team_role_ids = set(self.store.teams(guild_id).values())
+        members = await self.members.snapshot(guild)
+        operations = []
         embed = discord.Embed(
-            title="🏆 RSイベント参加者ランキング",
-            description=desc,
-            color=discord.Color.gold()
+            title="🧩 RSチーム分け",
+            description=f"参加者 {len(items)} 人 / {teams} チーム",
+            color=discord.Color.blue()
         )
-        embed.set_footer(text=f"参加者数: {len(entries)} | 合計Pts: {total_points}")
-        await interaction.response.send_message(embed=embed, ephemeral=True)
+        for name, role, group in zip(names, roles, groups):
+            total = sum(points for _, points in group)
+            embed.add_field(name=f"{name}（{len(group)}人）", value=f"{role.mention}\n合計 {total:,} pts", inline=True)
+            for uid, _ in group:
+                current = set(members.roles_of(uid)) & team_role_ids
+                if role.id not in current:
+                    operations.append((uid, role.id, "add"))
+                operations.extend((uid, rid, "remove") for rid in current - {role.id})
+
+        totals = [sum(points for _, points in group) for group in groups]
+        embed.set_footer(text=f"最大と最小の差: {max(totals) - min(totals):,} pts | ロール変更 {len(operations)} 件")
+        await interaction.followup.send(embed=embed, ephemeral=True)
+        if operations:
+            await self.role_jobs.submit_batch(interaction, "RSチーム分け", operations)
+
+    async def _team_role(self, guild, name, role_id):
+        role = guild.get_role(role_id) if role_id else None
+        return role or await self.roles.resolve(guild, name)
+
+    # ---------- エクスポート ----------
+    @app_commands.command(name="rs-export", description="RSイベントの参加者ランキングをファイルにして管理チャンネルに投稿します。")
+    @app_commands.describe(file_format="ファイル形式", compress="gzipで圧縮する")
+    @app_commands.choices(file_format=[
+        app_commands.Choice(name="CSV", value="csv"),
+        app_commands.Choice(name="JSONL", value="jsonl"),
+    ])
+    @app_commands.default_permissions(administrator=True)
+    @app_commands.checks.has_permissions(administrator=True)
+    async def rs_export(self, interaction: discord.Interaction, file_format: str = "csv", compress: bool = False):
+        guild_id = interaction.guild_id
+        config = self.store.get_guild(guild_id)
+        if config is None:
+            await interaction.response.send_message("❌ まず `/rs-event-setup` を実行してください。", ephemeral=True)
+            return
+        admin_channel = interaction.guild.get_channel(config.admin_channel or 0)
+        if admin_channel is None:
+            await interaction.response.send_message("❌ 管理チャンネルが見つかりません。`/rs-event-setup` を実行し直してください。", ephemeral=True)
+            return
+
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        team_of = team_lookup(await self.members.snapshot(interaction.guild), self.store.teams(guild_id))
+        rows = self.export_rows(self.store.export_entries(guild_id, ranked=True), team_of)
+        await post_export(interaction, admin_channel, "rs-entries", rows, EXPORT_FIELDS, file_format, compress)
+
+    @staticmethod
+    def export_rows(entries, team_of):
+        # executor 上で1行ずつ作る（ストアの共有の状態・接続には触らない）
+        for rank, (user_id, entry) in enumerate(entries, 1):
+            yield {
+                "rank": rank, "user_id": user_id, "name": entry.name,
+                "level": entry.level, "points": entry.points, "team": team_of(user_id),
+            }
 
 async def setup(bot):
     await bot.add_cog(RSEvent(bot))
 
 # ---------- UIクラス群 ----------
 
-class RSButtons(discord.ui.View):
-    def __init__(self, cog):
-        super().__init__(timeout=None)
-        self.cog = cog
-
-    @discord.ui.button(label="1️⃣", style=discord.ButtonStyle.primary)
-    async def one(self, interaction, button):
-        await self.cog.register_rs_entry(interaction, 1)
-
-    @discord.ui.button(label="2️⃣", style=discord.ButtonStyle.primary)
-    async def two(self, interaction, button):
-        await self.cog.register_rs_entry(interaction, 2)
-
-    @discord.ui.button(label="3️⃣", style=discord.ButtonStyle.primary)
-    async def three(self, interaction, button):
-        await self.cog.register_rs_entry(interaction, 3)
-
-    @discord.ui.button(label="4️⃣", style=discord.ButtonStyle.primary)
-    async def four(self, interaction, button):
-        await self.cog.register_rs_entry(interaction, 4)
-
-    @discord.ui.button(label="5️⃣", style=discord.ButtonStyle.primary)
-    async def five(self, interaction, button):
-        await self.cog.register_rs_entry(interaction, 5)
-
 class RSPointsModal(discord.ui.Modal, title="RSイベント：予想Ptsを入力"):
     def __init__(self, cog, guild_id, user_id, level):
         super().__init__()
@@ -182,18 +301,19 @@ class RSPointsModal(discord.ui.Modal, title="RSイベント：予想Ptsを入力
 
         member = interaction.user
         name = member.display_name
-        self.cog.data[self.guild_id]["entries"][self.user_id] = {
-            "name": name,
-            "level": self.level,
-            "points": pts
-        }
+        await self.cog.store.put_entry(self.guild_id, self.user_id, RSEntry(name, self.level, pts))
+        board = self.cog.leaderboard(self.guild_id)
+        board.update(self.user_id, pts, self.level)
 
         # 共通ロールを付与
-        common_id = self.cog.data[self.guild_id].get("common_role")
+        config = self.cog.store.get_guild(self.guild_id)
+        common_id = config.common_role if config else None
         if common_id:
             role = interaction.guild.get_role(common_id)
             if role:
                 await member.add_roles(role)
 
-        self.cog.save_data()
-        await interaction.response.send_message(f"✅ {pts:,} pts を登録しました！", ephemeral=True)
+        await interaction.response.send_message(
+            f"✅ {pts:,} pts を登録しました！（現在の順位: {board.rank(self.user_id)} / {len(board)} 位）",
+            ephemeral=True
+        )
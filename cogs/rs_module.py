@@ -2,17 +2,39 @@ import discord
 from discord.ext import commands
 from discord import app_commands
 
-class RSEvent(commands.Cog):
+from utils.instrument import defer_policy
+from utils.leaderboard import Leaderboard
+from utils.members import get_member_resolver
+from utils.models import RSEntry
+from utils.paginator import PageSnapshot, PaginatedEmbedView
+from utils.roles import get_role_resolver
+from utils.router import entry_view, get_router
+from utils.signups import SignupIndex
+
+RS_LABELS = ["1️⃣", "2️⃣", "3️⃣", "4️⃣", "5️⃣"]
+
+class RSSignup(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.rs_data = {}  # {guild_id: {button_number: [member_ids]}}
-        self.rs_points = {}  # {guild_id: {member_id: pts}}
+        self.rs_data = {}  # {guild_id: SignupIndex(ボタン番号ごとのメンバーID)}
+        self.rs_points = {}  # {guild_id: {member_id: RSEntry}}
         self.rs_role_name = "今月のRSイベントランナー"
+        self.leaderboards = {}  # {guild_id: Leaderboard}
+        self.roles = get_role_resolver(bot)
+        self.members = get_member_resolver(bot)
+        self.router = get_router(bot)
+
+    async def cog_load(self):
+        self.router.register("rs-signup", self.on_signup_button)
+
+    async def cog_unload(self):
+        self.router.unregister("rs-signup")
 
     # エントリーセットアップ
-    @app_commands.command(name="rs-event-setup", description="RSイベント用エントリーメッセージを送信します。")
+    @app_commands.command(name="rs-signup-setup", description="RSイベント用エントリーメッセージを送信します。")
     @commands.has_permissions(administrator=True)
-    async def rs_event_setup(self, interaction: discord.Interaction):
+    @defer_policy(ephemeral=False)
+    async def rs_signup_setup(self, interaction: discord.Interaction):
         embed = discord.Embed(
             title="💎 RSイベントサインアップ",
             description=(
@@ -29,7 +51,9 @@ class RSEvent(commands.Cog):
         )
         embed.set_footer(text="あなたの予想ポイントを選択してください。")
 
-        view = RSButtonView(self)
+        view = entry_view("rs-signup", interaction.guild_id, (
+            (i, label, discord.ButtonStyle.success) for i, label in enumerate(RS_LABELS)
+        ))
         await interaction.response.send_message(embed=embed, view=view)
         await interaction.followup.send("✅ RSエントリー画面を作成しました。", ephemeral=True)
 
@@ -37,58 +61,43 @@ class RSEvent(commands.Cog):
     @app_commands.command(name="rs-show", description="RSイベントの申告一覧を表示します。")
     @commands.has_permissions(administrator=True)
     async def rs_show(self, interaction: discord.Interaction):
-        guild_id = interaction.guild_id
-        if guild_id not in self.rs_points or len(self.rs_points[guild_id]) == 0:
+        guild = interaction.guild
+        board = self.leaderboards.get(guild.id)
+        if not board:
             await interaction.response.send_message("📭 まだエントリーがありません。", ephemeral=True)
             return
 
-        members_pts = self.rs_points[guild_id]
-        sorted_members = sorted(members_pts.items(), key=lambda x: x[1], reverse=True)
-
-        total_pts = sum(members_pts.values())
-        embed = discord.Embed(title="💫 RSイベント参加者リスト", color=discord.Color.purple())
-
-        rank_lines = []
-        for member_id, pts in sorted_members:
-            member = interaction.guild.get_member(member_id)
-            if member:
-                rank_lines.append(f"・{member.display_name} — **{pts:,} pts**")
-
-        embed.description = "\n".join(rank_lines)
-        embed.add_field(name="📊 参加者数", value=f"{len(sorted_members)} 名", inline=True)
-        embed.add_field(name="💎 合計Pts", value=f"{total_pts:,}", inline=True)
-
-        await interaction.response.send_message(embed=embed, ephemeral=True)
-
-# -------------------------------
-# RSボタンビュー
-# -------------------------------
-class RSButtonView(discord.ui.View):
-    def __init__(self, cog):
-        super().__init__(timeout=None)
-        self.cog = cog
-        for num in ["1️⃣", "2️⃣", "3️⃣", "4️⃣", "5️⃣"]:
-            self.add_item(RSButton(num))
-
-class RSButton(discord.ui.Button):
-    def __init__(self, label):
-        super().__init__(label=label, style=discord.ButtonStyle.success)
-
-    async def callback(self, interaction: discord.Interaction):
-        guild_id = interaction.guild_id
+        # 表示名はギルドのスナップショットから、表示するページの行だけ解決する
+        await self.members.snapshot(guild)
+        def format_row(rank, row):
+            member_id, pts = row
+            name = self.members.display_name(guild, member_id) or f"<@{member_id}>"
+            return f"{rank}. {name} — **{pts:,} pts**"
+
+        buckets = " / ".join(f"{label} {board.bucket(level)[0]}名" for level, label in enumerate(RS_LABELS, 1))
+        snapshot = PageSnapshot(
+            board,
+            format_row,
+            footer=f"📊 参加者数: {len(board)} 名 | 💎 合計Pts: {board.total:,} | {buckets}"
+        )
+        view = PaginatedEmbedView(snapshot, "💫 RSイベント参加者リスト", discord.Color.purple())
+        await view.send(interaction)
+
+    # -------------------------------
+    # RSボタン（ルーター経由）
+    # -------------------------------
+    @defer_policy(enabled=False)  # モーダルを返すので自動deferしない
+    async def on_signup_button(self, interaction: discord.Interaction, bucket):
         member = interaction.user
-        cog = self.view.cog
+
+        # pts入力（3秒以内に返す必要があるので、ロール付与より先に出す）
+        modal = RSPointModal(RS_LABELS[int(bucket)], self)
+        await interaction.response.send_modal(modal)
 
         # ロール付与
-        rs_role = discord.utils.get(interaction.guild.roles, name=cog.rs_role_name)
-        if rs_role is None:
-            rs_role = await interaction.guild.create_role(name=cog.rs_role_name)
+        rs_role = await self.roles.resolve(interaction.guild, self.rs_role_name)
         await member.add_roles(rs_role)
 
-        # pts入力
-        modal = RSPointModal(self.label, cog)
-        await interaction.response.send_modal(modal)
-
 class RSPointModal(discord.ui.Modal, title="RSイベントPTS申告"):
     pts_input = discord.ui.TextInput(label="あなたの予想PTSを入力してください", placeholder="例: 350000", required=True)
 
@@ -109,14 +118,20 @@ class RSPointModal(discord.ui.Modal, title="RSイベントPTS申告"):
 
         if guild_id not in self.cog.rs_points:
             self.cog.rs_points[guild_id] = {}
-        self.cog.rs_points[guild_id][member.id] = pts
+        level = RS_LABELS.index(self.label) + 1  # RSEvent と同じく 1〜5 の int で持つ
+        self.cog.rs_points[guild_id][member.id] = RSEntry(member.display_name, level, pts)
+        board = self.cog.leaderboards.setdefault(guild_id, Leaderboard())
+        board.update(member.id, pts, level)
 
         # ボタンごとの登録
         if guild_id not in self.cog.rs_data:
-            self.cog.rs_data[guild_id] = {num: [] for num in ["1️⃣", "2️⃣", "3️⃣", "4️⃣", "5️⃣"]}
-        self.cog.rs_data[guild_id][self.label].append(member.id)
+            self.cog.rs_data[guild_id] = SignupIndex(RS_LABELS)
+        self.cog.rs_data[guild_id].add(member.id, self.label)
 
-        await interaction.response.send_message(f"✅ {pts:,} pts を申告しました！", ephemeral=True)
+        await interaction.response.send_message(
+            f"✅ {pts:,} pts を申告しました！（現在の順位: {board.rank(member.id)} / {len(board)} 位）",
+            ephemeral=True
+        )
 
 async def setup(bot):
-    await bot.add_cog(RSEvent(bot))
+    await bot.add_cog(RSSignup(bot))
@@ -1,63 +1,108 @@
 import discord
-from discord.ext import commands, tasks
+from discord.ext import commands
 import asyncio
-import datetime
-import json
-import os
+import logging
+
+from utils.clock import SystemClock
+from utils.cluster import owns_guild
+from utils.cron import ScheduleExpressionError, compile_expression, legacy_expression, resolve_timezone
+from utils.dispatcher import Post, PostDispatcher, lag_percentiles
+from utils.models import Schedule
+from utils.schedule_engine import ScheduleEngine, next_fire
+from utils.store import open_schedule_store
 
 SCHEDULE_FILE = "data/schedules.json"
+DISPATCH_CONCURRENCY = 8
+CATCH_UP_WINDOW = 24 * 60 * 60  # 停止中に取りこぼした投稿は24時間以内のものだけ1回送る
+
+log = logging.getLogger(__name__)
 
 class Scheduler(commands.Cog):
-    def __init__(self, bot):
+    def __init__(self, bot, store=None, clock=None):
         self.bot = bot
-        self.load_schedules()
-        self.schedule_task.start()
-
-    def load_schedules(self):
-        if not os.path.exists(SCHEDULE_FILE):
-            self.schedules = {}
-            return
-        with open(SCHEDULE_FILE, "r", encoding="utf-8") as f:
-            self.schedules = json.load(f)
-
-    def save_schedules(self):
-        with open(SCHEDULE_FILE, "w", encoding="utf-8") as f:
-            json.dump(self.schedules, f, ensure_ascii=False, indent=4)
-
-    async def send_scheduled_message(self, guild_id, schedule_id, schedule_data):
-        channel = self.bot.get_channel(schedule_data["channel_id"])
-        if not channel:
-            return
-        content = schedule_data["message"]
-        await channel.send(content)
-        schedule_data["last_post"] = int(datetime.datetime.now().timestamp())
-        self.save_schedules()
-
-    @tasks.loop(minutes=1)
-    async def schedule_task(self):
-        now = datetime.datetime.now()
-        for guild_id, schedules in list(self.schedules.items()):
+        # 時計とストアは差し替えられる（benchmarks/scheduler_replay.py は仮想時計で再生する）
+        self.clock = clock or SystemClock()
+        self.store = store or open_schedule_store(SCHEDULE_FILE)
+        # クラスターでは担当シャードのギルドのスケジュールだけを動かす
+        self.schedules = {gid: s for gid, s in self.store.all().items() if owns_guild(bot, gid)}
+        self.timezones = self.store.timezones()
+        self.engine = ScheduleEngine()
+        self._wakeup = asyncio.Event()
+        self.schedule_task = None
+        self.dispatcher = PostDispatcher(concurrency=DISPATCH_CONCURRENCY, clock=self.clock.time)
+        self._batches = set()
+
+        now = self.clock.time()
+        for guild_id, schedules in self.schedules.items():
             for sid, data in schedules.items():
-                if data["type"] == "daily":
-                    target = datetime.time.fromisoformat(data["time"])
-                    if now.hour == target.hour and now.minute == target.minute:
-                        await self.send_scheduled_message(guild_id, sid, data)
-
-                elif data["type"] == "weekly":
-                    target = datetime.time.fromisoformat(data["time"])
-                    if now.weekday() == data["weekday"] and now.hour == target.hour and now.minute == target.minute:
-                        await self.send_scheduled_message(guild_id, sid, data)
-
-                elif data["type"] == "monthly":
-                    target = datetime.time.fromisoformat(data["time"])
-                    if now.day == data["day"] and now.hour == target.hour and now.minute == target.minute:
-                        await self.send_scheduled_message(guild_id, sid, data)
-
-                elif data["type"] == "interval":
-                    last = datetime.datetime.fromtimestamp(data.get("last_post", 0))
-                    delta_days = (now - last).days
-                    if delta_days >= data["interval_days"]:
-                        await self.send_scheduled_message(guild_id, sid, data)
+                last = data.last_post or data.created
+                after = last if last and now - last < CATCH_UP_WINDOW else now
+                self.arm(guild_id, sid, data, after)
+
+    async def cog_load(self):
+        self.schedule_task = asyncio.create_task(self.run_schedules())
+
+    async def cog_unload(self):
+        if self.schedule_task is not None:
+            self.schedule_task.cancel()
+        if self._batches:
+            await asyncio.wait(self._batches, timeout=10)
+        await self.store.close()
+
+    # ---------- 発火時刻の管理 ----------
+    def arm(self, guild_id, schedule_id, schedule_data, after=None):
+        key = (guild_id, schedule_id)
+        fire_at = next_fire(schedule_data, self.clock.time() if after is None else after, self.timezones.get(guild_id))
+        if fire_at is None:
+            self.engine.remove(key)
+            return
+        earliest = self.engine.peek()
+        self.engine.add(key, fire_at)
+        if earliest is None or fire_at < earliest:
+            self._wakeup.set()
+
+    def disarm(self, guild_id, schedule_id):
+        self.engine.remove((guild_id, schedule_id))
+
+    async def send_batch(self, posts):
+        results = await self.dispatcher.dispatch(posts)
+
+        # 前回投稿時刻はtickごとにまとめて記録する
+        touched = []
+        for (guild_id, sid), sent_at in results:
+            data = self.schedules.get(guild_id, {}).get(sid)
+            if sent_at is None or data is None:
+                continue
+            data.last_post = int(sent_at)
+            touched.append((guild_id, sid, data.last_post))
+        if touched:
+            await self.store.touch_many(touched)
+
+    async def run_schedules(self):
+        await self.bot.wait_until_ready()
+        while True:
+            # 最も早い発火時刻まで眠る（追加・変更があれば起こされる）
+            deadline = self.engine.peek()
+            timeout = None if deadline is None else max(0.0, deadline - self.clock.time())
+            self._wakeup.clear()
+            await self.clock.wait(self._wakeup, timeout)
+
+            now = self.clock.time()
+            posts = []
+            for (guild_id, sid), fire_at in self.engine.pop_due(now):
+                data = self.schedules.get(guild_id, {}).get(sid)
+                if data is None:
+                    continue
+                self.arm(guild_id, sid, data, max(now, fire_at))
+                channel = self.bot.get_channel(data.channel_id)
+                if channel is not None:
+                    posts.append(Post((guild_id, sid), channel, data.message, fire_at))
+
+            # 送信は別タスクで流し、次の発火を待つループを止めない
+            if posts:
+                task = asyncio.create_task(self.send_batch(posts))
+                self._batches.add(task)
+                task.add_done_callback(self._batches.discard)
 
     @commands.Cog.listener()
     async def on_ready(self):
@@ -65,53 +110,85 @@ class Scheduler(commands.Cog):
 
     @commands.hybrid_command(name="schedule_add", description="新しい定期投稿を追加します。")
     @commands.has_permissions(administrator=True)
-    async def schedule_add(self, ctx, schedule_type: str, channel: discord.TextChannel, *, message: str):
-        """使用例: /schedule_add daily #general おはようございます！"""
-        guild_id = str(ctx.guild.id)
-        if guild_id not in self.schedules:
-            self.schedules[guild_id] = {}
-
-        sid = str(len(self.schedules[guild_id]) + 1)
-        self.schedules[guild_id][sid] = {
-            "type": schedule_type,
-            "channel_id": channel.id,
-            "message": message,
-            "created": int(datetime.datetime.now().timestamp())
-        }
-        self.save_schedules()
-        await ctx.send(f"🆕 定期投稿を追加しました: `{schedule_type}` → {channel.mention}")
+    async def schedule_add(self, ctx, expression: str, channel: discord.TextChannel, *, message: str):
+        """使用例: /schedule_add "daily 09:00" #general おはようございます！
+
+        expression には cron形式（"30 9 * * 1-5"）か短縮形
+        （"daily 09:00" / "weekly mon 09:00" / "monthly 15 09:00" / "interval 3 09:00"）を指定できます。
+        末尾に "JST" などのタイムゾーンを付けられます。
+        """
+        guild_id = ctx.guild.id
+        try:
+            compile_expression(expression, self.timezones.get(guild_id))
+        except ScheduleExpressionError as e:
+            await ctx.send(f"❌ スケジュール式が正しくありません: {e}")
+            return
+
+        sid = self.store.next_id(guild_id)
+        schedule = Schedule(channel.id, message, expr=expression, created=int(self.clock.time()))
+        await self.store.put(guild_id, sid, schedule)
+        self.schedules.setdefault(guild_id, {})[sid] = schedule
+        self.arm(guild_id, sid, schedule)
+
+        fire_at = self.engine.fire_time((guild_id, sid))
+        next_text = f"<t:{int(fire_at)}:F>" if fire_at else "なし"
+        await ctx.send(f"🆕 定期投稿を追加しました: `{expression}` → {channel.mention}（次回: {next_text}）")
+
+    @commands.hybrid_command(name="schedule_timezone", description="定期投稿に使うサーバーのタイムゾーンを設定します。")
+    @commands.has_permissions(administrator=True)
+    async def schedule_timezone(self, ctx, timezone: str):
+        """使用例: /schedule_timezone Asia/Tokyo"""
+        guild_id = ctx.guild.id
+        try:
+            resolve_timezone(timezone)
+        except ScheduleExpressionError as e:
+            await ctx.send(f"❌ {e}")
+            return
+
+        await self.store.set_timezone(guild_id, timezone)
+        self.timezones[guild_id] = timezone
+        for sid, data in self.schedules.get(guild_id, {}).items():
+            self.arm(guild_id, sid, data)
+        await ctx.send(f"🕘 タイムゾーンを `{timezone}` に設定しました。")
 
     @commands.hybrid_command(name="schedule_list", description="登録済みの定期投稿を一覧表示します。")
     @commands.has_permissions(administrator=True)
     async def schedule_list(self, ctx):
-        guild_id = str(ctx.guild.id)
+        guild_id = ctx.guild.id
         if guild_id not in self.schedules or not self.schedules[guild_id]:
             await ctx.send("📭 登録済みのスケジュールはありません。")
             return
 
         embed = discord.Embed(title="🗓 登録済みスケジュール一覧", color=discord.Color.green())
         for sid, s in self.schedules[guild_id].items():
-            t = s["type"]
-            ts = s.get("last_post", "未実行")
+            legacy = s.extra or {}
+            t = s.expr or legacy_expression(legacy) or f"{legacy.get('type')}（設定不備）"
+            ts = "未実行" if s.last_post is None else s.last_post
             if isinstance(ts, int):
                 ts = f"<t:{ts}:F>"
+            fire_at = self.engine.fire_time((guild_id, sid))
+            next_text = f"<t:{int(fire_at)}:F>" if fire_at else "なし"
             embed.add_field(
                 name=f"ID {sid} | {t}",
-                value=f"投稿先: <#{s['channel_id']}>\n内容: {s['message'][:50]}...\n前回投稿: {ts}",
+                value=f"投稿先: <#{s.channel_id}>\n内容: {s.message[:50]}...\n前回投稿: {ts}\n次回投稿: {next_text}",
                 inline=False
             )
+        lag = lag_percentiles()
+        if lag is not None:
+            embed.set_footer(text=f"投稿遅延 p50: {lag[0]:.2f}秒 / p99: {lag[1]:.2f}秒")
         await ctx.send(embed=embed)
 
     @commands.hybrid_command(name="schedule_remove", description="指定した定期投稿を削除します。")
     @commands.has_permissions(administrator=True)
     async def schedule_remove(self, ctx, schedule_id: str):
-        guild_id = str(ctx.guild.id)
+        guild_id = ctx.guild.id
         if guild_id not in self.schedules or schedule_id not in self.schedules[guild_id]:
             await ctx.send("❌ 該当するスケジュールが見つかりません。")
             return
 
-        del self.schedules[guild_id][schedule_id]
-        self.save_schedules()
+        await self.store.delete(guild_id, schedule_id)
+        self.schedules[guild_id].pop(schedule_id, None)
+        self.disarm(guild_id, schedule_id)
         await ctx.send(f"🗑 ID `{schedule_id}` のスケジュールを削除しました。")
 
 async def setup(bot):
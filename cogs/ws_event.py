@@ -1,82 +1,114 @@
 import discord
 from discord.ext import commands
 from discord import app_commands, ui
-import json
-import os
+
+from utils.event_setup import reconcile_channels
+from utils.export import post_export, team_lookup
+from utils.members import get_member_resolver
+from utils.models import GuildEventConfig, WSEntry
+from utils.role_jobs import get_role_jobs
+from utils.router import entry_view, get_router
+from utils.store import open_event_store
+from utils.team_balance import ACTIVITY_ICONS, ACTIVITY_LEVELS, CAPTAIN, balance_teams
 
 DATA_FILE = "data/ws_data.json"
+ENTRY_INDEX_SIZE = 10  # ギルドごとに覚えておくエントリー投稿の数
+SETUP_CHANNELS = {"entry_channel": "ws-entry", "admin_channel": "ws-admin"}
+EXPORT_FIELDS = ("user_id", "name", "activity", "team")
 
 class WSEvent(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.data = self.load_data()
-
-    def load_data(self):
-        if not os.path.exists(DATA_FILE):
-            return {}
-        with open(DATA_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-
-    def save_data(self):
-        with open(DATA_FILE, "w", encoding="utf-8") as f:
-            json.dump(self.data, f, ensure_ascii=False, indent=4)
+        self.store = open_event_store("ws", DATA_FILE)
+        self.role_jobs = get_role_jobs(bot)
+        self.members = get_member_resolver(bot)
+        self.router = get_router(bot)
+
+    async def cog_load(self):
+        self.router.register("ws", self.on_entry_button)
+
+    async def cog_unload(self):
+        self.router.unregister("ws")
+        await self.store.close()
+        await self.role_jobs.flush()
+
+    # ---------- ロール作り直しの反映 ----------
+    @commands.Cog.listener()
+    async def on_role_replaced(self, guild, old_id, new_role):
+        data = self.store.get_guild(guild.id)
+        if data is None:
+            return
+        if data.common_role == old_id:
+            await self.store.update_guild(guild.id, common_role=new_role.id)
+        for name, role_id in self.store.teams(guild.id).items():
+            if role_id == old_id:
+                await self.store.put_team(guild.id, name, new_role.id)
 
     # ---------- WS初期設定 ----------
     @app_commands.command(name="ws-setup", description="WSイベント用のチャンネルを設定します。")
     @app_commands.describe(category="Bot用カテゴリを選択してください。")
     async def ws_setup(self, interaction: discord.Interaction, category: discord.CategoryChannel):
-        guild_id = str(interaction.guild_id)
-
-        # 2つのチャンネルを自動生成
-        entry_channel = await category.create_text_channel("ws-entry")
-        admin_channel = await category.create_text_channel("ws-admin")
-
-        self.data[guild_id] = {
-            "entry_channel": entry_channel.id,
-            "admin_channel": admin_channel.id,
-            "common_role": None,
-            "teams": {},
-            "entries": {}
-        }
-        self.save_data()
+        # 2つのチャンネルを揃える（無いものだけ並列で作成）
+        channels, created = await self.reconcile(category)
+        entry_channel = channels["entry_channel"]
+        admin_channel = channels["admin_channel"]
 
+        status = f"作成: {', '.join(created)}" if created else "既存のチャンネルをそのまま使います。"
         embed = discord.Embed(
             title="✅ WSイベントセットアップ完了",
-            description=f"{entry_channel.mention} と {admin_channel.mention} を作成しました。\n次に `/ws-commonrole` や `/ws-team-add` で設定を行ってください。",
+            description=f"{entry_channel.mention} と {admin_channel.mention} を設定しました（{status}）。\n次に `/ws-commonrole` や `/ws-team-add` で設定を行ってください。",
             color=discord.Color.green()
         )
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
+    async def reconcile(self, category):
+        """チャンネルを揃えて設定を更新する。既存のエントリー・チームはそのまま残す。"""
+        guild_id = category.guild.id
+        config = self.store.get_guild(guild_id)
+        channels, created = await reconcile_channels(category, SETUP_CHANNELS, config)
+        ids = {key: channel.id for key, channel in channels.items()}
+        if config is None:
+            await self.store.reset_guild(guild_id, GuildEventConfig(**ids))
+        else:
+            await self.store.update_guild(guild_id, **ids)
+        return channels, created
+
     # ---------- 共通ロール設定 ----------
     @app_commands.command(name="ws-commonrole", description="共通ロール（今週のWSパイロット）を設定します。")
     async def ws_commonrole(self, interaction: discord.Interaction, role: discord.Role):
-        guild_id = str(interaction.guild_id)
-        self.data[guild_id]["common_role"] = role.id
-        self.save_data()
+        guild_id = interaction.guild_id
+        if self.store.get_guild(guild_id) is None:
+            await interaction.response.send_message("❌ まず `/ws-setup` を実行してください。", ephemeral=True)
+            return
+
+        await self.store.update_guild(guild_id, common_role=role.id)
         await interaction.response.send_message(f"🛰️ 共通ロールを {role.mention} に設定しました。", ephemeral=True)
 
     # ---------- チーム追加 ----------
     @app_commands.command(name="ws-team-add", description="チームを追加します（最大8まで）。")
     async def ws_team_add(self, interaction: discord.Interaction, team_name: str, role: discord.Role):
-        guild_id = str(interaction.guild_id)
-        if len(self.data[guild_id]["teams"]) >= 8:
+        guild_id = interaction.guild_id
+        if self.store.get_guild(guild_id) is None:
+            await interaction.response.send_message("❌ まず `/ws-setup` を実行してください。", ephemeral=True)
+            return
+
+        teams = self.store.teams(guild_id)
+        if len(teams) >= 8 and team_name not in teams:
             await interaction.response.send_message("⚠️ チームは最大8つまでです。", ephemeral=True)
             return
 
-        self.data[guild_id]["teams"][team_name] = role.id
-        self.save_data()
+        await self.store.put_team(guild_id, team_name, role.id)
         await interaction.response.send_message(f"✅ チーム `{team_name}` を追加しました。", ephemeral=True)
 
     # ---------- エントリーメッセージ送信 ----------
     @app_commands.command(name="ws-entrypost", description="エントリーメッセージを投稿します。")
     async def ws_entrypost(self, interaction: discord.Interaction):
-        guild_id = str(interaction.guild_id)
-        data = self.data.get(guild_id)
+        data = self.store.get_guild(interaction.guild_id)
         if not data:
             await interaction.response.send_message("❌ まず `/ws-setup` を実行してください。", ephemeral=True)
             return
 
-        entry_channel = interaction.guild.get_channel(data["entry_channel"])
+        entry_channel = interaction.guild.get_channel(data.entry_channel)
         if not entry_channel:
             await interaction.response.send_message("❌ エントリーチャンネルが見つかりません。", ephemeral=True)
             return
@@ -92,53 +124,127 @@ class WSEvent(commands.Cog):
             ),
             color=discord.Color.blurple()
         )
-        view = WSButtons(self)
-        await entry_channel.send(embed=embed, view=view)
+        view = entry_view("ws", interaction.guild_id, (
+            (i, ACTIVITY_ICONS[level], discord.ButtonStyle.primary if level == CAPTAIN else discord.ButtonStyle.success)
+            for i, level in enumerate(ACTIVITY_LEVELS)
+        ))
+        message = await entry_channel.send(embed=embed, view=view)
+        ids = (data.entry_messages or [])[-(ENTRY_INDEX_SIZE - 1):]
+        await self.store.update_guild(interaction.guild_id, entry_messages=ids + [message.id])
         await interaction.response.send_message("✅ エントリーメッセージを送信しました。", ephemeral=True)
 
+    # ---------- エントリーボタン（ルーター経由） ----------
+    async def on_entry_button(self, interaction: discord.Interaction, bucket):
+        data = self.store.get_guild(interaction.guild_id)
+        if interaction.message is None or data is None or interaction.message.id not in (data.entry_messages or ()):
+            # 索引に無い投稿（ギルド設定を作り直す前のもの・古くなったもの）
+            await interaction.response.send_message("⚠️ この募集は終了しています。最新のエントリー投稿から登録してください。", ephemeral=True)
+            return
+        await self.register_entry(interaction, ACTIVITY_LEVELS[int(bucket)])
+
     # ---------- エントリー登録 ----------
-    async def register_entry(self, interaction: discord.Interaction, activity_level: str):
-        guild_id = str(interaction.guild_id)
-        user_id = str(interaction.user.id)
+    async def register_entry(self, interaction: discord.Interaction, activity_level):
+        guild_id = interaction.guild_id
+        user_id = interaction.user.id
 
-        if guild_id not in self.data:
+        data = self.store.get_guild(guild_id)
+        if data is None:
             await interaction.response.send_message("❌ イベントデータがありません。", ephemeral=True)
             return
 
-        if user_id in self.data[guild_id]["entries"]:
-            old = self.data[guild_id]["entries"][user_id]["activity"]
-            self.data[guild_id]["entries"][user_id]["activity"] = activity_level
+        entry = self.store.get_entry(guild_id, user_id)
+        if entry is not None:
+            old = entry.activity
+            entry.activity = activity_level
             msg = f"🔁 更新しました。以前: {old} → 現在: {activity_level}"
         else:
-            self.data[guild_id]["entries"][user_id] = {
-                "name": interaction.user.display_name,
-                "activity": activity_level
-            }
+            entry = WSEntry(interaction.user.display_name, activity_level)
             msg = f"✅ 登録しました: {activity_level}"
+        await self.store.put_entry(guild_id, user_id, entry)
 
         # 共通ロール付与
-        common_id = self.data[guild_id].get("common_role")
+        common_id = data.common_role
         if common_id:
             role = interaction.guild.get_role(common_id)
             if role:
                 await interaction.user.add_roles(role)
 
-        self.save_data()
         await interaction.response.send_message(msg, ephemeral=True)
 
+    # ---------- チーム自動編成 ----------
+    @app_commands.command(name="ws-team-build", description="エントリーをチームに自動で振り分けます（確認後に反映）。")
+    @app_commands.default_permissions(administrator=True)
+    @app_commands.checks.has_permissions(administrator=True)
+    async def ws_team_build(self, interaction: discord.Interaction):
+        guild_id = interaction.guild_id
+        guild = interaction.guild
+        if self.store.get_guild(guild_id) is None:
+            await interaction.response.send_message("❌ まず `/ws-setup` を実行してください。", ephemeral=True)
+            return
+
+        team_roles = {}
+        for name, role_id in self.store.teams(guild_id).items():
+            role = guild.get_role(role_id)
+            if role:
+                team_roles[name] = role
+        if not team_roles:
+            await interaction.response.send_message("❌ `/ws-team-add` でチームを登録してください。", ephemeral=True)
+            return
+
+        entries = [(uid, e.activity) for uid, e in self.store.entries(guild_id).items()]
+        if not entries:
+            await interaction.response.send_message("❌ エントリーがありません。", ephemeral=True)
+            return
+
+        plan = balance_teams(entries, list(team_roles))
+
+        # 既に正しいロールを持っている人は飛ばし、別チームのロールは外す
+        team_role_ids = {role.id for role in team_roles.values()}
+        members = await self.members.snapshot(guild)
+        operations = []
+        for uid, team in plan.assignment().items():
+            target = team_roles[team].id
+            current = set(members.roles_of(uid)) & team_role_ids
+            if target not in current:
+                operations.append((uid, target, "add"))
+            operations.extend((uid, rid, "remove") for rid in current - {target})
+
+        embed = discord.Embed(
+            title="🧮 チーム編成プレビュー（未反映）",
+            description=f"エントリー {len(entries)} 人 / {len(team_roles)} チーム\nロール変更 {len(operations)} 件",
+            color=discord.Color.blurple()
+        )
+        for team, members in plan.teams.items():
+            levels = plan.levels[team]
+            mix = " ".join(f"{ACTIVITY_ICONS[lv]}{levels[lv]}" for lv in ACTIVITY_LEVELS)
+            embed.add_field(name=f"{team}（{len(members)}人）", value=f"{team_roles[team].mention}\n{mix}", inline=True)
+        missing = plan.missing_captains()
+        if missing:
+            embed.add_field(name="⚠️ キャプテン不足", value="、".join(missing), inline=False)
+
+        if not operations:
+            embed.set_footer(text="変更はありません。")
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+            return
+        view = WSTeamBuildView(self, interaction.user, operations)
+        await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
+
     # ---------- All Delete ----------
     @app_commands.command(name="ws-all-delete", description="全員のチームロール・共通ロールをリセットします。")
     @commands.has_permissions(administrator=True)
     async def ws_all_delete(self, interaction: discord.Interaction):
-        guild_id = str(interaction.guild_id)
-        data = self.data[guild_id]
+        guild_id = interaction.guild_id
+        data = self.store.get_guild(guild_id)
         guild = interaction.guild
+        if data is None:
+            await interaction.response.send_message("❌ まず `/ws-setup` を実行してください。", ephemeral=True)
+            return
 
         roles = []
-        if data.get("common_role"):
-            r = guild.get_role(data["common_role"])
+        if data.common_role:
+            r = guild.get_role(data.common_role)
             if r: roles.append(r)
-        for rid in data["teams"].values():
+        for rid in self.store.teams(guild_id).values():
             r = guild.get_role(rid)
             if r: roles.append(r)
 
@@ -149,35 +255,65 @@ class WSEvent(commands.Cog):
         view = WSResetConfirmView(roles, self, interaction.user)
         await interaction.response.send_message("🗑️ リセットするロールを選んでください：", view=view, ephemeral=True)
 
+    # ---------- エクスポート ----------
+    @app_commands.command(name="ws-export", description="WSイベントのエントリーと所属チームをファイルにして管理チャンネルに投稿します。")
+    @app_commands.describe(file_format="ファイル形式", compress="gzipで圧縮する")
+    @app_commands.choices(file_format=[
+        app_commands.Choice(name="CSV", value="csv"),
+        app_commands.Choice(name="JSONL", value="jsonl"),
+    ])
+    @app_commands.default_permissions(administrator=True)
+    @app_commands.checks.has_permissions(administrator=True)
+    async def ws_export(self, interaction: discord.Interaction, file_format: str = "csv", compress: bool = False):
+        guild_id = interaction.guild_id
+        config = self.store.get_guild(guild_id)
+        if config is None:
+            await interaction.response.send_message("❌ まず `/ws-setup` を実行してください。", ephemeral=True)
+            return
+        admin_channel = interaction.guild.get_channel(config.admin_channel or 0)
+        if admin_channel is None:
+            await interaction.response.send_message("❌ 管理チャンネルが見つかりません。`/ws-setup` を実行し直してください。", ephemeral=True)
+            return
+
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        team_of = team_lookup(await self.members.snapshot(interaction.guild), self.store.teams(guild_id))
+        rows = self.export_rows(self.store.export_entries(guild_id), team_of)
+        await post_export(interaction, admin_channel, "ws-entries", rows, EXPORT_FIELDS, file_format, compress)
+
+    @staticmethod
+    def export_rows(entries, team_of):
+        # executor 上で1行ずつ作る（ストアの共有の状態・接続には触らない）
+        for user_id, entry in entries:
+            yield {"user_id": user_id, "name": entry.name, "activity": entry.activity, "team": team_of(user_id)}
+
 async def setup(bot):
     await bot.add_cog(WSEvent(bot))
 
 # ---------- UIクラス群 ----------
 
-class WSButtons(discord.ui.View):
-    def __init__(self, cog):
-        super().__init__(timeout=None)
+class WSTeamBuildView(discord.ui.View):
+    def __init__(self, cog, user, operations):
+        super().__init__(timeout=120)
         self.cog = cog
+        self.user = user
+        self.operations = operations
 
-    @discord.ui.button(label="⭐️", style=discord.ButtonStyle.primary)
-    async def star(self, interaction, button):
-        await self.cog.register_entry(interaction, "⭐️キャプテン")
-
-    @discord.ui.button(label="1️⃣", style=discord.ButtonStyle.success)
-    async def one(self, interaction, button):
-        await self.cog.register_entry(interaction, "スーパーマン")
-
-    @discord.ui.button(label="2️⃣", style=discord.ButtonStyle.success)
-    async def two(self, interaction, button):
-        await self.cog.register_entry(interaction, "アクティブ")
+    async def interaction_check(self, interaction):
+        if interaction.user != self.user:
+            await interaction.response.send_message("❌ あなたはこの操作を実行できません。", ephemeral=True)
+            return False
+        return True
 
-    @discord.ui.button(label="3️⃣", style=discord.ButtonStyle.success)
-    async def three(self, interaction, button):
-        await self.cog.register_entry(interaction, "カジュアル")
+    @discord.ui.button(label="✅ 反映する", style=discord.ButtonStyle.success)
+    async def confirm(self, interaction, button):
+        self.stop()
+        await interaction.response.edit_message(view=None)
+        await self.cog.role_jobs.submit_batch(interaction, "チーム編成", self.operations)
 
-    @discord.ui.button(label="4️⃣", style=discord.ButtonStyle.success)
-    async def four(self, interaction, button):
-        await self.cog.register_entry(interaction, "リラックス")
+    @discord.ui.button(label="キャンセル", style=discord.ButtonStyle.secondary)
+    async def cancel(self, interaction, button):
+        self.stop()
+        await interaction.response.edit_message(content="キャンセルしました。", embed=None, view=None)
 
 class WSResetConfirmView(discord.ui.View):
     def __init__(self, roles, cog, user):
@@ -202,8 +338,7 @@ class WSRoleSelectButton(discord.ui.Button):
         if interaction.user != self.parent_view.user:
             await interaction.response.send_message("❌ あなたはこの操作を実行できません。", ephemeral=True)
             return
-        removed = 0
-        for m in self.role.members:
-            await m.remove_roles(self.role)
-            removed += 1
-        await interaction.response.send_message(f"🧹 {self.role.name} から {removed} 人を削除しました。", ephemeral=True)
+
+        # 人数が多いと3秒以内に終わらないので、deferしてジョブに任せる
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        await self.parent_view.cog.role_jobs.submit(interaction, self.role)
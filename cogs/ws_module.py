@@ -2,17 +2,36 @@ import discord
 from discord.ext import commands
 from discord import app_commands
 
-class WSEvent(commands.Cog):
+from utils.instrument import defer_policy
+from utils.role_jobs import get_role_jobs
+from utils.roles import get_role_resolver
+from utils.router import entry_view, get_router
+from utils.signups import SignupIndex
+
+WS_LABELS = ["⭐️", "1️⃣", "2️⃣", "3️⃣", "4️⃣"]
+
+class WSSignup(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.team_data = {}  # {guild_id: {button_number: [member_ids]}}
+        self.team_data = {}  # {guild_id: SignupIndex(ボタン番号ごとのメンバーID)}
         self.ws_role_name = "今週のWSパイロット"
         self.max_team_members = 10
         self.team_roles = {}  # チーム名→Roleオブジェクト
+        self.role_jobs = get_role_jobs(bot)
+        self.roles = get_role_resolver(bot)
+        self.router = get_router(bot)
+
+    async def cog_load(self):
+        self.router.register("ws-signup", self.on_signup_button)
+
+    async def cog_unload(self):
+        self.router.unregister("ws-signup")
+        await self.role_jobs.flush()
 
     # WSのサインアップメッセージを送信
     @app_commands.command(name="ws-entry-setup", description="WSイベント用エントリーメッセージを送信します。")
     @commands.has_permissions(administrator=True)
+    @defer_policy(ephemeral=False)
     async def ws_entry_setup(self, interaction: discord.Interaction):
         embed = discord.Embed(
             title="🪐 WSサインアップ",
@@ -28,14 +47,16 @@ class WSEvent(commands.Cog):
         )
         embed.set_footer(text="参加したい番号を押してください。")
 
-        view = WSButtonView(self)
+        view = entry_view("ws-signup", interaction.guild_id, (
+            (i, label, discord.ButtonStyle.primary) for i, label in enumerate(WS_LABELS)
+        ))
         await interaction.response.send_message(embed=embed, view=view)
         await interaction.followup.send("✅ エントリーメッセージを作成しました。", ephemeral=True)
 
     # WS管理用：全ロールリセット
-    @app_commands.command(name="ws-all-delete", description="WS関連ロールを全てリセットします。")
+    @app_commands.command(name="ws-signup-reset", description="WS関連ロールを全てリセットします。")
     @commands.has_permissions(administrator=True)
-    async def ws_all_delete(self, interaction: discord.Interaction):
+    async def ws_signup_reset(self, interaction: discord.Interaction):
         guild = interaction.guild
         roles_to_reset = [r for r in guild.roles if r.name == self.ws_role_name or r.name in self.team_roles]
 
@@ -49,52 +70,37 @@ class WSEvent(commands.Cog):
         view.add_item(select)
 
         async def confirm(interaction_select: discord.Interaction):
-            selected_ids = select.values
-            count = 0
-            for role_id in selected_ids:
+            # 解除はバックグラウンドのジョブで行い、進捗はfollowupで表示する
+            await interaction_select.response.defer(ephemeral=True, thinking=True)
+            for role_id in select.values:
                 role = guild.get_role(int(role_id))
-                for member in role.members:
-                    await member.remove_roles(role)
-                    count += 1
-            await interaction_select.response.send_message(f"✅ {count}名を対象ロールから削除しました。", ephemeral=True)
+                if role is not None:
+                    await self.role_jobs.submit(interaction_select, role)
 
         select.callback = confirm
         await interaction.response.send_message("リセットするロールを選択してください。", view=view, ephemeral=True)
 
-# -------------------------------
-# ボタン操作クラス
-# -------------------------------
-class WSButtonView(discord.ui.View):
-    def __init__(self, cog):
-        super().__init__(timeout=None)
-        self.cog = cog
-
-        self.add_item(WSButton("⭐️", "captain"))
-        for num in ["1️⃣", "2️⃣", "3️⃣", "4️⃣"]:
-            self.add_item(WSButton(num, num))
-
-class WSButton(discord.ui.Button):
-    def __init__(self, label, value):
-        super().__init__(label=label, style=discord.ButtonStyle.primary)
-        self.value = value
-
-    async def callback(self, interaction: discord.Interaction):
+    # -------------------------------
+    # ボタン操作（ルーター経由）
+    # -------------------------------
+    async def on_signup_button(self, interaction: discord.Interaction, bucket):
         guild_id = interaction.guild_id
         member = interaction.user
-        cog = self.view.cog
+        label = WS_LABELS[int(bucket)]
 
         # ロール付与
-        ws_role = discord.utils.get(interaction.guild.roles, name=cog.ws_role_name)
-        if ws_role is None:
-            ws_role = await interaction.guild.create_role(name=cog.ws_role_name)
+        ws_role = await self.roles.resolve(interaction.guild, self.ws_role_name)
         await member.add_roles(ws_role)
 
         # サインアップ登録
-        if guild_id not in cog.team_data:
-            cog.team_data[guild_id] = {num: [] for num in ["⭐️", "1️⃣", "2️⃣", "3️⃣", "4️⃣"]}
-        cog.team_data[guild_id][self.label].append(member.id)
+        if guild_id not in self.team_data:
+            self.team_data[guild_id] = SignupIndex(WS_LABELS)
+        previous = self.team_data[guild_id].add(member.id, label)
 
-        await interaction.response.send_message(f"{member.display_name} さんを {self.label} チームに登録しました！", ephemeral=True)
+        if previous and previous != label:
+            await interaction.response.send_message(f"🔁 {member.display_name} さんを {previous} から {label} チームに移動しました！", ephemeral=True)
+            return
+        await interaction.response.send_message(f"{member.display_name} さんを {label} チームに登録しました！", ephemeral=True)
 
 async def setup(bot):
-    await bot.add_cog(WSEvent(bot))
+    await bot.add_cog(WSSignup(bot))
@@ -1,60 +1,68 @@
 import discord
 from discord.ext import commands
 import os
-import asyncio
 from dotenv import load_dotenv
-from flask import Flask
-from threading import Thread
+
+from utils import cluster
+from utils.instrument import install as install_instrumentation
+from utils.members import INTENTS_PROFILE, client_options
+from utils.startup import EXTENSIONS, PhaseTimer, check_manifest, load_extensions, sync_commands
+from utils.web import HealthServer
 
 # .envファイルからTOKENを読み込む（ローカル動作用）
 load_dotenv()
 TOKEN = os.getenv("DISCORD_TOKEN")
 
-# Bot設定
-intents = discord.Intents.all()
-bot = commands.Bot(command_prefix="/", intents=intents)
+# Bot設定（INTENTS_PROFILE=minimal: presence・メッセージ本文なし、メンバーは必要なときに取得 / full: 全部受け取る）
+# クラスターのワーカーとして起動された場合は、担当シャードだけを持つ AutoShardedBot にする（utils/cluster.py）
+if cluster.SHARD_IDS is not None:
+    bot = commands.AutoShardedBot(
+        command_prefix="/", shard_ids=cluster.SHARD_IDS, shard_count=cluster.SHARD_COUNT,
+        **client_options(INTENTS_PROFILE)
+    )
+else:
+    bot = commands.Bot(command_prefix="/", **client_options(INTENTS_PROFILE))
+
+# 開発用: 指定したギルドにだけコマンドを同期する（グローバル同期より反映が速い）
+DEV_GUILD_ID = os.getenv("DEV_GUILD_ID")
+startup = PhaseTimer()
+health = HealthServer(bot)
 
 # ==============================
-# Cog（スラッシュコマンド群）の読み込み設定
+# 起動処理（Cog読み込み → コマンド同期）
 # ==============================
-async def load_cogs():
-    for filename in os.listdir("./cogs"):
-        if filename.endswith(".py"):
-            await bot.load_extension(f"cogs.{filename[:-3]}")
-            print(f"✅ Loaded cog: {filename}")
+@bot.event
+async def setup_hook():
+    # ヘルスチェックは読み込み中から応答できるように最初に起動する（/readyz は同期まで503）
+    with startup.phase("http server"):
+        await bot.add_cog(health)
+    install_instrumentation(bot)  # 全コマンド・ボタンの応答時間を計測する
+    with startup.phase("manifest check"):
+        check_manifest(EXTENSIONS)  # 名前の重複があればここで止める
+    with startup.phase("load cogs"):
+        await load_extensions(bot, EXTENSIONS)
+    with startup.phase("command sync"):
+        dev_guild = discord.Object(id=int(DEV_GUILD_ID)) if DEV_GUILD_ID else None
+        try:
+            if cluster.is_primary():  # クラスターではワーカー0だけが同期する
+                await sync_commands(bot, dev_guild)
+        except Exception as e:
+            print(f"❌ Slash command sync failed: {e}")
+        else:
+            health.set_ready()
 
 @bot.event
 async def on_ready():
+    # on_ready は再接続のたびに呼ばれるので、ここでは同期しない
+    startup.mark("gateway ready")
     print(f"🤖 Logged in as {bot.user}")
-    try:
-        synced = await bot.tree.sync()
-        print(f"🌐 Synced {len(synced)} slash command(s).")
-    except Exception as e:
-        print(f"❌ Slash command sync failed: {e}")
 
 # ==============================
-# Flaskサーバー設定（Koyeb/Render対策）
+# 起動（HTTPサーバーはBotと同じイベントループで動く）
+# CLUSTER_WORKERS=2 以上ならワーカーを起動するランチャーとして動く
 # ==============================
-app = Flask(__name__)
-
-@app.route('/')
-def home():
-    return "Regulus-Bot is running!", 200
-
-def run_flask_server():
-    port = int(os.environ.get("PORT", 8080))
-    app.run(host="0.0.0.0", port=port)
-
-# ==============================
-# 並行起動（Bot + Webサーバー）
-# ==============================
-def start_bot_and_server():
-    t = Thread(target=run_flask_server)
-    t.start()
-    asyncio.run(load_cogs())  # 🔹 Cogファイルを読み込み
-    bot.run(TOKEN)
-
 if __name__ == '__main__':
-    start_bot_and_server()
-
-
+    if cluster.is_launcher():
+        cluster.launch(TOKEN)
+    else:
+        bot.run(TOKEN)
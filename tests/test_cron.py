@@ -0,0 +1,79 @@
+import datetime
+
+import pytest
+
+from utils.cron import IntervalSchedule, ScheduleExpressionError, compile_expression, legacy_expression
+
+TOKYO = datetime.timezone(datetime.timedelta(hours=9))
+
+
+def at(*args, tz=TOKYO):
+    return datetime.datetime(*args, tzinfo=tz).timestamp()
+
+
+def fires(expr, start, count=3):
+    schedule = compile_expression(expr, "Asia/Tokyo")
+    ts, result = start, []
+    for _ in range(count):
+        ts = schedule.next_after(ts)
+        result.append(datetime.datetime.fromtimestamp(ts, TOKYO).replace(tzinfo=None))
+    return result
+
+
+# 2026-06-01 は月曜日
+MONDAY = at(2026, 6, 1, 0, 0)
+
+
+def test_daily_shorthand():
+    assert fires("daily 09:00", MONDAY, 2) == [datetime.datetime(2026, 6, 1, 9, 0), datetime.datetime(2026, 6, 2, 9, 0)]
+
+
+def test_stepped_minute():
+    assert fires("*/15 * * * *", MONDAY) == [
+        datetime.datetime(2026, 6, 1, 0, 15), datetime.datetime(2026, 6, 1, 0, 30), datetime.datetime(2026, 6, 1, 0, 45),
+    ]
+
+
+def test_stepped_hour():
+    assert fires("0 */6 * * *", MONDAY) == [
+        datetime.datetime(2026, 6, 1, 6, 0), datetime.datetime(2026, 6, 1, 12, 0), datetime.datetime(2026, 6, 1, 18, 0),
+    ]
+
+
+def test_stepped_weekday_is_a_field_not_a_timezone():
+    # */2 は日・火・木・土
+    assert [d.weekday() for d in fires("0 9 * * */2", MONDAY, 4)] == [1, 3, 5, 6]
+    # 1-5/2 は月・水・金
+    assert [d.day for d in fires("0 9 * * 1-5/2", MONDAY)] == [1, 3, 5]
+
+
+def test_weekday_names():
+    assert [d.day for d in fires("0 9 * * mon-fri", at(2026, 6, 5, 10, 0))] == [8, 9, 10]
+
+
+def test_trailing_timezone():
+    utc = compile_expression("0 9 * * * UTC", "Asia/Tokyo")
+    assert utc.next_after(MONDAY) == at(2026, 6, 1, 9, 0, tz=datetime.timezone.utc)
+    assert compile_expression("0 9 * * * Asia/Tokyo").next_after(MONDAY) == at(2026, 6, 1, 9, 0)
+
+
+def test_day_of_month_or_weekday():
+    # 日と曜日の両方を指定したらどちらかに一致すればよい
+    assert [d.day for d in fires("0 9 15 * 0", MONDAY)] == [7, 14, 15]
+
+
+@pytest.mark.parametrize("expr", ["", "61 * * * *", "*/0 * * * *", "0 9 * *", "daily 9am", "0 9 * * * Mars/Base"])
+def test_invalid(expr):
+    with pytest.raises(ScheduleExpressionError):
+        compile_expression(expr)
+
+
+def test_interval_keeps_phase():
+    schedule = IntervalSchedule(3, None, TOKYO)
+    assert schedule.next_after(1000 + 86400 * 7, anchor=1000) == 1000 + 86400 * 9
+
+
+def test_legacy_expression():
+    assert legacy_expression({"type": "daily", "time": "09:00"}) == "daily 09:00"
+    assert legacy_expression({"type": "weekly", "weekday": 0, "time": "21:00"}) == "weekly mon 21:00"
+    assert legacy_expression({"type": "weekly", "time": "21:00"}) is None
@@ -0,0 +1,73 @@
+import random
+
+from utils import leaderboard
+from utils.leaderboard import Leaderboard, SortedKeys
+
+
+def reference_rows(entries):
+    return [(uid, points) for uid, (points, _) in sorted(entries.items(), key=lambda x: (-x[1][0], x[0]))]
+
+
+def check(board, entries):
+    rows = reference_rows(entries)
+    assert len(board) == len(entries)
+    assert board.total == sum(points for points, _ in entries.values())
+    assert board.top(len(rows) + 5) == rows
+    for level in range(1, 6):
+        members = [points for points, lvl in entries.values() if lvl == level]
+        assert board.bucket(level) == (len(members), sum(members))
+
+
+def test_rank_ties_share_position():
+    board = Leaderboard([(1, 500, 1), (2, 300, 2), (3, 500, 1), (4, 100, 3)])
+    assert [board.rank(uid) for uid in (1, 3, 2, 4)] == [1, 1, 3, 4]
+    assert board.rank(99) is None
+    assert board.top(2) == [(1, 500), (3, 500)]
+    assert board[1:3] == [(3, 500), (2, 300)]
+    assert board[3] == (4, 100)
+
+
+def test_update_moves_entry_and_buckets():
+    board = Leaderboard([(1, 500, 1), (2, 300, 2)])
+    board.update(2, 900, 1)
+    assert board.top(2) == [(2, 900), (1, 500)]
+    assert board.bucket(1) == (2, 1400) and board.bucket(2) == (0, 0)
+    assert board.remove(1) is True and board.remove(1) is False
+    assert 1 not in board and 2 in board
+    assert board.total == 900
+
+
+def test_randomized_against_reference(monkeypatch):
+    # バケットの分割・削除も通るように小さくする
+    monkeypatch.setattr(leaderboard, "LOAD", 4)
+    rng = random.Random(1)
+    entries = {uid: (rng.randrange(1000), rng.randint(1, 5)) for uid in range(40)}
+    board = Leaderboard((uid, points, level) for uid, (points, level) in entries.items())
+    for step in range(20_000):
+        uid = rng.randrange(200)
+        if rng.random() < 0.7:
+            entries[uid] = (rng.randrange(1000), rng.randint(1, 5))
+            board.update(uid, *entries[uid])
+        else:
+            assert board.remove(uid) == (entries.pop(uid, None) is not None)
+        if step % 500 == 0:
+            check(board, entries)
+            rows = reference_rows(entries)
+            for uid, (points, _) in entries.items():
+                assert board.rank(uid) == 1 + sum(1 for _, p in rows if p > points)
+            start = rng.randrange(len(rows) + 1)
+            assert board[start:start + 7] == rows[start:start + 7]
+    check(board, entries)
+
+
+def test_sorted_keys_index_and_slice(monkeypatch):
+    monkeypatch.setattr(leaderboard, "LOAD", 3)
+    keys = SortedKeys([5, 1, 9, 3, 7])
+    for key in (4, 8, 2, 6, 0, 10, 11):
+        keys.add(key)
+    assert keys.slice(0, 20) == list(range(12))
+    assert [keys.index(k) for k in (0, 6, 11)] == [0, 6, 11]
+    assert keys.count_below(6) == 6 and keys.count_below(100) == 12
+    for key in (0, 1, 2, 3):
+        keys.remove(key)
+    assert keys.slice(2, 5) == [6, 7, 8] and len(keys) == 8
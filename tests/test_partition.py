@@ -0,0 +1,59 @@
+import itertools
+import random
+
+import pytest
+
+from utils.partition import karmarkar_karp, lpt, partition, spread
+
+
+def keys(groups):
+    return sorted(key for group in groups for key, _ in group)
+
+
+def brute_force_spread(weights, k):
+    best = None
+    for assignment in itertools.product(range(k), repeat=len(weights)):
+        totals = [0] * k
+        for group, weight in zip(assignment, weights):
+            totals[group] += weight
+        gap = max(totals) - min(totals)
+        best = gap if best is None else min(best, gap)
+    return best
+
+
+@pytest.mark.parametrize("solver", [lpt, karmarkar_karp, partition])
+def test_every_item_assigned_once(solver):
+    rng = random.Random(3)
+    items = [(i, rng.randrange(600_000)) for i in range(500)]
+    groups = solver(items, 7)
+    assert len(groups) == 7
+    assert keys(groups) == list(range(500))
+
+
+def test_result_sorted_by_total_and_no_worse_than_heuristics():
+    rng = random.Random(4)
+    items = [(i, rng.randrange(1, 600_000)) for i in range(1000)]
+    groups = partition(items, 8)
+    totals = [sum(w for _, w in g) for g in groups]
+    assert totals == sorted(totals, reverse=True)
+    assert spread(groups) <= min(spread(lpt(items, 8)), spread(karmarkar_karp(items, 8)))
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_small_inputs_close_to_optimal(seed):
+    rng = random.Random(seed)
+    weights = [rng.randrange(1, 100) for _ in range(rng.randint(1, 9))]
+    k = rng.randint(2, 3)
+    groups = partition(list(enumerate(weights)), k)
+    assert keys(groups) == list(range(len(weights)))
+    # 最大の1件以内（LPT の保証より強い）、かつ最適解以上
+    optimal = brute_force_spread(weights, k)
+    assert optimal <= spread(groups) <= max(optimal, max(weights))
+
+
+def test_edge_cases():
+    assert partition([], 3) == [[], [], []]
+    assert partition([("a", 5)], 1) == [[("a", 5)]]
+    assert spread(partition([("a", 5), ("b", 5), ("c", 0)], 2)) == 0
+    with pytest.raises(ValueError):
+        partition([("a", 1)], 0)
@@ -0,0 +1,75 @@
+import random
+
+from utils.models import Schedule
+from utils.schedule_engine import ScheduleEngine, next_fire
+
+
+def test_pop_due_in_fire_order():
+    engine = ScheduleEngine()
+    for key, fire_at in (("b", 20), ("a", 10), ("c", 30)):
+        engine.add(key, fire_at)
+    assert engine.peek() == 10
+    assert engine.pop_due(25) == [("a", 10), ("b", 20)]
+    assert len(engine) == 1 and "c" in engine and "a" not in engine
+    assert engine.pop_due(25) == []
+
+
+def test_rearm_replaces_previous_time():
+    engine = ScheduleEngine()
+    engine.add("a", 10)
+    engine.add("a", 50)
+    assert engine.fire_time("a") == 50
+    assert engine.pop_due(20) == []
+    assert engine.pop_due(50) == [("a", 50)]
+
+
+def test_remove_is_lazy_but_invisible():
+    engine = ScheduleEngine()
+    engine.add("a", 10)
+    engine.add("b", 20)
+    assert engine.remove("a") is True
+    assert engine.remove("a") is False
+    assert engine.peek() == 20
+    assert engine.pop_due(100) == [("b", 20)]
+    assert engine.peek() is None
+
+
+def test_matches_reference_with_compaction():
+    rng = random.Random(0)
+    engine, reference = ScheduleEngine(), {}
+    now = 0
+    for _ in range(5000):
+        op = rng.random()
+        key = rng.randrange(50)
+        if op < 0.5:
+            fire_at = now + rng.randrange(1, 100)
+            engine.add(key, fire_at)
+            reference[key] = fire_at
+        elif op < 0.7:
+            assert engine.remove(key) == (reference.pop(key, None) is not None)
+        else:
+            now += rng.randrange(20)
+            expected = sorted((fire_at, key) for key, fire_at in reference.items() if fire_at <= now)
+            assert sorted((f, k) for k, f in engine.pop_due(now)) == expected
+            for _, key in expected:
+                del reference[key]
+        assert len(engine) == len(reference)
+        assert engine.peek() == min(reference.values(), default=None)
+    # 再アーム・削除で残った古い要素は、次の追加のときにまとめて捨てられる
+    engine.add("last", now + 1)
+    assert len(engine._heap) <= max(64, 2 * len(engine))
+
+
+def test_next_fire_uses_expression_and_timezone():
+    schedule = Schedule(1, "hi", expr="daily 09:00 UTC")
+    assert next_fire(schedule, 0) == 9 * 3600
+    assert next_fire(schedule, 9 * 3600) == 86400 + 9 * 3600
+
+
+def test_next_fire_legacy_and_interval_anchor():
+    legacy = Schedule(1, "hi", extra={"type": "daily", "time": "00:30"})
+    assert next_fire(legacy, 0, "UTC") == 30 * 60
+    interval = Schedule(1, "hi", expr="interval 2", created=1000, last_post=1000 + 86400 * 2)
+    # 前回投稿から2日ごと（作成時刻より last_post を優先）
+    assert next_fire(interval, 1000 + 86400 * 3) == 1000 + 86400 * 4
+    assert next_fire(Schedule(1, "hi"), 0) is None
@@ -0,0 +1,51 @@
+import random
+
+import pytest
+
+from utils.signups import SignupIndex
+
+LABELS = ("1️⃣", "2️⃣", "3️⃣")
+
+
+def test_add_is_deduplicated_and_moves():
+    index = SignupIndex(LABELS)
+    assert index.add(1, "1️⃣") is None
+    assert index.add(1, "1️⃣") == "1️⃣"
+    assert index.count("1️⃣") == 1
+    assert index.add(1, "3️⃣") == "1️⃣"
+    assert index.bucket_of(1) == "3️⃣"
+    assert index.count("1️⃣") == 0 and list(index.members("3️⃣")) == [1]
+
+
+def test_remove_keeps_other_slots_valid():
+    index = SignupIndex(LABELS)
+    for member_id in (10, 11, 12):
+        index.add(member_id, "2️⃣")
+    assert index.remove(10) is True and index.remove(10) is False
+    assert 10 not in index and len(index) == 2
+    assert sorted(index.members("2️⃣")) == [11, 12]
+    # 入れ替えで位置が変わった 12 も正しく移動できる
+    index.add(12, "1️⃣")
+    assert list(index.members("2️⃣")) == [11] and list(index.members("1️⃣")) == [12]
+
+
+def test_unknown_label():
+    with pytest.raises(KeyError):
+        SignupIndex(LABELS).add(1, "9️⃣")
+
+
+def test_randomized_against_reference():
+    rng = random.Random(2)
+    index, reference = SignupIndex(LABELS), {}
+    for _ in range(20_000):
+        member_id = 10**17 + rng.randrange(300)
+        if rng.random() < 0.8:
+            label = rng.choice(LABELS)
+            assert index.add(member_id, label) == reference.get(member_id)
+            reference[member_id] = label
+        else:
+            assert index.remove(member_id) == (reference.pop(member_id, None) is not None)
+    assert len(index) == len(reference)
+    for label in LABELS:
+        assert sorted(index.members(label)) == sorted(m for m, l in reference.items() if l == label)
+    assert all(index.bucket_of(m) == l for m, l in reference.items())
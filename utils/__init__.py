@@ -0,0 +1 @@
+# Cog間で共有する部品（永続化・メトリクスなど）
@@ -0,0 +1,85 @@
+import asyncio
+import heapq
+import itertools
+import time
+
+# ==============================
+# 時計（スケジューラ用）
+# ==============================
+# Scheduler は現在時刻の取得と「イベントが立つか timeout 秒たつまで待つ」を時計オブジェクト越しに行う。
+#   SystemClock    本番用（time.time と asyncio.wait_for）
+#   SimulatedClock 検証・ベンチマーク用。advance() で仮想時刻を次の待ち時刻まで飛ばすので、
+#                  1か月分の発火を数秒で再生できる。charge_cpu=True なら処理に使ったCPU時間だけ
+#                  仮想時刻も進む（重いtickの分だけ投稿が遅れる様子を再現する）。
+
+
+class SystemClock:
+    def time(self):
+        return time.time()
+
+    async def wait(self, event, timeout):
+        """event が立てば True、timeout 秒たてば False。"""
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+
+class SimulatedClock:
+    def __init__(self, start, charge_cpu=False):
+        self._now = start
+        self.charge_cpu = charge_cpu
+        self._cpu_mark = time.process_time()
+        self._sleepers = []  # (仮想時刻, 連番, Future)
+        self._seq = itertools.count()
+        self.waits = 0
+
+    def time(self):
+        if self.charge_cpu:
+            return self._now + (time.process_time() - self._cpu_mark)
+        return self._now
+
+    def _jump(self, target):
+        self._now = max(self.time(), target)
+        self._cpu_mark = time.process_time()
+
+    async def wait(self, event, timeout):
+        self.waits += 1
+        if event.is_set():
+            return True
+        if timeout is None:
+            await event.wait()
+            return True
+        timer = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._sleepers, (self.time() + timeout, next(self._seq), timer))
+        waiter = asyncio.ensure_future(event.wait())
+        try:
+            await asyncio.wait((timer, waiter), return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            timer.cancel()
+        if waiter.done():
+            return True
+        waiter.cancel()
+        return False
+
+    async def settle(self):
+        """実行可能なタスクが無くなるまでイベントループを回す（実時間の待ちが無い前提）。"""
+        loop = asyncio.get_running_loop()
+        await asyncio.sleep(0)
+        while loop._ready:
+            await asyncio.sleep(0)
+
+    async def advance(self, until):
+        """until まで、待っている処理を時刻順に起こしながら仮想時刻を進める。"""
+        while True:
+            await self.settle()
+            while self._sleepers and self._sleepers[0][2].done():
+                heapq.heappop(self._sleepers)
+            if not self._sleepers or self._sleepers[0][0] > until:
+                break
+            deadline, _, timer = heapq.heappop(self._sleepers)
+            self._jump(deadline)
+            timer.set_result(None)
+        self._jump(until)
+        await self.settle()
@@ -0,0 +1,165 @@
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import aiohttp
+
+# ==============================
+# クラスター起動（複数プロセス × AutoShardedBot）
+# ==============================
+# CLUSTER_WORKERS を2以上にして main.py を起動すると、そのプロセスはランチャーになり、
+# シャードIDを分けて main.py をワーカーとして CLUSTER_WORKERS 個起動する。
+#   - ワーカーは CLUSTER_ID / SHARD_IDS / SHARD_COUNT を受け取り、担当シャードだけを持つ AutoShardedBot になる
+#   - 状態は SQLite（WAL）に置く（ワーカーには STORAGE_BACKEND=sqlite を渡す）。
+#     ギルドは1つのシャード＝1つのワーカーに属するので、同じギルドの行を複数プロセスが書くことはない
+#     （既存のJSONデータは先に python -m utils.sqlite_store で取り込んでおく）
+#   - ローカルJSONに置く状態（ロールジョブ）はワーカーごとのファイルに分ける
+#   - コマンド同期はワーカー0だけが行い、HTTPサーバーは PORT + CLUSTER_ID で待ち受ける
+#   - 落ちたワーカーは間隔を空けて起動し直す
+#   - 全ギルドを対象にするコマンドや統計は、受け付けたワーカーの担当分だけになる（scope_label で明示する）
+# SHARD_COUNT を省略すると /gateway/bot の推奨シャード数を使う。
+
+WORKERS = int(os.getenv("CLUSTER_WORKERS", "1"))
+CLUSTER_ID = int(os.environ["CLUSTER_ID"]) if os.getenv("CLUSTER_ID") else None
+SHARD_IDS = [int(s) for s in os.environ["SHARD_IDS"].split(",")] if os.getenv("SHARD_IDS") else None
+SHARD_COUNT = int(os.environ["SHARD_COUNT"]) if os.getenv("SHARD_COUNT") else None
+
+IDENTIFY_INTERVAL = 5.0  # IDENTIFY は5秒に1回まで（max_concurrency=1 の場合）
+STABLE_AFTER = 60.0  # これより長く動いていたワーカーは再起動の待ち時間をリセットする
+MAX_RESTART_DELAY = 60.0
+STOP_TIMEOUT = 30.0
+GATEWAY_URL = "https://discord.com/api/v10/gateway/bot"
+
+
+def is_launcher():
+    return WORKERS > 1 and CLUSTER_ID is None
+
+
+def is_primary():
+    """コマンド同期など、クラスター全体で1回だけ行う処理を担当するか。"""
+    return CLUSTER_ID in (None, 0)
+
+
+def owns_guild(bot, guild_id):
+    shard_ids = getattr(bot, "shard_ids", None)
+    if shard_ids is None or not bot.shard_count:
+        return True
+    return (int(guild_id) >> 22) % bot.shard_count in shard_ids
+
+
+def scope_label():
+    """クラスターのワーカーなら、集計が自分の担当分だけであることを示す文言（単体起動なら None）。
+    ワーカーは他のワーカーのギルドや計測値を持たないので、全体の数字にはならない。"""
+    if CLUSTER_ID is None:
+        return None
+    shards = f"シャード {SHARD_IDS[0]}-{SHARD_IDS[-1]}" if SHARD_IDS else "全シャード"
+    return f"ワーカー {CLUSTER_ID}（{shards} / {SHARD_COUNT or '?'}）のサーバーのみ"
+
+
+def worker_path(path):
+    """ワーカーごとに分けるファイルのパス（data/role_jobs.json -> data/role_jobs.1.json）。"""
+    if CLUSTER_ID is None:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}.{CLUSTER_ID}{ext}"
+
+
+def shard_slices(shard_count, workers):
+    """0..shard_count-1 を連続した workers 個の範囲に分ける。"""
+    size, extra = divmod(shard_count, workers)
+    slices, start = [], 0
+    for i in range(workers):
+        end = start + size + (1 if i < extra else 0)
+        slices.append(list(range(start, end)))
+        start = end
+    return slices
+
+
+async def recommended_shards(token):
+    async with aiohttp.ClientSession() as session:
+        async with session.get(GATEWAY_URL, headers={"Authorization": f"Bot {token}"}) as resp:
+            resp.raise_for_status()
+            return (await resp.json())["shards"]
+
+
+# ---------- ランチャー ----------
+class _Worker:
+    def __init__(self, index, shard_ids):
+        self.index = index
+        self.shard_ids = shard_ids
+        self.process = None
+        self.started = 0.0
+        self.failures = 0
+        self.restart_at = None
+
+
+def launch(token, workers=WORKERS, shard_count=SHARD_COUNT, script=None):
+    script = script or os.path.abspath(sys.argv[0])
+    if shard_count is None:
+        shard_count = asyncio.run(recommended_shards(token))
+    shard_count = max(shard_count, workers)
+    base_port = int(os.getenv("PORT", "8080"))
+    pool = [_Worker(i, shard_ids) for i, shard_ids in enumerate(shard_slices(shard_count, workers))]
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    def spawn(worker):
+        env = {
+            **os.environ,
+            "CLUSTER_ID": str(worker.index),
+            "SHARD_IDS": ",".join(map(str, worker.shard_ids)),
+            "SHARD_COUNT": str(shard_count),
+            "STORAGE_BACKEND": "sqlite",
+            "PORT": str(base_port + worker.index),
+        }
+        worker.process = subprocess.Popen([sys.executable, script], env=env)
+        worker.started = time.monotonic()
+        print(f"🚀 Worker {worker.index} started (pid {worker.process.pid}, shards {worker.shard_ids[0]}-{worker.shard_ids[-1]})")
+
+    def wait(seconds):
+        deadline = time.monotonic() + seconds
+        while not stopping and time.monotonic() < deadline:
+            time.sleep(min(1.0, deadline - time.monotonic()))
+
+    print(f"🧩 Cluster: {workers} workers / {shard_count} shards")
+    for worker in pool:
+        if stopping:
+            break
+        spawn(worker)
+        # 前のワーカーの IDENTIFY が終わるまで次を起動しない
+        wait(IDENTIFY_INTERVAL * len(worker.shard_ids))
+
+    while not stopping:
+        wait(1.0)
+        now = time.monotonic()
+        for worker in pool:
+            if worker.process is None or worker.process.poll() is None:
+                continue
+            if worker.restart_at is None:
+                worker.failures = 1 if now - worker.started > STABLE_AFTER else worker.failures + 1
+                delay = min(MAX_RESTART_DELAY, 2 ** worker.failures)
+                worker.restart_at = now + delay
+                print(f"⚠️ Worker {worker.index} exited ({worker.process.returncode}), restarting in {delay:.0f}s")
+            elif now >= worker.restart_at:
+                worker.restart_at = None
+                spawn(worker)
+
+    # SIGINT で止めると各ワーカーの Bot.close（cog_unload）が走る
+    running = [w.process for w in pool if w.process is not None and w.process.poll() is None]
+    for process in running:
+        process.send_signal(signal.SIGINT)
+    for process in running:
+        try:
+            process.wait(timeout=STOP_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            process.kill()
+    print("👋 Cluster stopped")
@@ -0,0 +1,253 @@
+import bisect
+import datetime
+import functools
+import os
+import re
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+# ==============================
+# スケジュール式のコンパイル
+# ==============================
+# 使える書式:
+#   cron形式       "30 9 * * 1-5"（分 時 日 月 曜日、曜日は 0=日曜）
+#   マクロ         "@hourly" / "@daily" / "@weekly" / "@monthly"
+#   短縮形         "daily 09:00" / "weekly mon 09:00" / "monthly 15 09:00" / "interval 3 [09:00]"
+# 末尾にタイムゾーン（"JST" や "Asia/Tokyo"）を付けられる。
+# 省略時はギルドのタイムゾーン、それも無ければ DEFAULT_TIMEZONE を使う。
+# 同じ式と同じタイムゾーンのコンパイル結果は共有される。
+
+DEFAULT_TIMEZONE = os.getenv("DEFAULT_TIMEZONE", "Asia/Tokyo")
+SEARCH_YEARS = 8
+
+TZ_ALIASES = {
+    "JST": "Asia/Tokyo",
+    "KST": "Asia/Seoul",
+    "UTC": "UTC",
+    "GMT": "UTC",
+}
+WEEKDAYS = {
+    "sun": 0, "mon": 1, "tue": 2, "wed": 3, "thu": 4, "fri": 5, "sat": 6,
+    "日": 0, "月": 1, "火": 2, "水": 3, "木": 4, "金": 5, "土": 6,
+}
+MACROS = {
+    "@hourly": "0 * * * *",
+    "@daily": "0 0 * * *",
+    "@weekly": "0 0 * * 0",
+    "@monthly": "0 0 1 * *",
+}
+# 旧形式の weekday は Pythonの曜日番号（0=月曜）
+LEGACY_WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+
+
+class ScheduleExpressionError(ValueError):
+    pass
+
+
+def resolve_timezone(name):
+    name = TZ_ALIASES.get(name.upper(), name) if name else DEFAULT_TIMEZONE
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ScheduleExpressionError(f"不明なタイムゾーンです: {name}") from None
+
+
+def _is_timezone(token):
+    """末尾のトークンがタイムゾーンか。"*/2" や "1-5/2"、"mon-fri" のようなフィールドは含めない。"""
+    if token.upper() in TZ_ALIASES:
+        return True
+    words = re.split(r"[,/-]", token.lower())
+    if all(word == "*" or word.isdigit() or word in WEEKDAYS for word in words):
+        return False
+    return any(c.isalpha() for c in token)
+
+
+def _parse_clock(token):
+    try:
+        clock = datetime.time.fromisoformat(token)
+    except ValueError:
+        raise ScheduleExpressionError(f"時刻は HH:MM で指定してください: {token}") from None
+    return clock.hour, clock.minute
+
+
+def _parse_field(text, low, high, names=None):
+    values = set()
+    for part in text.lower().split(","):
+        step = 1
+        stepped = "/" in part
+        if stepped:
+            part, step_text = part.split("/", 1)
+            if not step_text.isdigit() or int(step_text) == 0:
+                raise ScheduleExpressionError(f"ステップが不正です: {text}")
+            step = int(step_text)
+        if part == "*":
+            start, end = low, high
+        else:
+            bounds = [names[p] if names and p in names else p for p in part.split("-", 1)]
+            try:
+                start, end = int(bounds[0]), int(bounds[-1])
+            except ValueError:
+                raise ScheduleExpressionError(f"値が不正です: {text}") from None
+            if stepped and len(bounds) == 1:
+                end = high
+        if not low <= start <= end <= high:
+            raise ScheduleExpressionError(f"範囲外の値です: {text}（{low}〜{high}）")
+        values.update(range(start, end + 1, step))
+    return tuple(sorted(values))
+
+
+class CronSchedule:
+    __slots__ = ("minutes", "hours", "days", "months", "weekdays", "dom_any", "dow_any", "tz")
+
+    def __init__(self, fields, tz):
+        minute, hour, day, month, weekday = fields
+        self.minutes = _parse_field(minute, 0, 59)
+        self.hours = _parse_field(hour, 0, 23)
+        self.days = frozenset(_parse_field(day, 1, 31))
+        self.months = _parse_field(month, 1, 12)
+        # 7 も日曜として扱う
+        self.weekdays = frozenset(d % 7 for d in _parse_field(weekday, 0, 7, WEEKDAYS))
+        self.dom_any = day == "*"
+        self.dow_any = weekday == "*"
+        self.tz = tz
+
+    def _day_matches(self, dt):
+        dom = dt.day in self.days
+        dow = (dt.weekday() + 1) % 7 in self.weekdays
+        if self.dom_any or self.dow_any:
+            return dom and dow
+        return dom or dow  # 両方指定された場合はcronと同じくOR
+
+    def next_after(self, ts, anchor=None):
+        start = datetime.datetime.fromtimestamp(ts, self.tz).replace(tzinfo=None, second=0, microsecond=0)
+        dt = start + datetime.timedelta(minutes=1)
+        limit_year = start.year + SEARCH_YEARS
+        while dt.year <= limit_year:
+            if dt.month not in self.months:
+                i = bisect.bisect_right(self.months, dt.month)
+                if i < len(self.months):
+                    dt = datetime.datetime(dt.year, self.months[i], 1)
+                else:
+                    dt = datetime.datetime(dt.year + 1, self.months[0], 1)
+                continue
+            if not self._day_matches(dt):
+                dt = datetime.datetime(dt.year, dt.month, dt.day) + datetime.timedelta(days=1)
+                continue
+            if dt.hour not in self.hours:
+                i = bisect.bisect_right(self.hours, dt.hour)
+                if i == len(self.hours):
+                    dt = datetime.datetime(dt.year, dt.month, dt.day) + datetime.timedelta(days=1)
+                else:
+                    dt = dt.replace(hour=self.hours[i], minute=0)
+                continue
+            if dt.minute not in self.minutes:
+                i = bisect.bisect_right(self.minutes, dt.minute)
+                if i == len(self.minutes):
+                    dt = dt.replace(minute=0) + datetime.timedelta(hours=1)
+                else:
+                    dt = dt.replace(minute=self.minutes[i])
+                continue
+            fire = dt.replace(tzinfo=self.tz).timestamp()
+            if fire > ts:
+                return fire
+            # 夏時間の巻き戻しで同じ壁時計時刻が2回ある場合
+            dt += datetime.timedelta(minutes=1)
+        return None
+
+
+class IntervalSchedule:
+    __slots__ = ("days", "clock", "tz")
+
+    def __init__(self, days, clock, tz):
+        if days <= 0:
+            raise ScheduleExpressionError("間隔は1日以上で指定してください。")
+        self.days = days
+        self.clock = clock
+        self.tz = tz
+
+    def next_after(self, ts, anchor=None):
+        anchor = ts if anchor is None else anchor
+        if self.clock is None:
+            step = self.days * 86400
+            fire = anchor + step
+            if fire <= ts:
+                fire += ((ts - fire) // step + 1) * step
+            return fire
+
+        hour, minute = self.clock
+        date = datetime.datetime.fromtimestamp(anchor, self.tz).date() + datetime.timedelta(days=self.days)
+        today = datetime.datetime.fromtimestamp(ts, self.tz).date()
+        if date < today:
+            behind = (today - date).days
+            date += datetime.timedelta(days=-(-behind // self.days) * self.days)
+        while True:
+            fire = datetime.datetime(date.year, date.month, date.day, hour, minute, tzinfo=self.tz).timestamp()
+            if fire > ts:
+                return fire
+            date += datetime.timedelta(days=self.days)
+
+
+def compile_expression(text, default_tz=None):
+    tokens = text.split()
+    if not tokens:
+        raise ScheduleExpressionError("スケジュール式が空です。")
+    tz_name = default_tz or DEFAULT_TIMEZONE
+    if len(tokens) > 1 and _is_timezone(tokens[-1]):
+        tz_name = tokens.pop()
+    tz_name = TZ_ALIASES.get(tz_name.upper(), tz_name)
+    # 表記揺れを正規化してからキャッシュを引く
+    return _compile(" ".join(tokens).lower(), tz_name)
+
+
+@functools.lru_cache(maxsize=4096)
+def _compile(body, tz_name):
+    tokens = body.split()
+    tz = resolve_timezone(tz_name)
+
+    head = tokens[0]
+    if head in MACROS and len(tokens) == 1:
+        return CronSchedule(MACROS[head].split(), tz)
+    if head == "daily" and len(tokens) == 2:
+        hour, minute = _parse_clock(tokens[1])
+        return CronSchedule((str(minute), str(hour), "*", "*", "*"), tz)
+    if head == "weekly" and len(tokens) == 3:
+        hour, minute = _parse_clock(tokens[2])
+        return CronSchedule((str(minute), str(hour), "*", "*", tokens[1]), tz)
+    if head == "monthly" and len(tokens) == 3:
+        hour, minute = _parse_clock(tokens[2])
+        return CronSchedule((str(minute), str(hour), tokens[1], "*", "*"), tz)
+    if head == "interval" and len(tokens) in (2, 3):
+        if not tokens[1].isdigit():
+            raise ScheduleExpressionError(f"間隔は日数で指定してください: {tokens[1]}")
+        clock = _parse_clock(tokens[2]) if len(tokens) == 3 else None
+        return IntervalSchedule(int(tokens[1]), clock, tz)
+    if len(tokens) == 5:
+        return CronSchedule(tokens, tz)
+    raise ScheduleExpressionError(f"解釈できないスケジュール式です: {body}")
+
+
+def legacy_expression(schedule):
+    """type/time/weekday/day/interval_days 形式の旧データを式に変換する。"""
+    kind = schedule.get("type")
+    if kind == "interval" and isinstance(schedule.get("interval_days"), int):
+        return f"interval {schedule['interval_days']}"
+    clock = schedule.get("time")
+    if not clock:
+        return None
+    if kind == "daily":
+        return f"daily {clock}"
+    if kind == "weekly" and schedule.get("weekday") in range(7):
+        return f"weekly {LEGACY_WEEKDAYS[schedule['weekday']]} {clock}"
+    if kind == "monthly" and schedule.get("day") in range(1, 32):
+        return f"monthly {schedule['day']} {clock}"
+    return None
+
+
+def compile_schedule(schedule, default_tz=None):
+    """schedule: utils.models.Schedule（旧形式の項目は extra に入っている）"""
+    text = schedule.expr or legacy_expression(schedule.extra or {})
+    if text is None:
+        return None
+    try:
+        return compile_expression(text, default_tz)
+    except ScheduleExpressionError:
+        return None
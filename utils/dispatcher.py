@@ -0,0 +1,107 @@
+import asyncio
+import logging
+import time
+
+import discord
+
+from utils import metrics
+
+log = logging.getLogger(__name__)
+
+# ==============================
+# 定期投稿のディスパッチャ
+# ==============================
+# 同じ時刻に重なった投稿を並列で送る。
+# - 全体の同時送信数はセマフォで制限する
+# - チャンネルごとにロックで直列化し、投稿順を保つ
+# - 429 を受けたら retry-after の間、そのバケット（不明ならチャンネル）を止める
+
+MAX_ATTEMPTS = 3
+
+
+class Post:
+    __slots__ = ("key", "channel", "content", "due_at")
+
+    def __init__(self, key, channel, content, due_at):
+        self.key = key
+        self.channel = channel
+        self.content = content
+        self.due_at = due_at
+
+
+def _retry_after(exc):
+    if isinstance(exc, discord.RateLimited):
+        return exc.retry_after, None
+    headers = getattr(exc.response, "headers", None) or {}
+    try:
+        retry_after = float(headers.get("Retry-After", 1.0))
+    except (TypeError, ValueError):
+        retry_after = 1.0
+    if headers.get("X-RateLimit-Global") or headers.get("X-RateLimit-Scope") == "global":
+        return retry_after, "global"
+    return retry_after, headers.get("X-RateLimit-Bucket")
+
+
+class PostDispatcher:
+    def __init__(self, concurrency=8, clock=time.time):
+        self.clock = clock  # 送信時刻（遅延の計測用）を取る時計
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._channel_locks = {}
+        self._channel_buckets = {}  # channel_id -> 429で判明したバケット
+        self._cooldowns = {}  # バケット -> 再開可能になる時刻（monotonic）
+
+    def _lock(self, channel_id):
+        lock = self._channel_locks.get(channel_id)
+        if lock is None:
+            lock = self._channel_locks[channel_id] = asyncio.Lock()
+        return lock
+
+    async def _wait_cooldown(self, channel_id):
+        keys = ("global", self._channel_buckets.get(channel_id, channel_id))
+        delay = max(self._cooldowns.get(k, 0.0) for k in keys) - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def _send(self, post):
+        channel_id = post.channel.id
+        async with self._lock(channel_id):
+            for _ in range(MAX_ATTEMPTS):
+                await self._wait_cooldown(channel_id)
+                try:
+                    async with self._semaphore:
+                        await post.channel.send(post.content)
+                except (discord.RateLimited, discord.HTTPException) as exc:
+                    if isinstance(exc, discord.HTTPException) and exc.status != 429:
+                        log.warning("投稿 %s の送信に失敗しました: %s", post.key, exc)
+                        metrics.inc("dispatch_failures_total")
+                        return post.key, None
+                    retry_after, bucket = _retry_after(exc)
+                    if bucket and bucket != "global":
+                        self._channel_buckets[channel_id] = bucket
+                    key = bucket or channel_id
+                    self._cooldowns[key] = time.monotonic() + retry_after
+                    metrics.inc("dispatch_rate_limited_total")
+                    continue
+                except Exception:
+                    log.exception("投稿 %s の送信中にエラーが発生しました。", post.key)
+                    metrics.inc("dispatch_failures_total")
+                    return post.key, None
+
+                sent_at = self.clock()
+                metrics.observe("dispatch_lag_seconds", max(0.0, sent_at - post.due_at))
+                metrics.inc("dispatch_sent_total")
+                return post.key, sent_at
+
+        metrics.inc("dispatch_failures_total")
+        return post.key, None
+
+    async def dispatch(self, posts):
+        """投稿をまとめて送り、(key, 送信時刻 or None) のリストを返す。"""
+        return await asyncio.gather(*(self._send(p) for p in posts))
+
+
+def lag_percentiles():
+    summary = metrics.summary("dispatch_lag_seconds")
+    if summary is None:
+        return None
+    return summary.percentile(0.50), summary.percentile(0.99)
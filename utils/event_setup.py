@@ -0,0 +1,62 @@
+import asyncio
+import logging
+
+import discord
+
+log = logging.getLogger(__name__)
+
+# ==============================
+# イベント用チャンネルの調整（reconcile）
+# ==============================
+# セットアップを何度実行しても同じ結果になるようにする。
+# - 保存済みのチャンネルID → カテゴリ内の同名チャンネル の順に既存のものを探す
+# - 見つからないものだけを並列で作成する
+# 複数ギルドへの一括セットアップは run_bounded で同時実行数を制限して行う。
+
+POOL_SIZE = 4
+
+
+async def reconcile_channels(category, wanted, config=None):
+    """wanted: {設定キー: チャンネル名}。({設定キー: チャンネル}, 作成したチャンネル名のリスト) を返す。"""
+    guild = category.guild
+    found = {}
+    missing = []
+    for key, name in wanted.items():
+        channel = guild.get_channel(getattr(config, key, None) or 0)
+        if channel is None:
+            channel = discord.utils.get(category.text_channels, name=name)
+        if channel is None:
+            missing.append(key)
+        else:
+            found[key] = channel
+
+    created = await asyncio.gather(*(category.create_text_channel(wanted[key]) for key in missing))
+    found.update(zip(missing, created))
+    return found, [wanted[key] for key in missing]
+
+
+async def ensure_category(guild, name):
+    category = discord.utils.get(guild.categories, name=name)
+    if category is None:
+        category = await guild.create_category(name)
+    return category
+
+
+async def run_bounded(items, worker, concurrency=POOL_SIZE):
+    """items を最大 concurrency 並列で worker に渡し、(item, 結果, 例外) のリストを返す。"""
+    queue = asyncio.Queue()
+    for item in items:
+        queue.put_nowait(item)
+    results = []
+
+    async def run():
+        while not queue.empty():
+            item = queue.get_nowait()
+            try:
+                results.append((item, await worker(item), None))
+            except Exception as e:
+                log.warning("一括セットアップで %s の処理に失敗しました: %s", item, e)
+                results.append((item, None, e))
+
+    await asyncio.gather(*(run() for _ in range(min(concurrency, len(items)))))
+    return results
@@ -0,0 +1,105 @@
+import asyncio
+import csv
+import datetime
+import gzip
+import io
+import json
+import tempfile
+import time
+
+import discord
+
+from utils import metrics
+
+# ==============================
+# エントリーのエクスポート（CSV / JSONL）
+# ==============================
+# 行はジェネレーターから1件ずつ受け取り、SpooledTemporaryFile に直接書き出す（全体を文字列にしない）。
+# SPOOL_SIZE を超えた分はディスクの一時ファイルに移るので、10万行でもメモリは一定で済む。
+# 書き出し（行の生成・整形・gzip圧縮）は executor で行い、イベントループは止めない。
+# できたファイルはギルドの admin_channel に添付で投稿する。
+
+SPOOL_SIZE = 4 * 1024 * 1024
+FORMATS = ("csv", "jsonl")
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")  # 表計算ソフトが数式として扱う先頭文字
+
+
+def _csv_cell(value):
+    # 表示名などの文字列が数式として実行されないように、先頭に ' を付ける（CSVインジェクション対策）
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def write_export(rows, fields, fmt="csv", compress=False):
+    """rows: dict の列。(先頭に巻き戻したファイル, 行数, バイト数) を返す。executor から呼ぶ。"""
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+    raw = gzip.GzipFile(fileobj=spool, mode="wb") if compress else spool
+    # CSV は表計算ソフトで日本語が化けないように BOM を付ける
+    text = io.TextIOWrapper(raw, encoding="utf-8-sig" if fmt == "csv" else "utf-8", newline="")
+    count = 0
+    try:
+        if fmt == "csv":
+            writer = csv.writer(text)
+            writer.writerow(fields)
+            for row in rows:
+                writer.writerow([_csv_cell(row.get(f)) for f in fields])
+                count += 1
+        else:
+            for row in rows:
+                text.write(json.dumps({f: row.get(f) for f in fields}, ensure_ascii=False))
+                text.write("\n")
+                count += 1
+        text.flush()
+        text.detach()  # spool は閉じずに残す
+        if compress:
+            raw.close()  # gzip のフッターを書く（fileobj は閉じない）
+    except BaseException:
+        spool.close()
+        raise
+    size = spool.tell()
+    spool.seek(0)
+    return spool, count, size
+
+
+def team_lookup(members, teams):
+    """members: GuildSnapshot、teams: {チーム名: role_id}。user_id -> 所属チーム名（無ければ空文字）を返す関数。"""
+    by_role = {role_id: name for name, role_id in teams.items() if isinstance(role_id, int)}
+
+    def team_of(user_id):
+        for role_id in members.roles_of(user_id):
+            name = by_role.get(role_id)
+            if name is not None:
+                return name
+        return ""
+
+    return team_of
+
+
+async def post_export(interaction, channel, prefix, rows, fields, fmt, compress):
+    """rows を書き出して channel に添付で投稿し、実行者には結果を ephemeral で返す（defer 済みであること）。"""
+    start = time.perf_counter()
+    fp, count, size = await asyncio.get_running_loop().run_in_executor(
+        None, write_export, rows, fields, fmt, compress
+    )
+    metrics.observe("export_seconds", time.perf_counter() - start, format=fmt)
+
+    limit = channel.guild.filesize_limit
+    if size > limit:
+        fp.close()
+        hint = "" if compress else "`gzip` を有効にするか、"
+        await interaction.followup.send(
+            f"⚠️ ファイルが大きすぎます（{size / 2**20:.1f} MiB > {limit / 2**20:.0f} MiB）。{hint}件数を減らしてください。",
+            ephemeral=True
+        )
+        return
+
+    stamp = datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%d-%H%M")
+    filename = f"{prefix}-{interaction.guild_id}-{stamp}.{fmt}" + (".gz" if compress else "")
+    # discord.File は送信後にファイルを閉じる
+    await channel.send(
+        f"📤 {interaction.user.mention} のエクスポート: {count:,} 件",
+        file=discord.File(fp, filename=filename),
+        allowed_mentions=discord.AllowedMentions.none()
+    )
+    await interaction.followup.send(f"✅ {count:,} 件を {channel.mention} に出力しました（{size / 1024:,.1f} KiB）。", ephemeral=True)
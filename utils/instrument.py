@@ -0,0 +1,346 @@
+import asyncio
+import contextvars
+import logging
+import os
+import re
+import time
+
+import discord
+from discord import ui
+
+from utils import metrics
+
+log = logging.getLogger(__name__)
+
+# ==============================
+# インタラクションの計測
+# ==============================
+# 全Cogのスラッシュコマンド・ボタン・モーダルについて、キー（"/コマンド名" や custom_id）ごとに
+#   interaction_ack_seconds      受信（インタラクションIDの時刻）から最初の応答まで
+#   interaction_handler_seconds  ハンドラの実行時間
+#   interaction_rest_calls       1回の処理で呼んだREST APIの数
+#   interaction_rate_limited_total / interaction_errors_total
+#   interaction_late_ack_total（3秒超え）/ interaction_unacked_total（応答なし）
+# を固定バケットのヒストグラム・カウンターで記録する。
+# フックする場所（discord.py 2.3 の内部に合わせている）:
+#   - CommandTree._call / View._scheduled_task / Modal._scheduled_task … ハンドラの開始と終了
+#   - View.on_error / Modal.on_error（サブクラスの上書きも含む）と interaction.command_failed … エラー
+#     （どちらも例外を中で握りつぶすので、ハンドラの外からは例外として見えない）
+#   - InteractionResponse の各応答メソッド … 最初の応答時刻
+#   - HTTPClient.request … RESTの呼び出し数（実行中の計測に contextvar で紐付ける）
+#   - discord.http / discord.webhook のログ … 429
+#
+# 自動defer: 受信から AUTO_DEFER_BUDGET 秒たっても応答していなければ自動で defer し、
+# その後の response.send_message / edit_message は followup / 元メッセージの編集に回す。
+# コマンドは ephemeral で defer する（公開で返すコマンドは @defer_policy(ephemeral=False)）。
+# モーダルを返すハンドラは defer するとモーダルを出せなくなるので @defer_policy(enabled=False) を付ける。
+
+ACK_DEADLINE = 3.0
+AUTO_DEFER_BUDGET = float(os.getenv("AUTO_DEFER_BUDGET", "2.0"))  # 0 で無効
+REST_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50)
+RESPONSE_METHODS = ("defer", "send_message", "edit_message", "send_modal", "autocomplete", "pong")
+RATE_LIMIT_LOGGERS = ("discord.http", "discord.webhook.async_")
+
+_current = contextvars.ContextVar("interaction_trace", default=None)
+_active = {}  # interaction.id -> Trace
+_originals = {}  # 応答メソッド名 -> フック前のメソッド
+_ID_SEGMENT = re.compile(r"(?<=:)\d{15,}(?=:|$)")
+_DEFERRABLE = (
+    discord.InteractionType.application_command,
+    discord.InteractionType.component,
+    discord.InteractionType.modal_submit,
+)
+
+
+def defer_policy(*, enabled=True, ephemeral=True):
+    """ハンドラ関数に自動deferの扱いを指定するデコレータ（@app_commands.command より内側に付ける）。"""
+    def decorator(func):
+        func.__auto_defer__ = (enabled, ephemeral)
+        return func
+    return decorator
+
+
+def _policy(handler):
+    # ボタンのコールバック（_ViewCallback）やバウンドメソッドから元の関数をたどる
+    func = getattr(handler, "callback", handler)
+    func = getattr(func, "__func__", func)
+    return getattr(func, "__auto_defer__", (True, True))
+
+
+class Trace:
+    __slots__ = ("key", "received", "started", "acked", "rest_calls", "rate_limited",
+                 "responding", "auto_defer", "timer", "failed")
+
+    def __init__(self, key, interaction):
+        self.key = key
+        # インタラクションIDの時刻 = Discordが受け付けた時刻（3秒の期限の起点）
+        self.received = discord.utils.snowflake_time(interaction.id).timestamp()
+        self.started = time.perf_counter()
+        self.acked = None
+        self.rest_calls = 0
+        self.rate_limited = 0
+        self.responding = False  # ハンドラが応答を始めた
+        self.auto_defer = None  # 自動deferのタスク
+        self.timer = None
+        self.failed = False  # on_error に回った（コマンドは command_failed）
+
+
+def component_key(interaction, item=None):
+    custom_id = (interaction.data or {}).get("custom_id", "")
+    if custom_id.startswith("regulus:"):
+        # ギルドIDはキーに含めない
+        return _ID_SEGMENT.sub("*", custom_id)
+    if item is not None and item.view is not None:
+        callback = getattr(item.callback, "__name__", type(item).__name__)
+        if callback == "callback":
+            callback = type(item).__name__
+        return f"{type(item.view).__name__}.{callback}"
+    return custom_id or "component"
+
+
+def command_key(interaction):
+    data = interaction.data or {}
+    name = data.get("name", "?")
+    # サブコマンドがあれば "/親 子" にする
+    for option in data.get("options", ()):
+        if option.get("type") in (1, 2):
+            name += f" {option['name']}"
+    return f"/{name}"
+
+
+class track:
+    """with でハンドラを囲み、終了時にまとめて記録する。handler は自動deferの設定を読む関数。"""
+
+    def __init__(self, interaction, key, handler=None):
+        self.interaction = interaction
+        self.key = key
+        self.handler = handler
+
+    def __enter__(self):
+        trace = self.trace = _active[self.interaction.id] = Trace(self.key, self.interaction)
+        self.token = _current.set(trace)
+        enabled, ephemeral = _policy(self.handler)
+        if AUTO_DEFER_BUDGET > 0 and enabled and self.interaction.type in _DEFERRABLE:
+            delay = max(0.0, AUTO_DEFER_BUDGET - (time.time() - trace.received))
+            trace.timer = asyncio.get_running_loop().call_later(
+                delay, _start_auto_defer, trace, self.interaction, ephemeral
+            )
+        return trace
+
+    def __exit__(self, exc_type, exc, tb):
+        trace = self.trace
+        if trace.timer is not None:
+            trace.timer.cancel()
+        _current.reset(self.token)
+        _active.pop(self.interaction.id, None)
+        key = trace.key
+        metrics.histogram("interaction_handler_seconds", time.perf_counter() - trace.started, key=key)
+        metrics.histogram("interaction_rest_calls", trace.rest_calls, bounds=REST_BUCKETS, key=key)
+        metrics.inc("interactions_total", key=key)
+        if trace.rate_limited:
+            metrics.inc("interaction_rate_limited_total", trace.rate_limited, key=key)
+        if exc_type is not None or trace.failed:
+            metrics.inc("interaction_errors_total", key=key)
+        if trace.acked is None and not self.interaction.response.is_done():
+            metrics.inc("interaction_unacked_total", key=key)
+        return False
+
+
+def _record_ack(interaction):
+    trace = _active.get(interaction.id)
+    if trace is None or trace.acked is not None:
+        return
+    trace.acked = time.time()
+    latency = max(0.0, trace.acked - trace.received)
+    metrics.histogram("interaction_ack_seconds", latency, key=trace.key)
+    if latency > ACK_DEADLINE:
+        metrics.inc("interaction_late_ack_total", key=trace.key)
+
+
+# ---------- 自動defer ----------
+def _start_auto_defer(trace, interaction, ephemeral):
+    if trace.responding or interaction.response.is_done():
+        return
+    trace.auto_defer = asyncio.get_running_loop().create_task(_auto_defer(trace, interaction, ephemeral))
+
+
+async def _auto_defer(trace, interaction, ephemeral):
+    defer = _originals["defer"]
+    try:
+        if interaction.type is discord.InteractionType.application_command:
+            await defer(interaction.response, ephemeral=ephemeral, thinking=True)
+        else:
+            # ボタン・モーダルは「考え中」を出さずに受け付けだけ返す
+            await defer(interaction.response)
+    except discord.HTTPException as e:
+        log.warning("%s の自動deferに失敗しました: %s", trace.key, e)
+        return
+    _record_ack(interaction)
+    metrics.inc("interaction_auto_deferred_total", key=trace.key)
+    log.info("%s が %.1f 秒以内に応答しなかったため自動でdeferしました。", trace.key, AUTO_DEFER_BUDGET)
+
+
+async def _reroute(name, interaction, args, kwargs):
+    """自動deferの後に呼ばれた応答メソッドを followup 側で実行する。"""
+    if name == "defer":
+        return None
+    delete_after = kwargs.pop("delete_after", None)
+    if name == "send_message":
+        message = await interaction.followup.send(*args, wait=delete_after is not None, **kwargs)
+    elif name == "edit_message":
+        message = await interaction.edit_original_response(*args, **kwargs)
+    else:
+        metrics.inc("interaction_auto_defer_conflicts_total", method=name)
+        raise discord.InteractionResponded(interaction)
+    if delete_after is not None and message is not None:
+        await message.delete(delay=delete_after)
+    return None
+
+
+# ---------- フック ----------
+def _wrap_response_method(name):
+    original = _originals[name] = getattr(discord.InteractionResponse, name)
+
+    async def wrapper(self, *args, **kwargs):
+        trace = _active.get(self._parent.id)
+        if trace is not None:
+            if trace.auto_defer is not None:
+                await trace.auto_defer
+                return await _reroute(name, self._parent, args, kwargs)
+            trace.responding = True
+        first = not self.is_done()
+        result = await original(self, *args, **kwargs)
+        if first:
+            _record_ack(self._parent)
+        return result
+
+    wrapper.__wrapped__ = original
+    return wrapper
+
+
+def _count_errors(original):
+    async def on_error(self, interaction, error, *args):
+        trace = _current.get()
+        if trace is not None:
+            trace.failed = True
+        return await original(self, interaction, error, *args)
+
+    on_error.__wrapped__ = original
+    return on_error
+
+
+def _hook_on_error(cls):
+    # on_error を上書きしているクラスもあるので、使われるクラスごとに初回だけ包む
+    if not hasattr(cls.on_error, "__wrapped__"):
+        cls.on_error = _count_errors(cls.on_error)
+
+
+def _wrap_view_task(original):
+    async def wrapper(self, item, interaction):
+        _hook_on_error(type(self))
+        with track(interaction, component_key(interaction, item), item.callback):
+            return await original(self, item, interaction)
+
+    wrapper.__wrapped__ = original
+    return wrapper
+
+
+def _wrap_modal_task(original):
+    async def wrapper(self, interaction, components):
+        _hook_on_error(type(self))
+        with track(interaction, f"modal:{type(self).__name__}", type(self).on_submit):
+            return await original(self, interaction, components)
+
+    wrapper.__wrapped__ = original
+    return wrapper
+
+
+class _RateLimitHandler(logging.Handler):
+    def emit(self, record):
+        message = record.getMessage()
+        if "rate limited" not in message:
+            return
+        metrics.inc("http_rate_limited_total", source=record.name)
+        trace = _current.get()
+        if trace is not None:
+            trace.rate_limited += 1
+
+
+def install(bot):
+    """Botのコマンドツリー・HTTPクライアントと、discord.ui のクラスに計測を組み込む。"""
+    if getattr(bot, "_instrumented", False):
+        return
+    bot._instrumented = True
+
+    tree_call = bot.tree._call
+
+    async def call(interaction):
+        command = interaction.command
+        with track(interaction, command_key(interaction), getattr(command, "callback", None)) as trace:
+            try:
+                return await tree_call(interaction)
+            finally:
+                # AppCommandError は CommandTree.on_error に回されて、ここまで上がってこない
+                trace.failed = trace.failed or getattr(interaction, "command_failed", False)
+
+    bot.tree._call = call
+
+    request = bot.http.request
+
+    async def counted_request(route, **kwargs):
+        trace = _current.get()
+        if trace is not None:
+            trace.rest_calls += 1
+        return await request(route, **kwargs)
+
+    bot.http.request = counted_request
+
+    # クラス側のフックはプロセスで1回だけ
+    if not hasattr(ui.View._scheduled_task, "__wrapped__"):
+        ui.View._scheduled_task = _wrap_view_task(ui.View._scheduled_task)
+        ui.Modal._scheduled_task = _wrap_modal_task(ui.Modal._scheduled_task)
+        for name in RESPONSE_METHODS:
+            setattr(discord.InteractionResponse, name, _wrap_response_method(name))
+        handler = _RateLimitHandler(logging.WARNING)
+        for name in RATE_LIMIT_LOGGERS:
+            logging.getLogger(name).addHandler(handler)
+
+
+# ---------- 集計の参照 ----------
+def snapshot():
+    """キーごとの集計を dict で返す（/bot-stats と /stats 用）。"""
+    stats = {}
+
+    def entry(key):
+        return stats.setdefault(key, {
+            "count": 0, "errors": 0, "late_acks": 0, "unacked": 0, "rate_limited": 0, "auto_deferred": 0,
+        })
+
+    histogram_fields = {
+        "interaction_ack_seconds": "ack",
+        "interaction_handler_seconds": "handler",
+        "interaction_rest_calls": "rest_calls",
+    }
+    for (name, labels), item in metrics.histograms().items():
+        field = histogram_fields.get(name)
+        if field is None:
+            continue
+        entry(dict(labels)["key"])[field] = {
+            "count": item.count,
+            "mean": round(item.mean(), 4),
+            "p50": item.percentile(0.5),
+            "p99": item.percentile(0.99),
+        }
+    counter_fields = {
+        "interactions_total": "count",
+        "interaction_errors_total": "errors",
+        "interaction_late_ack_total": "late_acks",
+        "interaction_unacked_total": "unacked",
+        "interaction_rate_limited_total": "rate_limited",
+        "interaction_auto_deferred_total": "auto_deferred",
+    }
+    for (name, labels), value in metrics.counters().items():
+        field = counter_fields.get(name)
+        if field is not None:
+            entry(dict(labels)["key"])[field] = value
+    return stats
@@ -0,0 +1,192 @@
+from bisect import bisect_left, insort
+
+# ==============================
+# RSポイントのランキング索引
+# ==============================
+# エントリーの書き込み時に差分だけ更新し、順位・上位K件・合計・
+# アクティビティ別の人数と合計を O(log n) / O(1) で返す。
+# ソート済みリストは小さなリストの列（バケット）で持ち、
+# バケットの長さをFenwick木で管理して順位計算を O(log n) にする。
+
+LOAD = 256
+
+
+class SortedKeys:
+    def __init__(self, keys=()):
+        ordered = sorted(keys)
+        self._lists = [ordered[i:i + LOAD] for i in range(0, len(ordered), LOAD)]
+        self._maxes = [lst[-1] for lst in self._lists]
+        self._len = len(ordered)
+        self._tree = None
+
+    def __len__(self):
+        return self._len
+
+    # ---------- Fenwick木（バケット長の累積和） ----------
+    def _build_tree(self):
+        tree = [0] + [len(lst) for lst in self._lists]
+        for i in range(1, len(tree)):
+            j = i + (i & -i)
+            if j < len(tree):
+                tree[j] += tree[i]
+        self._tree = tree
+
+    def _tree_add(self, bucket, delta):
+        if self._tree is None:
+            return
+        i = bucket + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def _prefix(self, bucket):
+        # bucket より前のバケットに含まれる要素数
+        if self._tree is None:
+            self._build_tree()
+        total, i = 0, bucket
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def _locate(self, index):
+        # 全体での index 番目が (バケット, バケット内位置) のどこにあるか
+        if self._tree is None:
+            self._build_tree()
+        pos, step = 0, 1 << (len(self._tree).bit_length())
+        while step:
+            nxt = pos + step
+            if nxt < len(self._tree) and self._tree[nxt] <= index:
+                index -= self._tree[nxt]
+                pos = nxt
+            step >>= 1
+        return pos, index
+
+    # ---------- 更新 ----------
+    def add(self, key):
+        if not self._lists:
+            self._lists.append([key])
+            self._maxes.append(key)
+            self._len = 1
+            self._tree = None
+            return
+        i = min(bisect_left(self._maxes, key), len(self._lists) - 1)
+        lst = self._lists[i]
+        insort(lst, key)
+        self._maxes[i] = lst[-1]
+        self._len += 1
+        if len(lst) > 2 * LOAD:
+            self._lists[i:i + 1] = [lst[:LOAD], lst[LOAD:]]
+            self._maxes[i:i + 1] = [lst[LOAD - 1], lst[-1]]
+            self._tree = None
+        else:
+            self._tree_add(i, 1)
+
+    def remove(self, key):
+        i = bisect_left(self._maxes, key)
+        if i == len(self._lists):
+            raise KeyError(key)
+        lst = self._lists[i]
+        j = bisect_left(lst, key)
+        if lst[j] != key:
+            raise KeyError(key)
+        del lst[j]
+        self._len -= 1
+        if lst:
+            self._maxes[i] = lst[-1]
+            self._tree_add(i, -1)
+        else:
+            del self._lists[i]
+            del self._maxes[i]
+            self._tree = None
+
+    # ---------- 参照 ----------
+    def index(self, key):
+        i = bisect_left(self._maxes, key)
+        if i == len(self._lists):
+            raise KeyError(key)
+        j = bisect_left(self._lists[i], key)
+        if j == len(self._lists[i]) or self._lists[i][j] != key:
+            raise KeyError(key)
+        return self._prefix(i) + j
+
+    def count_below(self, key):
+        i = bisect_left(self._maxes, key)
+        if i == len(self._lists):
+            return self._len
+        return self._prefix(i) + bisect_left(self._lists[i], key)
+
+    def slice(self, start, stop):
+        start, stop = max(start, 0), min(stop, self._len)
+        if start >= stop:
+            return []
+        bucket, offset = self._locate(start)
+        result = []
+        while len(result) < stop - start:
+            lst = self._lists[bucket]
+            result.extend(lst[offset:offset + (stop - start - len(result))])
+            bucket, offset = bucket + 1, 0
+        return result
+
+
+class Leaderboard:
+    def __init__(self, entries=()):
+        """entries: (user_id, points, level) の列。level は申告区分の番号（1〜5 の int）。"""
+        self._entries = {}  # user_id -> (points, level)
+        self._level_counts = {}
+        self._level_totals = {}
+        self.total = 0
+        for user_id, points, level in entries:
+            self._account(int(user_id), points, level, 1)
+        self._keys = SortedKeys((-p, uid) for uid, (p, _) in self._entries.items())
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, user_id):
+        return int(user_id) in self._entries
+
+    def _account(self, user_id, points, level, sign):
+        if sign > 0:
+            self._entries[user_id] = (points, level)
+        self._level_counts[level] = self._level_counts.get(level, 0) + sign
+        self._level_totals[level] = self._level_totals.get(level, 0) + sign * points
+        self.total += sign * points
+
+    # ---------- 更新 ----------
+    def update(self, user_id, points, level=None):
+        user_id = int(user_id)
+        self.remove(user_id)
+        self._account(user_id, points, level, 1)
+        self._keys.add((-points, user_id))
+
+    def remove(self, user_id):
+        user_id = int(user_id)
+        old = self._entries.pop(user_id, None)
+        if old is None:
+            return False
+        self._account(user_id, old[0], old[1], -1)
+        self._keys.remove((-old[0], user_id))
+        return True
+
+    # ---------- 参照 ----------
+    def rank(self, user_id):
+        """同点は同順位とした1始まりの順位。未登録なら None。"""
+        entry = self._entries.get(int(user_id))
+        if entry is None:
+            return None
+        return self._keys.count_below((-entry[0], -1)) + 1
+
+    def top(self, k, offset=0):
+        return [(uid, -neg) for neg, uid in self._keys.slice(offset, offset + k)]
+
+    def __getitem__(self, index):
+        # PageSnapshot から rows[start:stop] として使えるようにする
+        if isinstance(index, slice):
+            start, stop, _ = index.indices(len(self))
+            return self.top(stop - start, start)
+        neg, uid = self._keys.slice(index, index + 1)[0]
+        return uid, -neg
+
+    def bucket(self, level):
+        return self._level_counts.get(level, 0), self._level_totals.get(level, 0)
@@ -0,0 +1,228 @@
+import asyncio
+import os
+import time
+from array import array
+
+import discord
+
+from utils import metrics
+
+# ==============================
+# Intentsのプロファイルとメンバーの遅延解決
+# ==============================
+# INTENTS_PROFILE=minimal（既定）: guilds と members だけを受け取る。
+#   presence・メッセージ本文・入力中は受け取らず、メンバーキャッシュも持たない（起動時のチャンク取得もしない）。
+# INTENTS_PROFILE=full: 従来どおり Intents.all() で全メンバーをキャッシュする。
+#
+# ロールの所属は MemberResolver がギルドごとに必要になった時点で取得し、
+#   ロールID -> メンバーID / メンバーID -> ロールID / メンバーID -> 表示名
+# だけのスナップショットとして持つ（Memberオブジェクトは保持しない）。
+# 同じギルドの取得は同時に1回だけ行い、その後のロール変更・参加・退出は差分で反映する。
+# キャッシュに無いメンバーの更新では on_member_update が呼ばれないので、
+# GUILD_MEMBER_UPDATE / ADD はパーサーを直接フックする。
+# 取得中（チャンク待ち）に届いた差分は溜めておき、取得が終わったスナップショットに順に反映する。
+# スナップショットに期限は無く、新しいセッションで接続し直したとき（on_ready / on_shard_ready）だけ捨てる。
+# RESUME で再開した場合は切断中のイベントが再送されるので、差分のままで追いつく。
+
+INTENTS_PROFILE = os.getenv("INTENTS_PROFILE", "minimal")
+
+
+def client_options(profile=INTENTS_PROFILE):
+    """commands.Bot に渡す intents などのオプションを返す。"""
+    if profile == "full":
+        return {"intents": discord.Intents.all()}
+    if profile != "minimal":
+        raise ValueError(f"INTENTS_PROFILE は minimal か full を指定してください: {profile}")
+    return {
+        "intents": discord.Intents(guilds=True, members=True),
+        "member_cache_flags": discord.MemberCacheFlags.none(),
+        "chunk_guilds_at_startup": False,
+    }
+
+
+class GuildSnapshot:
+    __slots__ = ("role_members", "member_roles", "names", "bots", "_sorted")
+
+    def __init__(self):
+        self.role_members = {}  # role_id -> {member_id}
+        self.member_roles = {}  # member_id -> array('Q')（ロールIDをintのオブジェクトにしない）
+        self.names = {}  # member_id -> 表示名
+        self.bots = set()
+        self._sorted = {}  # (role_id, bots) -> 並べ替え済みの member_id のタプル（メンバーのロールが変わったら捨てる）
+
+    @classmethod
+    def from_members(cls, members):
+        snapshot = cls()
+        for member in members:
+            # member.roles は Role を並べ替えて作るので、IDの配列をそのまま使う
+            snapshot.set_member(member.id, member._roles, member.display_name, member.bot)
+        return snapshot
+
+    def set_member(self, member_id, role_ids, name, bot=False):
+        """メンバーの状態を更新し、増減したロールIDの集合を返す。"""
+        before = set(self.member_roles.get(member_id, ()))
+        after = set(role_ids)
+        self.member_roles[member_id] = array("Q", after)
+        self.names[member_id] = name
+        if bot:
+            self.bots.add(member_id)
+        for role_id in before - after:
+            self.role_members.get(role_id, set()).discard(member_id)
+        for role_id in after - before:
+            self.role_members.setdefault(role_id, set()).add(member_id)
+        changed = before ^ after
+        self._forget(changed)
+        return changed
+
+    def remove_member(self, member_id):
+        role_ids = self.member_roles.pop(member_id, ())
+        self.names.pop(member_id, None)
+        self.bots.discard(member_id)
+        for role_id in role_ids:
+            self.role_members.get(role_id, set()).discard(member_id)
+        removed = set(role_ids)
+        self._forget(removed)
+        return removed
+
+    def remove_role(self, role_id):
+        self.role_members.pop(role_id, None)
+        self._forget((role_id,))
+
+    def _forget(self, role_ids):
+        for role_id in role_ids:
+            self._sorted.pop((role_id, False), None)
+            self._sorted.pop((role_id, True), None)
+
+    def members_of(self, role_id, bots=False):
+        key = (role_id, bots)
+        ids = self._sorted.get(key)
+        if ids is None:
+            ids = self.role_members.get(role_id, ())
+            if not bots:
+                ids = [member_id for member_id in ids if member_id not in self.bots]
+            ids = self._sorted[key] = tuple(sorted(ids))
+        return ids
+
+    def roles_of(self, member_id):
+        return self.member_roles.get(member_id, ())
+
+
+class MemberResolver:
+    def __init__(self, bot):
+        self.bot = bot
+        self._snapshots = {}  # guild_id -> GuildSnapshot
+        self._loading = {}  # guild_id -> Task
+        self._pending = {}  # guild_id -> 取得中に届いた差分 [(member_id, data or None)]（None は退出）
+        bot.add_listener(self.on_raw_member_remove)
+        bot.add_listener(self.on_guild_role_delete)
+        bot.add_listener(self.on_guild_remove)
+        bot.add_listener(self.on_ready)
+        bot.add_listener(self.on_shard_ready)
+        parsers = bot._connection.parsers
+        for event in ("GUILD_MEMBER_ADD", "GUILD_MEMBER_UPDATE"):
+            parsers[event] = self._hook(parsers[event])
+
+    async def snapshot(self, guild):
+        snapshot = self._snapshots.get(guild.id)
+        if snapshot is not None:
+            metrics.inc("member_snapshot_hits_total")
+            return snapshot
+
+        task = self._loading.get(guild.id)
+        if task is None:
+            self._pending[guild.id] = []
+            task = self._loading[guild.id] = asyncio.create_task(self._load(guild))
+            task.add_done_callback(lambda _: self._finish_load(guild.id))
+        else:
+            metrics.inc("member_snapshot_coalesced_total")
+        return await asyncio.shield(task)
+
+    async def _load(self, guild):
+        started = time.perf_counter()
+        # full プロファイルでは起動時に取得済みのキャッシュを使う
+        members = guild.members if guild.chunked else await guild.chunk(cache=False)
+        snapshot = GuildSnapshot.from_members(members)
+        # チャンク待ちの間に届いた差分を、届いた順に反映する（どれもそのメンバーの最新の状態）
+        for member_id, data in self._pending.pop(guild.id, ()):
+            self._update(snapshot, guild.id, member_id, data)
+        self._snapshots[guild.id] = snapshot
+        metrics.inc("member_snapshot_loads_total")
+        metrics.observe("member_snapshot_seconds", time.perf_counter() - started)
+        return snapshot
+
+    def _finish_load(self, guild_id):
+        self._loading.pop(guild_id, None)
+        self._pending.pop(guild_id, None)  # 失敗・キャンセル時の後始末
+
+    async def role_member_ids(self, role, bots=False):
+        snapshot = await self.snapshot(role.guild)
+        return snapshot.members_of(role.id, bots)
+
+    def display_name(self, guild, member_id):
+        """取得済みの情報から表示名を返す（分からなければ None）。ページの行の組み立て用。"""
+        member = guild.get_member(member_id)
+        if member is not None:
+            return member.display_name
+        snapshot = self._snapshots.get(guild.id)
+        return snapshot.names.get(member_id) if snapshot else None
+
+    def invalidate(self, guild_id):
+        self._snapshots.pop(guild_id, None)
+
+    # ---------- 再接続 ----------
+    async def on_ready(self):
+        # 新しいセッションでは切断中の差分が届かないので、次に使うときに取り直す
+        self._snapshots.clear()
+
+    async def on_shard_ready(self, shard_id):
+        shard_count = self.bot.shard_count or 1
+        for guild_id in [g for g in self._snapshots if (g >> 22) % shard_count == shard_id]:
+            self.invalidate(guild_id)
+
+    # ---------- 差分の反映 ----------
+    def _hook(self, parser):
+        def hooked(data):
+            self._apply(data)
+            return parser(data)
+        return hooked
+
+    def _apply(self, data):
+        guild_id = int(data["guild_id"])
+        member_id = int(data["user"]["id"])
+        self._delta(guild_id, member_id, data)
+
+    async def on_raw_member_remove(self, payload):
+        self._delta(payload.guild_id, payload.user.id, None)
+
+    def _delta(self, guild_id, member_id, data):
+        pending = self._pending.get(guild_id)
+        if pending is not None:
+            pending.append((member_id, data))
+        snapshot = self._snapshots.get(guild_id)
+        if snapshot is not None:
+            self._update(snapshot, guild_id, member_id, data)
+
+    def _update(self, snapshot, guild_id, member_id, data):
+        if data is None:
+            changed = snapshot.remove_member(member_id)
+        else:
+            user = data["user"]
+            name = data.get("nick") or user.get("global_name") or user["username"]
+            changed = snapshot.set_member(member_id, map(int, data.get("roles", ())), name, user.get("bot", False))
+        if changed:
+            self.bot.dispatch("member_roles_update", guild_id, member_id, changed)
+
+    async def on_guild_role_delete(self, role):
+        snapshot = self._snapshots.get(role.guild.id)
+        if snapshot is not None:
+            snapshot.remove_role(role.id)
+
+    async def on_guild_remove(self, guild):
+        self.invalidate(guild.id)
+
+
+def get_member_resolver(bot):
+    resolver = getattr(bot, "member_resolver", None)
+    if resolver is None:
+        resolver = bot.member_resolver = MemberResolver(bot)
+    return resolver
@@ -0,0 +1,19 @@
+# ==============================
+# メンションの分割送信
+# ==============================
+# Discordのメッセージ上限（2000文字）を超えないように、メンションを
+# 空白区切りで詰め込んだチャンクに分けて返す。
+
+MESSAGE_LIMIT = 2000
+
+
+def mention_chunks(user_ids, limit=MESSAGE_LIMIT, prefix=""):
+    chunk = prefix
+    for user_id in user_ids:
+        mention = f"<@{user_id}>"
+        if len(chunk) + len(mention) + 1 > limit and chunk != prefix:
+            yield chunk.rstrip()
+            chunk = prefix
+        chunk += mention + " "
+    if chunk != prefix:
+        yield chunk.rstrip()
@@ -0,0 +1,179 @@
+import time
+from bisect import bisect_left
+from collections import deque
+
+# ==============================
+# 軽量メトリクス（プロセス内集計）
+# ==============================
+# カウンターは単純な加算、観測値は件数・合計・最大値と直近サンプルを保持する。
+# ヒストグラムは固定の境界ごとの件数だけを持つ（記録は二分探索1回、メモリは一定）。
+# ラベルはキーワード引数で渡し、(name, labels) ごとに集計する。
+# render_prometheus で Prometheus のテキスト形式に書き出せる。
+
+SAMPLE_SIZE = 1024
+
+_counters = {}
+_summaries = {}
+_histograms = {}
+
+# 秒単位の既定の境界（インタラクションの3秒制限の前後を細かく取る）
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 1.5, 2.0, 2.5, 3.0, 5.0, 10.0)
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+class Summary:
+    __slots__ = ("count", "total", "max", "samples")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = deque(maxlen=SAMPLE_SIZE)
+
+    def observe(self, value):
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+        self.samples.append(value)
+
+    def percentile(self, q):
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(q * len(ordered)))
+        return ordered[index]
+
+
+class Histogram:
+    __slots__ = ("bounds", "buckets", "count", "total")
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = tuple(bounds)
+        self.buckets = [0] * (len(self.bounds) + 1)  # 最後は +Inf
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value):
+        self.buckets[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+
+    def percentile(self, q):
+        """q分位点が入るバケットの上限（+Inf のバケットなら最大の境界）を返す。"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(self.bounds, self.buckets):
+            seen += n
+            if seen >= rank:
+                return bound
+        return self.bounds[-1]
+
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+
+def inc(name, value=1, **labels):
+    key = _key(name, labels)
+    _counters[key] = _counters.get(key, 0) + value
+
+
+def observe(name, value, **labels):
+    key = _key(name, labels)
+    summary = _summaries.get(key)
+    if summary is None:
+        summary = _summaries[key] = Summary()
+    summary.observe(value)
+
+
+def histogram(name, value, bounds=LATENCY_BUCKETS, **labels):
+    key = _key(name, labels)
+    item = _histograms.get(key)
+    if item is None:
+        item = _histograms[key] = Histogram(bounds)
+    item.observe(value)
+
+
+class timer:
+    """with文で囲んだ区間の経過秒数を observe する。"""
+
+    def __init__(self, name, **labels):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.name, time.perf_counter() - self.start, **self.labels)
+
+
+def summary(name, **labels):
+    return _summaries.get(_key(name, labels))
+
+
+def counters():
+    return dict(_counters)
+
+
+def summaries():
+    return dict(_summaries)
+
+
+def histograms():
+    return dict(_histograms)
+
+
+# ---------- Prometheus形式 ----------
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(labels, **extra):
+    pairs = list(labels) + list(extra.items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def render_prometheus(gauges=None):
+    """gauges: 追加で出す {名前: 値}（プロセス外の状態など）"""
+    lines = []
+    typed = set()
+
+    def declare(name, kind):
+        # 同じ名前の TYPE 行は1回だけ
+        if name not in typed:
+            typed.add(name)
+            lines.append(f"# TYPE {name} {kind}")
+
+    for (name, labels), value in sorted(_counters.items()):
+        declare(name, "counter")
+        lines.append(f"{name}{_labels(labels)} {value}")
+    for (name, labels), item in sorted(_summaries.items(), key=lambda kv: kv[0]):
+        declare(name, "summary")
+        for q in QUANTILES:
+            lines.append(f"{name}{_labels(labels, quantile=q)} {item.percentile(q)}")
+        lines.append(f"{name}_sum{_labels(labels)} {item.total}")
+        lines.append(f"{name}_count{_labels(labels)} {item.count}")
+    for (name, labels), item in sorted(_histograms.items(), key=lambda kv: kv[0]):
+        declare(name, "histogram")
+        cumulative = 0
+        for bound, n in zip(item.bounds + ("+Inf",), item.buckets):
+            cumulative += n
+            lines.append(f"{name}_bucket{_labels(labels, le=bound)} {cumulative}")
+        lines.append(f"{name}_sum{_labels(labels)} {item.total}")
+        lines.append(f"{name}_count{_labels(labels)} {item.count}")
+    for name, value in sorted((gauges or {}).items()):
+        declare(name, "gauge")
+        lines.append(f"{name} {value}")
+    return "\n".join(lines) + "\n"
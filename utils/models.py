@@ -0,0 +1,169 @@
+import enum
+from dataclasses import dataclass, field, fields
+
+# ==============================
+# イベント・スケジュールの状態モデル
+# ==============================
+# ストアとCogがやり取りするレコード。どれも __slots__ 付きの dataclass で、
+# 1件ごとにキー文字列を持つ dict より小さく、属性アクセスで型が分かる。
+#   - ギルドID・ユーザーIDは int に揃える（JSONのキーにするときだけ str にする）
+#   - WSのアクティビティは Activity（str の列挙）にして、全エントリーで同じオブジェクトを共有する
+#   - 知らないキーは extra に残し、to_dict() で元の dict に戻せるようにする（JSONとの変換で情報を落とさない）
+#   - 元の dict に無かったキーは absent に覚えておき、既定値のままなら to_dict() でも書き出さない
+#     （"common_role" が無い設定が null 付きに、"points" が無いエントリーが 0 付きに変わらないように）
+
+
+class Activity(str, enum.Enum):
+    CAPTAIN = "⭐️キャプテン"
+    SUPERMAN = "スーパーマン"
+    ACTIVE = "アクティブ"
+    CASUAL = "カジュアル"
+    RELAXED = "リラックス"
+
+    # 表示・JSONでは値の文字列として扱う
+    __str__ = str.__str__
+    __format__ = str.__format__
+
+    @classmethod
+    def parse(cls, value):
+        """既知の区分なら Activity、知らない文字列（旧データ）はそのまま返す。"""
+        return cls._value2member_map_.get(value, value)
+
+
+_field_names = {}  # クラス -> extra / absent 以外のフィールド名（読み込みは件数分呼ばれるので毎回 fields() しない）
+_defaults = {}  # クラス -> {フィールド名: 既定値}
+_absent_sets = {}  # 無かったキーの組み合わせ -> 共有する frozenset（レコードごとに作らない）
+NO_ABSENT = frozenset()
+
+
+def _names(cls):
+    names = _field_names.get(cls)
+    if names is None:
+        names = _field_names[cls] = tuple(f.name for f in fields(cls) if f.name not in ("extra", "absent"))
+        _defaults[cls] = {f.name: f.default for f in fields(cls) if f.name in names}
+    return names
+
+
+def _split(cls, data):
+    """(既知のキー, 知らないキー or None, 無かったキーの frozenset) に分ける。"""
+    names = _names(cls)
+    keys = data.keys()
+    missing = tuple(name for name in names if name not in keys)
+    absent = _absent_sets.setdefault(missing, frozenset(missing)) if missing else NO_ABSENT
+    if len(keys) + len(missing) == len(names):
+        return data, None, absent
+    known = {k: v for k, v in data.items() if k in names}
+    extra = {k: v for k, v in data.items() if k not in names}
+    return known, extra, absent
+
+
+def _to_dict(record):
+    absent = record.absent
+    if absent:
+        defaults = _defaults[type(record)]
+        data = {name: getattr(record, name) for name in _names(type(record))
+                if name not in absent or getattr(record, name) != defaults[name]}
+    else:
+        data = {name: getattr(record, name) for name in _names(type(record))}
+    if record.extra:
+        data.update(record.extra)
+    return data
+
+
+@dataclass(slots=True)
+class RSEntry:
+    name: str = None
+    level: int = None
+    points: int = 0
+    extra: dict = None
+    absent: frozenset = field(default=NO_ABSENT, repr=False, compare=False)
+
+    @classmethod
+    def from_dict(cls, data):
+        known, extra, absent = _split(cls, data)
+        return cls(**known, extra=extra or None, absent=absent)
+
+    def to_dict(self):
+        return _to_dict(self)
+
+
+@dataclass(slots=True)
+class WSEntry:
+    name: str = None
+    activity: Activity = None
+    extra: dict = None
+    absent: frozenset = field(default=NO_ABSENT, repr=False, compare=False)
+
+    @classmethod
+    def from_dict(cls, data):
+        known, extra, absent = _split(cls, data)
+        entry = cls(**known, extra=extra or None, absent=absent)
+        if entry.activity is not None:
+            entry.activity = Activity.parse(entry.activity)
+        return entry
+
+    def to_dict(self):
+        return _to_dict(self)
+
+
+ENTRY_TYPES = {"rs": RSEntry, "ws": WSEntry}
+
+
+@dataclass(slots=True)
+class GuildEventConfig:
+    entry_channel: int = None
+    admin_channel: int = None
+    common_role: int = None
+    entry_messages: list = None  # 最近のエントリー投稿のメッセージID（古い順）
+    extra: dict = field(default_factory=dict)
+    absent: frozenset = field(default=NO_ABSENT, repr=False, compare=False)
+
+    @classmethod
+    def from_dict(cls, data):
+        known, extra, absent = _split(cls, data)
+        return cls(**known, extra=extra or {}, absent=absent)
+
+    def to_dict(self):
+        data = _to_dict(self)
+        if self.entry_messages is None:
+            data.pop("entry_messages", None)
+        return data
+
+    def update(self, **values):
+        for key, value in values.items():
+            if key in _CONFIG_FIELDS:
+                setattr(self, key, value)
+            else:
+                self.extra[key] = value
+
+
+_CONFIG_FIELDS = set(_names(GuildEventConfig))
+
+
+@dataclass(slots=True)
+class GuildEventState:
+    """JSONストアがギルドごとに持つ設定・エントリー・チーム。"""
+    config: GuildEventConfig
+    entries: dict = field(default_factory=dict)  # user_id(int) -> RSEntry / WSEntry
+    teams: dict = field(default_factory=dict)  # チーム名 -> role_id
+
+
+@dataclass(slots=True)
+class Schedule:
+    channel_id: int
+    message: str
+    expr: str = None
+    created: int = None
+    last_post: int = None
+    extra: dict = None  # 旧形式の type / time / weekday / day / interval_days など
+    absent: frozenset = field(default=NO_ABSENT, repr=False, compare=False)
+
+    @classmethod
+    def from_dict(cls, data):
+        known, extra, absent = _split(cls, data)
+        return cls(**known, extra=extra or None, absent=absent)
+
+    def to_dict(self):
+        data = _to_dict(self)
+        # 未設定の項目は書き出さない（旧データと同じ形に戻す）
+        return {k: v for k, v in data.items() if v is not None or k in ("channel_id", "message")}
@@ -0,0 +1,136 @@
+from collections import OrderedDict
+
+import discord
+from discord import ui
+
+from utils.instrument import defer_policy
+
+# ==============================
+# ページ分割Embed
+# ==============================
+# 一覧はソート済みのスナップショットとしてキャッシュし、ボタンが押されたら
+# 該当ページの行だけを整形する（1クリックあたり O(ページサイズ)）。
+# データが変わったら invalidate でスナップショットを捨てる。
+# rows には Leaderboard のような更新され続ける列も渡せる（写し取らない）。その場合に備えて、
+# ページ数は表示のたびに今の件数から数え直す（開いている間に増減しても欠けたり空のページにならない）。
+
+PAGE_SIZE = 20
+
+
+class PageSnapshot:
+    __slots__ = ("rows", "formatter", "footer")
+
+    def __init__(self, rows, formatter=str, footer=None):
+        self.rows = rows
+        self.formatter = formatter  # (順位, 行) -> 表示文字列
+        self.footer = footer
+
+    def __len__(self):
+        return len(self.rows)
+
+    def page_count(self, page_size=PAGE_SIZE):
+        return max(1, -(-len(self.rows) // page_size))
+
+    def render(self, page, page_size=PAGE_SIZE):
+        start = page * page_size
+        return "\n".join(
+            self.formatter(start + i + 1, row)
+            for i, row in enumerate(self.rows[start:start + page_size])
+        )
+
+
+class SnapshotCache:
+    def __init__(self, maxsize=256):
+        self._items = OrderedDict()
+        self.maxsize = maxsize
+
+    def get(self, key, build):
+        snapshot = self._items.get(key)
+        if snapshot is None:
+            snapshot = self._items[key] = build()
+            if len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+        else:
+            self._items.move_to_end(key)
+        return snapshot
+
+    def invalidate(self, key):
+        self._items.pop(key, None)
+
+
+class PaginatedEmbedView(ui.View):
+    def __init__(self, snapshot, title, color, page_size=PAGE_SIZE, timeout=300):
+        super().__init__(timeout=timeout)
+        self.snapshot = snapshot
+        self.title = title
+        self.color = color
+        self.page_size = page_size
+        self.page = 0
+        self._update_buttons()
+
+    @property
+    def pages(self):
+        return self.snapshot.page_count(self.page_size)
+
+    def embed(self):
+        embed = discord.Embed(
+            title=self.title,
+            description=self.snapshot.render(self.page, self.page_size),
+            color=self.color
+        )
+        footer = f"ページ {self.page + 1}/{self.pages}"
+        if self.snapshot.footer:
+            footer = f"{self.snapshot.footer} | {footer}"
+        embed.set_footer(text=footer)
+        return embed
+
+    def _update_buttons(self):
+        pages = self.pages
+        self.prev_page.disabled = self.page == 0
+        self.next_page.disabled = self.page >= pages - 1
+        self.jump.disabled = pages == 1
+
+    async def show(self, interaction, page):
+        self.page = min(max(page, 0), self.pages - 1)
+        self._update_buttons()
+        await interaction.response.edit_message(embed=self.embed(), view=self)
+
+    async def send(self, interaction, ephemeral=True):
+        if self.pages == 1:
+            await interaction.response.send_message(embed=self.embed(), ephemeral=ephemeral)
+        else:
+            await interaction.response.send_message(embed=self.embed(), view=self, ephemeral=ephemeral)
+
+    @ui.button(label="◀", style=discord.ButtonStyle.secondary)
+    async def prev_page(self, interaction, button):
+        await self.show(interaction, self.page - 1)
+
+    @ui.button(label="▶", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction, button):
+        await self.show(interaction, self.page + 1)
+
+    @ui.button(label="🔢 ページ指定", style=discord.ButtonStyle.primary)
+    @defer_policy(enabled=False)  # モーダルを返す
+    async def jump(self, interaction, button):
+        await interaction.response.send_modal(PageJumpModal(self))
+
+
+class PageJumpModal(ui.Modal, title="ページ移動"):
+    def __init__(self, parent_view):
+        super().__init__()
+        self.parent_view = parent_view
+        self.page_input = ui.TextInput(
+            label=f"ページ番号（1〜{parent_view.pages}）",
+            placeholder="例: 3",
+            style=discord.TextStyle.short,
+            required=True
+        )
+        self.add_item(self.page_input)
+
+    async def on_submit(self, interaction: discord.Interaction):
+        try:
+            page = int(self.page_input.value) - 1
+        except ValueError:
+            await interaction.response.send_message("⚠️ 数字を入力してください。", ephemeral=True)
+            return
+        await self.parent_view.show(interaction, page)
@@ -0,0 +1,119 @@
+import heapq
+import itertools
+from bisect import bisect_left
+
+# ==============================
+# 予想Ptsによるチーム分割
+# ==============================
+# (キー, Pts) の列を k グループに分け、グループ合計Ptsの差を小さくする（多分割の数分割問題）。
+# - LPT: Ptsの大きい順に、合計が最小のグループへ入れる
+# - Karmarkar–Karp（差分法）: 部分解どうしを「大きい合計 × 小さい合計」で組み合わせていく
+# 両方を計算して差の小さい方を採り、最大・最小グループ間の入れ替えで仕上げる。
+# LPTは O(n log n)、KKは O(n k log k) で、1万件でも0.1秒程度で終わる。
+
+REFINE_ROUNDS = 64
+
+
+def _flatten(node, out):
+    # KKのグループは [左, 右] の入れ子リストで持ち、最後に平らにする
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if node is None:
+            continue
+        if type(node) is list:
+            stack.extend(node)
+        else:
+            out.append(node)
+    return out
+
+
+def lpt(items, k):
+    groups = [[] for _ in range(k)]
+    heap = [(0, i) for i in range(k)]
+    for key, weight in sorted(items, key=lambda item: item[1], reverse=True):
+        total, i = heap[0]
+        groups[i].append((key, weight))
+        heapq.heapreplace(heap, (total + weight, i))
+    return groups
+
+
+def karmarkar_karp(items, k):
+    counter = itertools.count()
+    heap = []
+    for key, weight in items:
+        # 部分解: 合計の降順に並んだ k 個の (合計, グループ)
+        parts = [(weight, (key, weight))] + [(0, None)] * (k - 1)
+        heap.append((-weight, next(counter), parts))
+    if not heap:
+        return [[] for _ in range(k)]
+    heapq.heapify(heap)
+    while len(heap) > 1:
+        _, _, a = heapq.heappop(heap)
+        _, _, b = heapq.heappop(heap)
+        merged = []
+        for (sa, na), (sb, nb) in zip(a, reversed(b)):
+            node = na if nb is None else nb if na is None else [na, nb]
+            merged.append((sa + sb, node))
+        merged.sort(key=lambda part: part[0], reverse=True)
+        low = merged[-1][0]
+        merged = [(s - low, node) for s, node in merged]
+        heapq.heappush(heap, (-merged[0][0], next(counter), merged))
+    _, _, parts = heap[0]
+    return [_flatten(node, []) for _, node in parts]
+
+
+def spread(groups):
+    totals = [sum(w for _, w in g) for g in groups]
+    return max(totals) - min(totals)
+
+
+def _refine(groups):
+    # 最大と最小のグループで、差を最も縮める1件の移動か入れ替えを繰り返す
+    totals = [sum(w for _, w in g) for g in groups]
+    for _ in range(REFINE_ROUNDS):
+        hi = max(range(len(groups)), key=totals.__getitem__)
+        lo = min(range(len(groups)), key=totals.__getitem__)
+        gap = totals[hi] - totals[lo]
+        if gap <= 0:
+            break
+        # 入れ替えで hi から lo へ d = x - y を移すと、新しい差は |gap - 2d|
+        best, best_pair = gap, None
+        low_sorted = sorted((w, i) for i, (_, w) in enumerate(groups[lo]))
+        low_weights = [w for w, _ in low_sorted]
+        for i, (_, x) in enumerate(groups[hi]):
+            if 0 < x and abs(gap - 2 * x) < best:
+                best, best_pair = abs(gap - 2 * x), (i, None)
+            j = bisect_left(low_weights, x - gap / 2)
+            for jj in (j - 1, j):
+                if 0 <= jj < len(low_weights):
+                    d = x - low_weights[jj]
+                    if 0 < d and abs(gap - 2 * d) < best:
+                        best, best_pair = abs(gap - 2 * d), (i, low_sorted[jj][1])
+        if best_pair is None:
+            break
+        i, j = best_pair
+        item = groups[hi][i]
+        if j is None:
+            groups[hi][i] = groups[hi][-1]
+            groups[hi].pop()
+            groups[lo].append(item)
+            moved = item[1]
+        else:
+            other = groups[lo][j]
+            groups[hi][i], groups[lo][j] = other, item
+            moved = item[1] - other[1]
+        totals[hi] -= moved
+        totals[lo] += moved
+    return groups
+
+
+def partition(items, k):
+    """items: (キー, Pts) の列。合計Ptsがなるべく等しい k 個のグループ（(キー, Pts) のリスト）を返す。"""
+    if k <= 0:
+        raise ValueError("グループ数は1以上で指定してください。")
+    items = list(items)
+    best = min((lpt(items, k), karmarkar_karp(items, k)), key=spread)
+    groups = _refine(best)
+    groups.sort(key=lambda g: sum(w for _, w in g), reverse=True)
+    return groups
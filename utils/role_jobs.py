@@ -0,0 +1,276 @@
+import asyncio
+import logging
+import time
+
+import discord
+
+from utils import metrics
+from utils.cluster import worker_path
+from utils.members import get_member_resolver
+from utils.store import JsonStore
+
+log = logging.getLogger(__name__)
+
+# ==============================
+# ロール一括変更ジョブ
+# ==============================
+# インタラクションはすぐに defer し、ロールの付け外しはバックグラウンドのジョブで行う。
+# - 同時実行数を制限して1人ずつ処理し、進捗は1つのfollowupメッセージを編集して表示する
+# - チャンク単位でチェックポイントを保存し、再起動後は続きから再開する
+# - 外す人数が多い場合は、ロールを同じ設定で作り直した方が安く済むのでそちらを選ぶ
+#   （作り直したときは "role_replaced" イベントで各Cogに新しいロールIDを通知する）
+# - 複数ロールの付け外しをまとめた一括ジョブ（submit_batch）も同じ仕組みで処理する
+
+JOB_FILE = worker_path("data/role_jobs.json")  # クラスターではワーカーごとのファイル
+CONCURRENCY = 4
+CHUNK_SIZE = 20
+PROGRESS_INTERVAL = 2.0
+RECREATE_MIN_MEMBERS = 25
+
+
+class RoleJobManager:
+    def __init__(self, bot, path=JOB_FILE, concurrency=CONCURRENCY):
+        self.bot = bot
+        self.store = JsonStore(path, flush_interval=1.0)
+        self.jobs = self.store.data
+        self.concurrency = concurrency
+        self._tasks = {}
+        self._resumed = False
+        bot.add_listener(self._resume, "on_ready")
+
+    def active_job(self, guild_id, role_id):
+        for job_id, job in self.jobs.items():
+            if job["guild_id"] == guild_id and job["role_id"] == role_id:
+                return job_id
+        return None
+
+    # ---------- 投入 ----------
+    async def submit(self, interaction, role, action="remove", member_ids=None, allow_recreate=True):
+        """defer済みのインタラクションからジョブを投入し、進捗メッセージを返す。"""
+        guild = interaction.guild
+        if self.active_job(guild.id, role.id):
+            await interaction.followup.send(f"⏳ {role.name} のジョブは既に実行中です。", ephemeral=True)
+            return None
+
+        if member_ids is None:
+            member_ids = list(await get_member_resolver(self.bot).role_member_ids(role, bots=True))
+        job_id = f"{guild.id}-{role.id}-{int(time.time() * 1000)}"
+        job = {
+            "guild_id": guild.id,
+            "role_id": role.id,
+            "role_name": role.name,
+            "action": action,
+            "members": member_ids,
+            "cursor": 0,
+            "failed": 0,
+            "channel_id": interaction.channel_id,
+            "mode": "members",
+        }
+        if action == "remove" and allow_recreate and self._recreate_is_cheaper(guild, role, len(member_ids)):
+            job["mode"] = "recreate"
+        self.jobs[job_id] = job
+        self.store.mark_dirty(guild.id)
+
+        message = await interaction.followup.send(self._progress_text(job), ephemeral=True, wait=True)
+        self._start(job_id, message)
+        return message
+
+    async def submit_batch(self, interaction, label, operations):
+        """operations: [user_id, role_id, "add" | "remove"] の列。1つのジョブとして順に反映する。"""
+        guild = interaction.guild
+        if self.active_job(guild.id, None):
+            await interaction.followup.send("⏳ 一括変更のジョブは既に実行中です。", ephemeral=True)
+            return None
+
+        job_id = f"{guild.id}-batch-{int(time.time() * 1000)}"
+        job = {
+            "guild_id": guild.id,
+            "role_id": None,
+            "role_name": label,
+            "action": "batch",
+            "members": [list(op) for op in operations],
+            "cursor": 0,
+            "failed": 0,
+            "channel_id": interaction.channel_id,
+            "mode": "members",
+        }
+        self.jobs[job_id] = job
+        self.store.mark_dirty(guild.id)
+
+        message = await interaction.followup.send(self._progress_text(job), ephemeral=True, wait=True)
+        self._start(job_id, message)
+        return message
+
+    def _start(self, job_id, message):
+        task = asyncio.create_task(self._run(job_id, message))
+        self._tasks[job_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job_id, None))
+
+    # ---------- 実行 ----------
+    def _recreate_is_cheaper(self, guild, role, member_count):
+        if role.managed or role.is_default() or not role.is_assignable():
+            return False
+        if member_count < RECREATE_MIN_MEMBERS:
+            return False
+        # 作成・位置調整・削除 + 権限上書きのコピー分のリクエスト数と比較する
+        overwrites = sum(1 for c in guild.channels if role in c.overwrites)
+        return 3 + overwrites < member_count
+
+    def _progress_text(self, job, finished=False):
+        verb = {"add": "付与", "remove": "解除"}.get(job["action"], "反映")
+        if job["mode"] == "recreate":
+            if finished:
+                return f"🧹 {job['role_name']} を作り直して {len(job['members'])} 人の{verb}を完了しました。"
+            return f"🔄 {job['role_name']} を同じ設定で作り直しています…（{len(job['members'])} 人）"
+        done = min(job["cursor"], len(job["members"]))
+        head = "✅" if finished else "⏳"
+        unit = "件" if job["action"] == "batch" else "人"
+        text = f"{head} {job['role_name']} の{verb}: {done}/{len(job['members'])} {unit}"
+        if job["failed"]:
+            text += f"（失敗 {job['failed']} 件）"
+        return text
+
+    async def _edit_progress(self, message, job, finished=False):
+        if message is None:
+            return
+        try:
+            await message.edit(content=self._progress_text(job, finished))
+        except discord.HTTPException:
+            pass
+
+    async def _run(self, job_id, message=None):
+        job = self.jobs[job_id]
+        started = time.perf_counter()
+        try:
+            if job["mode"] == "recreate":
+                await self._recreate(job)
+                job["cursor"] = len(job["members"])
+            else:
+                await self._run_members(job, message)
+            metrics.inc("role_jobs_completed_total", mode=job["mode"])
+            failed = False
+        except Exception:
+            log.exception("ロールジョブ %s が失敗しました。", job_id)
+            metrics.inc("role_jobs_failed_total", mode=job["mode"])
+            failed = True
+        finally:
+            metrics.observe("role_job_seconds", time.perf_counter() - started, mode=job["mode"])
+
+        del self.jobs[job_id]
+        self.store.mark_dirty(job["guild_id"])
+        if failed:
+            if message is not None:
+                try:
+                    await message.edit(content=f"❌ {job['role_name']} のジョブが失敗しました。権限を確認してください。")
+                except discord.HTTPException:
+                    pass
+            return
+        await self._edit_progress(message, job, finished=True)
+
+    async def _run_members(self, job, message):
+        http = self.bot.http
+        semaphore = asyncio.Semaphore(self.concurrency)
+        reason = "Regulus-Bot ロール一括変更"
+
+        async def apply(item):
+            # 一括ジョブは [user_id, role_id, action]、通常のジョブは user_id だけ
+            user_id, role_id, action = item if isinstance(item, list) else (item, job["role_id"], job["action"])
+            request = http.add_role if action == "add" else http.remove_role
+            async with semaphore:
+                try:
+                    await request(job["guild_id"], user_id, role_id, reason=reason)
+                    return True
+                except discord.NotFound:
+                    return True  # 既に退出したメンバー
+                except discord.HTTPException:
+                    return False
+
+        last_progress = 0.0
+        members = job["members"]
+        while job["cursor"] < len(members):
+            chunk = members[job["cursor"]:job["cursor"] + CHUNK_SIZE]
+            results = await asyncio.gather(*(apply(item) for item in chunk))
+            job["failed"] += results.count(False)
+            job["cursor"] += len(chunk)
+            self.store.mark_dirty(job["guild_id"])  # チェックポイント
+            metrics.inc("role_job_members_total", len(chunk), action=job["action"])
+
+            now = time.monotonic()
+            if now - last_progress >= PROGRESS_INTERVAL:
+                last_progress = now
+                await self._edit_progress(message, job)
+
+    async def _recreate(self, job):
+        guild = self.bot.get_guild(job["guild_id"])
+        if guild is None:
+            return
+        old = guild.get_role(job["role_id"])
+        new = guild.get_role(job["new_role_id"]) if job.get("new_role_id") else None
+        if old is None:
+            # 前回の実行で古いロールの削除まで済んでいる
+            if new is not None:
+                self.bot.dispatch("role_replaced", guild, job["role_id"], new)
+            return
+        reason = "Regulus-Bot ロール一括解除（作り直し）"
+        if new is None:
+            new = await guild.create_role(
+                name=old.name,
+                permissions=old.permissions,
+                colour=old.colour,
+                hoist=old.hoist,
+                mentionable=old.mentionable,
+                reason=reason,
+            )
+            # 作ったロールIDをすぐに書き出す（再開時はこのロールを使い、もう1つ作らない）
+            job["new_role_id"] = new.id
+            self.store.mark_dirty(job["guild_id"])
+            await self.store.flush()
+        try:
+            if old.position > 1 and new.position != old.position:
+                try:
+                    await new.edit(position=old.position, reason=reason)
+                except discord.HTTPException:
+                    log.warning("ロール %s の位置を復元できませんでした。", old.name)
+            await asyncio.gather(*(
+                channel.set_permissions(new, overwrite=channel.overwrites[old], reason=reason)
+                for channel in guild.channels if old in channel.overwrites
+            ))
+            await old.delete(reason=reason)
+        except Exception:
+            # 古いロールが残っているので、作りかけのロールは消して元の状態に戻す
+            try:
+                await new.delete(reason="Regulus-Bot ロール作り直しの失敗")
+            except discord.HTTPException:
+                log.warning("作り直し用のロール %s を削除できませんでした。", new.id)
+            job.pop("new_role_id", None)
+            raise
+        self.bot.dispatch("role_replaced", guild, old.id, new)
+
+    # ---------- 再起動後の再開 ----------
+    async def _resume(self):
+        if self._resumed:
+            return
+        self._resumed = True
+        for job_id, job in list(self.jobs.items()):
+            if job_id in self._tasks:
+                continue
+            message = None
+            channel = self.bot.get_channel(job.get("channel_id"))
+            if channel is not None:
+                try:
+                    message = await channel.send(f"🔁 中断していたジョブを再開します。\n{self._progress_text(job)}")
+                except discord.HTTPException:
+                    message = None
+            log.info("ロールジョブ %s を再開します（%s/%s）", job_id, job["cursor"], len(job["members"]))
+            self._start(job_id, message)
+
+    async def flush(self):
+        # 実行中のジョブは止めず、チェックポイントだけ書き出す
+        await self.store.close()
+
+
+def get_role_jobs(bot):
+    manager = getattr(bot, "role_jobs", None)
+    if manager is None:
+        manager = bot.role_jobs = RoleJobManager(bot)
+    return manager
@@ -0,0 +1,76 @@
+import asyncio
+
+import discord
+
+from utils import metrics
+
+# ==============================
+# ロール名 → ロールの解決キャッシュ
+# ==============================
+# (guild_id, ロール名) からロールIDを O(1) で引く。
+# ロールが無い場合の作成は同時に1回だけ行い、並行して来た呼び出しは同じ結果を待つ。
+# ロールの作成・更新・削除イベントでキャッシュを更新する。
+
+
+class RoleResolver:
+    def __init__(self, bot):
+        self._cache = {}  # (guild_id, name) -> role_id
+        self._creating = {}  # (guild_id, name) -> Task
+        bot.add_listener(self.on_guild_role_create)
+        bot.add_listener(self.on_guild_role_update)
+        bot.add_listener(self.on_guild_role_delete)
+
+    async def resolve(self, guild, name, create=True):
+        key = (guild.id, name)
+        role_id = self._cache.get(key)
+        if role_id is not None:
+            role = guild.get_role(role_id)
+            if role is not None and role.name == name:
+                metrics.inc("role_resolver_hits_total")
+                return role
+            del self._cache[key]
+
+        metrics.inc("role_resolver_misses_total")
+        role = discord.utils.get(guild.roles, name=name)
+        if role is not None:
+            self._cache[key] = role.id
+            return role
+        if not create:
+            return None
+
+        task = self._creating.get(key)
+        if task is None:
+            task = self._creating[key] = asyncio.create_task(self._create(guild, name))
+            task.add_done_callback(lambda _: self._creating.pop(key, None))
+        else:
+            metrics.inc("role_resolver_coalesced_total")
+        return await asyncio.shield(task)
+
+    async def _create(self, guild, name):
+        role = await guild.create_role(name=name, reason="Regulus-Bot イベントロール")
+        self._cache[(guild.id, name)] = role.id
+        metrics.inc("role_resolver_created_total")
+        return role
+
+    # ---------- キャッシュの更新 ----------
+    def _forget(self, guild_id, name, role_id):
+        if self._cache.get((guild_id, name)) == role_id:
+            del self._cache[(guild_id, name)]
+
+    async def on_guild_role_create(self, role):
+        self._cache.setdefault((role.guild.id, role.name), role.id)
+
+    async def on_guild_role_update(self, before, after):
+        if before.name != after.name:
+            self._forget(before.guild.id, before.name, before.id)
+            self._cache.setdefault((after.guild.id, after.name), after.id)
+
+    async def on_guild_role_delete(self, role):
+        self._forget(role.guild.id, role.name, role.id)
+
+
+def get_role_resolver(bot):
+    resolver = getattr(bot, "role_resolver", None)
+    if resolver is None:
+        resolver = bot.role_resolver = RoleResolver(bot)
+    return resolver
@@ -0,0 +1,76 @@
+import logging
+
+import discord
+
+from utils import metrics
+from utils.instrument import component_key, track
+
+log = logging.getLogger(__name__)
+
+# ==============================
+# 永続ボタンのルーター
+# ==============================
+# エントリー投稿のボタンは custom_id を "regulus:{イベント}:{guild_id}:{バケット}" に固定し、
+# on_interaction で1か所に集めて各Cogのハンドラへ振り分ける。
+# ビューをメッセージごとに保持しないので、再起動後もチャンネル履歴を取り直さずに
+# 古い投稿のボタンがそのまま動く。
+
+PREFIX = "regulus"
+
+
+def custom_id(event, guild_id, bucket):
+    return f"{PREFIX}:{event}:{guild_id}:{bucket}"
+
+
+def parse_custom_id(value):
+    parts = value.split(":", 3)
+    if len(parts) != 4 or parts[0] != PREFIX or not parts[2].isdigit():
+        return None
+    return parts[1], int(parts[2]), parts[3]
+
+
+def entry_view(event, guild_id, buttons):
+    """buttons: (バケット, ラベル, ButtonStyle) の列。投稿用のビューを返す。"""
+    view = discord.ui.View(timeout=None)
+    for bucket, label, style in buttons:
+        view.add_item(discord.ui.Button(label=label, style=style, custom_id=custom_id(event, guild_id, bucket)))
+    # 押されたときの処理はルーターが行うので、ビュー自体は保持させない
+    view.stop()
+    return view
+
+
+class ComponentRouter:
+    def __init__(self, bot):
+        self._handlers = {}  # イベント名 -> async (interaction, bucket)
+        bot.add_listener(self.on_interaction)
+
+    def register(self, event, handler):
+        self._handlers[event] = handler
+
+    def unregister(self, event):
+        self._handlers.pop(event, None)
+
+    async def on_interaction(self, interaction):
+        if interaction.type is not discord.InteractionType.component:
+            return
+        parsed = parse_custom_id((interaction.data or {}).get("custom_id", ""))
+        if parsed is None:
+            return
+        event, guild_id, bucket = parsed
+        handler = self._handlers.get(event)
+        if handler is None or guild_id != interaction.guild_id:
+            metrics.inc("component_unrouted_total")
+            return
+        metrics.inc("component_routed_total", event=event)
+        try:
+            with track(interaction, component_key(interaction), handler):
+                await handler(interaction, bucket)
+        except Exception:
+            log.exception("ボタン %s の処理中にエラーが発生しました。", interaction.data.get("custom_id"))
+
+
+def get_router(bot):
+    router = getattr(bot, "component_router", None)
+    if router is None:
+        router = bot.component_router = ComponentRouter(bot)
+    return router
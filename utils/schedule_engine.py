@@ -0,0 +1,73 @@
+import heapq
+import itertools
+
+from utils.cron import compile_schedule
+
+# ==============================
+# 次回発火時刻のミニヒープ
+# ==============================
+# スケジュールごとに「次に発火する時刻」を1つだけ持ち、最も早いものから取り出す。
+# 追加・削除・発火はいずれも O(log n)。削除は遅延方式で、古い要素は取り出し時に捨てる。
+
+
+class ScheduleEngine:
+    def __init__(self):
+        self._heap = []
+        self._armed = {}  # key -> (fire_at, seq)
+        self._seq = itertools.count()
+
+    def __len__(self):
+        return len(self._armed)
+
+    def __contains__(self, key):
+        return key in self._armed
+
+    def add(self, key, fire_at):
+        # 既に登録済みのキーは上書き（再アーム）
+        seq = next(self._seq)
+        self._armed[key] = (fire_at, seq)
+        heapq.heappush(self._heap, (fire_at, seq, key))
+        self._compact()
+
+    def remove(self, key):
+        return self._armed.pop(key, None) is not None
+
+    def fire_time(self, key):
+        armed = self._armed.get(key)
+        return None if armed is None else armed[0]
+
+    def _is_live(self, item):
+        fire_at, seq, key = item
+        return self._armed.get(key) == (fire_at, seq)
+
+    def _compact(self):
+        # 無効要素がヒープの大半を占めたら作り直す
+        if len(self._heap) > 64 and len(self._heap) > 2 * len(self._armed):
+            self._heap = [item for item in self._heap if self._is_live(item)]
+            heapq.heapify(self._heap)
+
+    def peek(self):
+        while self._heap and not self._is_live(self._heap[0]):
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now):
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            item = heapq.heappop(self._heap)
+            if self._is_live(item):
+                fire_at, _, key = item
+                del self._armed[key]
+                due.append((key, fire_at))
+        return due
+
+
+# ==============================
+# スケジュール定義 → 次回発火時刻
+# ==============================
+def next_fire(schedule, after, default_tz=None):
+    """after（UNIXタイムスタンプ）より後の最初の発火時刻を返す。計算できない定義は None。"""
+    compiled = compile_schedule(schedule, default_tz)
+    if compiled is None:
+        return None
+    return compiled.next_after(after, schedule.last_post or schedule.created)
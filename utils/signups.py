@@ -0,0 +1,71 @@
+from array import array
+
+# ==============================
+# サインアップ索引（重複なし・O(1) 移動）
+# ==============================
+# メンバーID → 所属バケットの対応と、バケットごとのID配列（array('Q')）を持つ。
+# - 同じメンバーの重複登録はしない（別のボタンを押したら移動になる）
+# - 所属の確認・移動・削除は O(1)（削除は末尾要素との入れ替え）
+# - バケットごとの人数は len() で O(1)
+# ID → 所属は dict[int, int] で持つ。値は「バケット番号 * SLOT_BASE + 配列内の位置」。
+# 省メモリ化ではない: 押し直しが3割程度なら、押された順に append するだけのリストより dict の分だけ大きい
+# （benchmarks/signup_memory.py）。押し直しの多い募集で件数が増え続けないことと、所属の確認が速いことが目的。
+
+SLOT_BASE = 1 << 28
+
+
+class SignupIndex:
+    def __init__(self, labels):
+        self.labels = tuple(labels)
+        self._numbers = {label: i for i, label in enumerate(self.labels)}
+        self._buckets = [array("Q") for _ in self.labels]
+        self._slots = {}  # member_id -> bucket * SLOT_BASE + position
+
+    def __len__(self):
+        return len(self._slots)
+
+    def __contains__(self, member_id):
+        return member_id in self._slots
+
+    def bucket_of(self, member_id):
+        slot = self._slots.get(member_id)
+        return None if slot is None else self.labels[slot // SLOT_BASE]
+
+    def count(self, label):
+        return len(self._buckets[self._numbers[label]])
+
+    def members(self, label):
+        return self._buckets[self._numbers[label]]
+
+    # ---------- 更新 ----------
+    def add(self, member_id, label):
+        """登録（または移動）して、以前のバケット名を返す。"""
+        number = self._numbers[label]
+        slot = self._slots.get(member_id)
+        if slot is not None:
+            if slot // SLOT_BASE == number:
+                return label
+            self._detach(member_id, slot)
+            previous = self.labels[slot // SLOT_BASE]
+        else:
+            previous = None
+        bucket = self._buckets[number]
+        self._slots[member_id] = number * SLOT_BASE + len(bucket)
+        bucket.append(member_id)
+        return previous
+
+    def remove(self, member_id):
+        slot = self._slots.get(member_id)
+        if slot is None:
+            return False
+        self._detach(member_id, slot)
+        del self._slots[member_id]
+        return True
+
+    def _detach(self, member_id, slot):
+        number, position = divmod(slot, SLOT_BASE)
+        bucket = self._buckets[number]
+        last = bucket.pop()
+        if last != member_id:
+            bucket[position] = last
+            self._slots[last] = slot
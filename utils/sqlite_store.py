@@ -0,0 +1,382 @@
+import asyncio
+import json
+import os
+import pathlib
+import sqlite3
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.models import ENTRY_TYPES, GuildEventConfig, Schedule
+
+# ==============================
+# SQLite バックエンド（WALモード）
+# ==============================
+# ギルド設定・エントリー・チーム・スケジュールを個別テーブルに持ち、
+# 変更は1行単位のUPSERTで書き込む。ファイル全体の書き直しは発生しない。
+# クラスターでは複数プロセスが同じファイルを開くので、トランザクションは BEGIN IMMEDIATE で
+# 先に書き込みロックを取る（取れなければ busy_timeout まで待つ）。
+# 書き込みはDBファイルごとの専用スレッド（書き込み用の接続）で順番に行い、呼び出し側は await する。
+# ロック待ちで止まるのはそのスレッドだけで、イベントループ（インタラクションの3秒の期限）は止めない。
+# 読み取りはイベントループ上の共有接続で行う（WALなので書き込み中でも待たされない）。
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS guild_config (
+    kind TEXT NOT NULL,
+    guild_id INTEGER NOT NULL,
+    entry_channel INTEGER,
+    admin_channel INTEGER,
+    common_role INTEGER,
+    extra TEXT NOT NULL DEFAULT '{}',
+    PRIMARY KEY (kind, guild_id)
+);
+CREATE TABLE IF NOT EXISTS entries (
+    kind TEXT NOT NULL,
+    guild_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    name TEXT,
+    level INTEGER,
+    points INTEGER,
+    activity TEXT,
+    PRIMARY KEY (kind, guild_id, user_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS entries_by_points ON entries (kind, guild_id, points DESC);
+CREATE TABLE IF NOT EXISTS teams (
+    kind TEXT NOT NULL,
+    guild_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    role_id INTEGER,
+    PRIMARY KEY (kind, guild_id, name)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS schedules (
+    guild_id INTEGER NOT NULL,
+    schedule_id TEXT NOT NULL,
+    channel_id INTEGER NOT NULL,
+    message TEXT NOT NULL,
+    created INTEGER,
+    last_post INTEGER,
+    spec TEXT NOT NULL DEFAULT '{}',
+    PRIMARY KEY (guild_id, schedule_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS guild_settings (
+    guild_id INTEGER PRIMARY KEY,
+    timezone TEXT
+);
+"""
+
+CONFIG_COLUMNS = ("entry_channel", "admin_channel", "common_role")
+ENTRY_FIELDS = {
+    "rs": ("name", "level", "points"),
+    "ws": ("name", "activity"),
+}
+SCHEDULE_COLUMNS = ("channel_id", "message", "created", "last_post")
+
+BUSY_TIMEOUT_MS = 5000
+
+_connections = {}
+_writers = {}
+
+
+def _open(path, check_same_thread=True):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(path, isolation_level=None, check_same_thread=check_same_thread)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    return conn
+
+
+def connect(path):
+    # 同じDBファイルを使うCog同士で接続を共有する
+    conn = _connections.get(path)
+    if conn is not None:
+        return conn
+    conn = _open(path, check_same_thread=False)
+    conn.executescript(SCHEMA)
+    _connections[path] = conn
+    return conn
+
+
+class _Writer:
+    """DBファイルごとの書き込み用スレッドと接続。書き込みは投入された順に1つずつ実行される。"""
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = None  # 書き込み用スレッドの中で開く
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-writer")
+
+    def _call(self, func, args):
+        if self.conn is None:
+            self.conn = _open(self.path)
+        return func(self.conn, *args)
+
+    async def run(self, func, *args):
+        """func(書き込み用の接続, *args) をスレッドで実行して結果を返す。"""
+        return await asyncio.get_running_loop().run_in_executor(self.executor, self._call, func, args)
+
+
+def writer(path):
+    w = _writers.get(path)
+    if w is None:
+        w = _writers[path] = _Writer(path)
+    return w
+
+
+class SQLiteEventStore:
+    def __init__(self, path, kind):
+        self.path = path
+        self.conn = connect(path)
+        self.writer = writer(path)
+        self.kind = kind
+        self.fields = ENTRY_FIELDS[kind]
+        self.entry_type = ENTRY_TYPES[kind]
+
+    # ---------- ギルド設定 ----------
+    def get_guild(self, guild_id):
+        return self._read_guild(self.conn, guild_id)
+
+    def _read_guild(self, conn, guild_id):
+        row = conn.execute(
+            "SELECT entry_channel, admin_channel, common_role, extra FROM guild_config WHERE kind = ? AND guild_id = ?",
+            (self.kind, int(guild_id)),
+        ).fetchone()
+        if row is None:
+            return None
+        config = json.loads(row["extra"])
+        config.update({c: row[c] for c in CONFIG_COLUMNS})
+        return GuildEventConfig.from_dict(config)
+
+    def _write_guild(self, conn, guild_id, config):
+        extra = {k: v for k, v in config.to_dict().items() if k not in CONFIG_COLUMNS}
+        conn.execute(
+            "INSERT INTO guild_config (kind, guild_id, entry_channel, admin_channel, common_role, extra) "
+            "VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (kind, guild_id) DO UPDATE SET entry_channel = excluded.entry_channel, "
+            "admin_channel = excluded.admin_channel, common_role = excluded.common_role, extra = excluded.extra",
+            (self.kind, int(guild_id), *(getattr(config, c) for c in CONFIG_COLUMNS),
+             json.dumps(extra, ensure_ascii=False)),
+        )
+
+    async def reset_guild(self, guild_id, config):
+        await self.writer.run(self._reset_guild, guild_id, config)
+
+    def _reset_guild(self, conn, guild_id, config):
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            self._write_guild(conn, guild_id, config)
+            conn.execute("DELETE FROM entries WHERE kind = ? AND guild_id = ?", (self.kind, int(guild_id)))
+            conn.execute("DELETE FROM teams WHERE kind = ? AND guild_id = ?", (self.kind, int(guild_id)))
+
+    async def update_guild(self, guild_id, **fields):
+        await self.writer.run(self._update_guild, guild_id, fields)
+
+    def _update_guild(self, conn, guild_id, fields):
+        # 読み取りと書き込みを同じトランザクションで行う（他のワーカーの変更を上書きしない）
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            config = self._read_guild(conn, guild_id) or GuildEventConfig()
+            config.update(**fields)
+            self._write_guild(conn, guild_id, config)
+
+    # ---------- エントリー ----------
+    def _entry(self, row):
+        return self.entry_type.from_dict({f: row[f] for f in self.fields})
+
+    def get_entry(self, guild_id, user_id):
+        row = self.conn.execute(
+            f"SELECT {', '.join(self.fields)} FROM entries WHERE kind = ? AND guild_id = ? AND user_id = ?",
+            (self.kind, int(guild_id), int(user_id)),
+        ).fetchone()
+        return None if row is None else self._entry(row)
+
+    async def put_entry(self, guild_id, user_id, entry):
+        await self.writer.run(self._put_entry, guild_id, user_id, entry)
+
+    def _put_entry(self, conn, guild_id, user_id, entry):
+        columns = ", ".join(self.fields)
+        updates = ", ".join(f"{f} = excluded.{f}" for f in self.fields)
+        conn.execute(
+            f"INSERT INTO entries (kind, guild_id, user_id, {columns}) VALUES (?, ?, ?{', ?' * len(self.fields)}) "
+            f"ON CONFLICT (kind, guild_id, user_id) DO UPDATE SET {updates}",
+            (self.kind, int(guild_id), int(user_id), *(getattr(entry, f) for f in self.fields)),
+        )
+
+    def entries(self, guild_id):
+        rows = self.conn.execute(
+            f"SELECT user_id, {', '.join(self.fields)} FROM entries WHERE kind = ? AND guild_id = ?",
+            (self.kind, int(guild_id)),
+        )
+        return {row["user_id"]: self._entry(row) for row in rows}
+
+    def export_entries(self, guild_id, ranked=False):
+        """(user_id, entry) のイテレータ。回す側のスレッドで読み取り専用の接続を開いて読む。
+
+        共有の接続はイベントループ側のトランザクションと混ざるので使わない（WALなのでコミット済みの状態が読める）。
+        """
+        query = (
+            f"SELECT user_id, {', '.join(self.fields)} FROM entries WHERE kind = ? AND guild_id = ?"
+            + (" ORDER BY points DESC" if ranked else "")
+        )
+        uri = pathlib.Path(self.path).resolve().as_uri() + "?mode=ro"
+
+        def rows():
+            conn = sqlite3.connect(uri, uri=True)
+            conn.row_factory = sqlite3.Row
+            try:
+                for row in conn.execute(query, (self.kind, int(guild_id))):
+                    yield row["user_id"], self._entry(row)
+            finally:
+                conn.close()
+
+        return rows()
+
+    # ---------- チーム ----------
+    def teams(self, guild_id):
+        rows = self.conn.execute(
+            "SELECT name, role_id FROM teams WHERE kind = ? AND guild_id = ?",
+            (self.kind, int(guild_id)),
+        )
+        return {row["name"]: row["role_id"] for row in rows}
+
+    async def put_team(self, guild_id, name, role_id):
+        await self.writer.run(self._put_team, guild_id, name, role_id)
+
+    def _put_team(self, conn, guild_id, name, role_id):
+        conn.execute(
+            "INSERT INTO teams (kind, guild_id, name, role_id) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (kind, guild_id, name) DO UPDATE SET role_id = excluded.role_id",
+            (self.kind, int(guild_id), name, role_id),
+        )
+
+    async def close(self):
+        pass
+
+
+class SQLiteScheduleStore:
+    def __init__(self, path):
+        self.conn = connect(path)
+        self.writer = writer(path)
+
+    def _schedule(self, row):
+        schedule = json.loads(row["spec"])
+        schedule.update({c: row[c] for c in SCHEDULE_COLUMNS if row[c] is not None})
+        return Schedule.from_dict(schedule)
+
+    def all(self):
+        schedules = {}
+        for row in self.conn.execute("SELECT * FROM schedules"):
+            schedules.setdefault(row["guild_id"], {})[row["schedule_id"]] = self._schedule(row)
+        return schedules
+
+    def for_guild(self, guild_id):
+        rows = self.conn.execute("SELECT * FROM schedules WHERE guild_id = ?", (int(guild_id),))
+        return {row["schedule_id"]: self._schedule(row) for row in rows}
+
+    def next_id(self, guild_id):
+        row = self.conn.execute(
+            "SELECT COALESCE(MAX(CAST(schedule_id AS INTEGER)), 0) FROM schedules WHERE guild_id = ?",
+            (int(guild_id),),
+        ).fetchone()
+        return str(row[0] + 1)
+
+    async def put(self, guild_id, schedule_id, schedule):
+        await self.writer.run(self._put, guild_id, schedule_id, schedule)
+
+    def _put(self, conn, guild_id, schedule_id, schedule):
+        spec = {k: v for k, v in schedule.to_dict().items() if k not in SCHEDULE_COLUMNS}
+        conn.execute(
+            "INSERT OR REPLACE INTO schedules (guild_id, schedule_id, channel_id, message, created, last_post, spec) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (int(guild_id), str(schedule_id), *(getattr(schedule, c) for c in SCHEDULE_COLUMNS),
+             json.dumps(spec, ensure_ascii=False)),
+        )
+
+    async def delete(self, guild_id, schedule_id):
+        return await self.writer.run(self._delete, guild_id, schedule_id)
+
+    @staticmethod
+    def _delete(conn, guild_id, schedule_id):
+        cur = conn.execute(
+            "DELETE FROM schedules WHERE guild_id = ? AND schedule_id = ?",
+            (int(guild_id), str(schedule_id)),
+        )
+        return cur.rowcount > 0
+
+    async def touch_many(self, items):
+        await self.writer.run(self._touch_many, items)
+
+    @staticmethod
+    def _touch_many(conn, items):
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                "UPDATE schedules SET last_post = ? WHERE guild_id = ? AND schedule_id = ?",
+                [(last_post, int(guild_id), str(schedule_id)) for guild_id, schedule_id, last_post in items],
+            )
+
+    # ---------- ギルドのタイムゾーン ----------
+    def timezones(self):
+        rows = self.conn.execute("SELECT guild_id, timezone FROM guild_settings WHERE timezone IS NOT NULL")
+        return {row["guild_id"]: row["timezone"] for row in rows}
+
+    async def set_timezone(self, guild_id, timezone):
+        await self.writer.run(self._set_timezone, guild_id, timezone)
+
+    @staticmethod
+    def _set_timezone(conn, guild_id, timezone):
+        conn.execute(
+            "INSERT INTO guild_settings (guild_id, timezone) VALUES (?, ?) "
+            "ON CONFLICT (guild_id) DO UPDATE SET timezone = excluded.timezone",
+            (int(guild_id), timezone),
+        )
+
+    async def close(self):
+        pass
+
+
+# ==============================
+# JSON → SQLite 一括インポート
+# ==============================
+def import_json(db_path, rs_path="data/rs_data.json", ws_path="data/ws_data.json",
+                schedule_path="data/schedules.json"):
+    conn = connect(db_path)
+    counts = {"guilds": 0, "entries": 0, "teams": 0, "schedules": 0}
+
+    def load(path):
+        if not os.path.exists(path):
+            return {}
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        for kind, path, teams_key in (("rs", rs_path, "team_roles"), ("ws", ws_path, "teams")):
+            store = SQLiteEventStore(db_path, kind)
+            for guild_id, record in load(path).items():
+                config = {k: v for k, v in record.items() if k not in ("entries", teams_key)}
+                store._write_guild(conn, guild_id, GuildEventConfig.from_dict(config))
+                counts["guilds"] += 1
+                for user_id, entry in record.get("entries", {}).items():
+                    store._put_entry(conn, guild_id, user_id, store.entry_type.from_dict(entry))
+                    counts["entries"] += 1
+                for name, role_id in record.get(teams_key, {}).items():
+                    store._put_team(conn, guild_id, name, role_id if isinstance(role_id, int) else None)
+                    counts["teams"] += 1
+
+        schedules = SQLiteScheduleStore(db_path)
+        for guild_id, items in load(schedule_path).items():
+            for schedule_id, schedule in items.items():
+                schedules._put(conn, guild_id, schedule_id, Schedule.from_dict(schedule))
+                counts["schedules"] += 1
+        for guild_id, settings in load(os.path.splitext(schedule_path)[0] + "_settings.json").items():
+            if settings.get("timezone"):
+                schedules._set_timezone(conn, guild_id, settings["timezone"])
+    return counts
+
+
+if __name__ == "__main__":
+    # 使用例: python -m utils.sqlite_store data/regulus.db
+    target = sys.argv[1] if len(sys.argv) > 1 else "data/regulus.db"
+    print(f"✅ Imported into {target}: {import_json(target)}")
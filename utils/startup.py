@@ -0,0 +1,136 @@
+import asyncio
+import contextlib
+import hashlib
+import importlib
+import inspect
+import json
+import time
+
+from discord.ext import commands
+
+from utils.store import _atomic_write
+
+# ==============================
+# 起動処理（Cogの読み込みとコマンド同期）
+# ==============================
+# - 読み込むCogは EXTENSIONS に明示し、読み込み前に Cog名・コマンド名の重複を検出する
+# - 互いに依存しないCogは並列で読み込む
+# - コマンドツリーのハッシュを保存しておき、変わったときだけ同期する
+#   （同期APIはレート制限が厳しいので、再接続のたびに呼ばない）
+# - DEV_GUILD_ID を指定すると、そのギルドにだけ同期する（すぐ反映される）
+
+EXTENSIONS = (
+    "cogs.bot_stats",
+    "cogs.event_admin",
+    "cogs.role_utils",
+    "cogs.rs_event",
+    "cogs.rs_module",
+    "cogs.scheduler",
+    "cogs.ws_event",
+    "cogs.ws_module",
+)
+SYNC_STATE_FILE = "data/command_tree.json"
+
+
+class StartupError(RuntimeError):
+    pass
+
+
+class PhaseTimer:
+    def __init__(self):
+        self.started = self.last = time.perf_counter()
+        self.phases = {}  # フェーズ名 -> 秒
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        yield
+        self.last = time.perf_counter()
+        self.phases[name] = self.last - start
+        print(f"⏱️ {name}: {self.phases[name]:.2f}s")
+
+    def mark(self, name):
+        """前のフェーズの終わりからの時間を name として1回だけ記録する。"""
+        if name in self.phases:
+            return
+        self.last, elapsed = time.perf_counter(), time.perf_counter() - self.last
+        self.phases[name] = elapsed
+        print(f"⏱️ {name}: {elapsed:.2f}s (total {self.last - self.started:.2f}s)")
+
+
+# ---------- 重複チェック ----------
+def _cog_classes(module):
+    return [
+        obj for obj in vars(module).values()
+        if inspect.isclass(obj) and issubclass(obj, commands.Cog) and obj.__module__ == module.__name__
+    ]
+
+
+def _command_names(cog_cls):
+    names = [cmd.name for cmd in cog_cls.__cog_app_commands__]
+    names += [cmd.name for cmd in cog_cls.__cog_commands__ if getattr(cmd, "app_command", None)]
+    return names
+
+
+def check_manifest(extensions=EXTENSIONS):
+    """Cog名・コマンド名の重複があれば、どのファイル同士かを示して StartupError を出す。"""
+    owners = {}
+    conflicts = []
+    for extension in extensions:
+        module = importlib.import_module(extension)
+        for cog_cls in _cog_classes(module):
+            keys = [("Cog", cog_cls.__cog_name__)] + [("/コマンド", n) for n in _command_names(cog_cls)]
+            for key in keys:
+                owner = owners.setdefault(key, extension)
+                if owner != extension:
+                    conflicts.append(f"{key[0]} {key[1]}: {owner} と {extension}")
+    if conflicts:
+        raise StartupError("名前が重複しています:\n" + "\n".join(conflicts))
+
+
+# ---------- 読み込み ----------
+async def load_extensions(bot, extensions=EXTENSIONS):
+    async def load(extension):
+        await bot.load_extension(extension)
+        print(f"✅ Loaded cog: {extension}")
+
+    await asyncio.gather(*(load(e) for e in extensions))
+
+
+# ---------- コマンド同期 ----------
+def tree_hash(bot, guild=None):
+    payload = sorted(
+        (cmd.to_dict() for cmd in bot.tree.get_commands(guild=guild)),
+        key=lambda c: (c.get("type", 1), c["name"])
+    )
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode()).hexdigest()
+
+
+def _load_state(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+async def sync_commands(bot, dev_guild=None, path=SYNC_STATE_FILE):
+    """コマンドツリーが前回の同期から変わっていれば同期する。同期したら True。"""
+    if dev_guild is not None:
+        bot.tree.copy_global_to(guild=dev_guild)
+        scope = f"guild:{dev_guild.id}"
+    else:
+        scope = "global"
+
+    digest = tree_hash(bot, dev_guild)
+    state = _load_state(path)
+    key = f"{bot.application_id}:{scope}"
+    if state.get(key) == digest:
+        print(f"🌐 Slash commands unchanged ({scope}), skip sync.")
+        return False
+
+    synced = await bot.tree.sync(guild=dev_guild)
+    print(f"🌐 Synced {len(synced)} slash command(s) ({scope}).")
+    state[key] = digest
+    _atomic_write(path, json.dumps(state, indent=2).encode("utf-8"))
+    return True
@@ -0,0 +1,276 @@
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import time
+
+from utils import metrics
+from utils.models import ENTRY_TYPES, GuildEventConfig, GuildEventState, Schedule
+
+log = logging.getLogger(__name__)
+
+# ==============================
+# 書き込み遅延型 JSON ストア
+# ==============================
+# 変更のたびにファイル全体を書き直す代わりに、ギルド単位で「汚れ」を記録し、
+# flush_interval ごとに1回だけまとめて書き出す。
+# 書き込みは一時ファイル＋rename で原子的に行い、ファイルI/O はexecutorで実行する。
+# decode / encode を渡すと、読み込んだJSONをレコード（utils/models.py）に変換して持ち、
+# 書き出し時に encode で dict に戻す（json.dumps の default として使う）。
+
+
+def _atomic_write(path, payload):
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".json")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class JsonStore:
+    def __init__(self, path, flush_interval=2.0, decode=None, encode=None):
+        self.path = path
+        self.name = os.path.splitext(os.path.basename(path))[0]
+        self.flush_interval = flush_interval
+        self.encode = encode
+        self.data = self.load()
+        if decode is not None:
+            self.data = decode(self.data)
+        self._dirty = set()
+        self._pending = 0
+        self._timer = None
+        self._lock = asyncio.Lock()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def dumps(self):
+        return json.dumps(self.data, ensure_ascii=False, default=self.encode).encode("utf-8")
+
+    # ---------- 変更通知 ----------
+    def mark_dirty(self, guild_id=None):
+        self._dirty.add(str(guild_id))
+        self._pending += 1
+        if self._timer is None or self._timer.done():
+            self._timer = asyncio.get_running_loop().create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.flush_interval)
+        try:
+            await self.flush()
+        except Exception:
+            log.exception("%s の書き込みに失敗しました。次回のflushで再試行します。", self.path)
+
+    # ---------- 書き出し ----------
+    async def flush(self):
+        async with self._lock:
+            if not self._dirty:
+                return
+            dirty, pending = self._dirty, self._pending
+            self._dirty, self._pending = set(), 0
+
+            # スナップショットはイベントループ上で取る（書き込み中の変更と競合させない）
+            payload = self.dumps()
+            start = time.perf_counter()
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, _atomic_write, self.path, payload)
+            except BaseException:
+                self._dirty |= dirty
+                self._pending += pending
+                raise
+
+            metrics.observe("store_flush_seconds", time.perf_counter() - start, store=self.name)
+            metrics.inc("store_flushes_total", store=self.name)
+            metrics.inc("store_writes_coalesced_total", pending - 1, store=self.name)
+            metrics.inc("store_bytes_written_total", len(payload), store=self.name)
+
+    async def close(self):
+        if self._timer is not None and not self._timer.done():
+            self._timer.cancel()
+        self._timer = None
+        await self.flush()
+
+
+# ==============================
+# イベント／スケジュール用ストア（JSONバックエンド）
+# ==============================
+# Cogはこのインターフェース越しにデータへアクセスする。
+# SQLite版（utils/sqlite_store.py）も同じメソッドを持つので、
+# STORAGE_BACKEND 環境変数だけで切り替えられる。
+# 設定・エントリー・スケジュールは utils/models.py のレコードで受け渡しし、ギルドID・ユーザーIDは int で扱う。
+# 書き込み系のメソッドは async（SQLite版はスレッドで書き込むため）。JSON版はメモリを更新して汚れを記録するだけ。
+
+class JsonEventStore:
+    def __init__(self, path, kind, teams_key="teams", flush_interval=2.0):
+        self.entry_type = ENTRY_TYPES[kind]
+        self.teams_key = teams_key
+        self.file = JsonStore(path, flush_interval, decode=self._decode, encode=self._encode)
+        self.data = self.file.data  # guild_id(int) -> GuildEventState
+
+    # ---------- JSON との変換 ----------
+    def _decode(self, raw):
+        data = {}
+        for gid, record in raw.items():
+            record = dict(record)
+            entries = record.pop("entries", {})
+            teams = record.pop(self.teams_key, {})
+            data[int(gid)] = GuildEventState(
+                GuildEventConfig.from_dict(record),
+                {int(uid): self.entry_type.from_dict(e) for uid, e in entries.items()},
+                teams,
+            )
+        return data
+
+    def _encode(self, obj):
+        if isinstance(obj, GuildEventState):
+            return {**obj.config.to_dict(), "entries": obj.entries, self.teams_key: obj.teams}
+        return obj.to_dict()
+
+    def _record(self, guild_id, create=False):
+        gid = int(guild_id)
+        record = self.data.get(gid)
+        if record is None and create:
+            record = self.data[gid] = GuildEventState(GuildEventConfig())
+        return record
+
+    # ---------- ギルド設定 ----------
+    def get_guild(self, guild_id):
+        record = self._record(guild_id)
+        return None if record is None else record.config
+
+    async def reset_guild(self, guild_id, config):
+        self.data[int(guild_id)] = GuildEventState(config)
+        self.file.mark_dirty(guild_id)
+
+    async def update_guild(self, guild_id, **fields):
+        self._record(guild_id, create=True).config.update(**fields)
+        self.file.mark_dirty(guild_id)
+
+    # ---------- エントリー ----------
+    def get_entry(self, guild_id, user_id):
+        record = self._record(guild_id)
+        if record is None:
+            return None
+        return record.entries.get(int(user_id))
+
+    async def put_entry(self, guild_id, user_id, entry):
+        self._record(guild_id, create=True).entries[int(user_id)] = entry
+        self.file.mark_dirty(guild_id)
+
+    def entries(self, guild_id):
+        record = self._record(guild_id)
+        if record is None:
+            return {}
+        return record.entries
+
+    def export_entries(self, guild_id, ranked=False):
+        """(user_id, entry) のイテレータ。一覧はここ（イベントループ上）で写し取り、並べ替えは回す側のスレッドで行う。"""
+        items = list(self.entries(guild_id).items())
+
+        def rows():
+            if ranked:
+                items.sort(key=lambda x: x[1].points, reverse=True)
+            yield from items
+
+        return rows()
+
+    # ---------- チーム ----------
+    def teams(self, guild_id):
+        record = self._record(guild_id)
+        if record is None:
+            return {}
+        return record.teams
+
+    async def put_team(self, guild_id, name, role_id):
+        self._record(guild_id, create=True).teams[name] = role_id
+        self.file.mark_dirty(guild_id)
+
+    async def close(self):
+        await self.file.close()
+
+
+class JsonScheduleStore:
+    def __init__(self, path, flush_interval=2.0):
+        self.file = JsonStore(path, flush_interval, decode=self._decode, encode=Schedule.to_dict)
+        self.data = self.file.data  # guild_id(int) -> {schedule_id: Schedule}
+        self.settings = JsonStore(os.path.splitext(path)[0] + "_settings.json", flush_interval)
+
+    @staticmethod
+    def _decode(raw):
+        return {
+            int(gid): {sid: Schedule.from_dict(s) for sid, s in schedules.items()}
+            for gid, schedules in raw.items()
+        }
+
+    def all(self):
+        return self.data
+
+    def for_guild(self, guild_id):
+        return self.data.get(int(guild_id), {})
+
+    def next_id(self, guild_id):
+        ids = [int(sid) for sid in self.for_guild(guild_id) if sid.isdigit()]
+        return str(max(ids, default=0) + 1)
+
+    async def put(self, guild_id, schedule_id, schedule):
+        self.data.setdefault(int(guild_id), {})[str(schedule_id)] = schedule
+        self.file.mark_dirty(guild_id)
+
+    async def delete(self, guild_id, schedule_id):
+        schedules = self.data.get(int(guild_id), {})
+        if schedules.pop(str(schedule_id), None) is None:
+            return False
+        self.file.mark_dirty(guild_id)
+        return True
+
+    async def touch_many(self, items):
+        for guild_id, schedule_id, last_post in items:
+            self.data[int(guild_id)][str(schedule_id)].last_post = last_post
+            self.file.mark_dirty(guild_id)
+
+    # ---------- ギルドのタイムゾーン ----------
+    def timezones(self):
+        return {int(gid): s["timezone"] for gid, s in self.settings.data.items() if s.get("timezone")}
+
+    async def set_timezone(self, guild_id, timezone):
+        self.settings.data.setdefault(str(guild_id), {})["timezone"] = timezone
+        self.settings.mark_dirty(guild_id)
+
+    async def close(self):
+        await self.file.close()
+        await self.settings.close()
+
+
+# ==============================
+# バックエンド選択
+# ==============================
+BACKEND = os.getenv("STORAGE_BACKEND", "json")
+DATABASE_PATH = os.getenv("DATABASE_PATH", "data/regulus.db")
+
+
+def open_event_store(kind, path, teams_key="teams"):
+    if BACKEND == "sqlite":
+        from utils.sqlite_store import SQLiteEventStore
+        return SQLiteEventStore(DATABASE_PATH, kind)
+    return JsonEventStore(path, kind, teams_key=teams_key)
+
+
+def open_schedule_store(path):
+    if BACKEND == "sqlite":
+        from utils.sqlite_store import SQLiteScheduleStore
+        return SQLiteScheduleStore(DATABASE_PATH)
+    return JsonScheduleStore(path)
@@ -0,0 +1,82 @@
+from collections import Counter
+
+from utils.models import Activity
+
+# ==============================
+# WSチーム自動編成
+# ==============================
+# エントリーをチームに振り分ける。
+# 1. 貪欲法: アクティビティごとに、その区分の人数が最も少ない（同数なら総人数が少ない）チームへ順に入れる
+#    → キャプテンから配るので、キャプテンがチーム数以上いれば全チームに1人以上入る
+# 2. 局所探索: 総人数の差が2以上ある間、最大チームから最小チームへ1人移す
+#    （両チームで人数差が最も大きい区分から選び、最後のキャプテンは動かさない）
+# どちらも O(n × チーム数) で、数千人でも数ミリ秒で終わる。
+
+CAPTAIN = Activity.CAPTAIN
+ACTIVITY_LEVELS = tuple(Activity)
+ACTIVITY_ICONS = dict(zip(ACTIVITY_LEVELS, ("⭐️", "1️⃣", "2️⃣", "3️⃣", "4️⃣")))
+
+
+class TeamPlan:
+    __slots__ = ("teams", "levels")
+
+    def __init__(self, names):
+        self.teams = {name: [] for name in names}  # チーム名 -> [(user_id, activity)]
+        self.levels = {name: Counter() for name in names}
+
+    def add(self, team, user_id, activity):
+        self.teams[team].append((user_id, activity))
+        self.levels[team][activity] += 1
+
+    def assignment(self):
+        """user_id -> チーム名"""
+        return {uid: team for team, members in self.teams.items() for uid, _ in members}
+
+    def sizes(self):
+        return {team: len(members) for team, members in self.teams.items()}
+
+    def missing_captains(self):
+        return [team for team, levels in self.levels.items() if not levels[CAPTAIN]]
+
+
+def _level_order(activity):
+    try:
+        return ACTIVITY_LEVELS.index(activity)
+    except ValueError:
+        return len(ACTIVITY_LEVELS)
+
+
+def balance_teams(entries, team_names):
+    """entries: (user_id, activity) の列（登録順）。TeamPlan を返す。"""
+    if not team_names:
+        raise ValueError("チームがありません。")
+    plan = TeamPlan(team_names)
+    size = dict.fromkeys(team_names, 0)
+
+    # ---------- 貪欲法 ----------
+    for user_id, activity in sorted(entries, key=lambda e: _level_order(e[1])):
+        team = min(team_names, key=lambda t: (plan.levels[t][activity], size[t]))
+        plan.add(team, user_id, activity)
+        size[team] += 1
+
+    # ---------- 局所探索 ----------
+    while True:
+        big = max(team_names, key=size.__getitem__)
+        small = min(team_names, key=size.__getitem__)
+        if size[big] - size[small] <= 1:
+            break
+        levels_big, levels_small = plan.levels[big], plan.levels[small]
+        candidates = [
+            level for level in levels_big
+            if levels_big[level] and not (level == CAPTAIN and levels_big[level] == 1)
+        ]
+        level = max(candidates, key=lambda lv: levels_big[lv] - levels_small[lv])
+        members = plan.teams[big]
+        index = max(i for i, (_, activity) in enumerate(members) if activity == level)
+        user_id, _ = members.pop(index)
+        levels_big[level] -= 1
+        size[big] -= 1
+        plan.add(small, user_id, level)
+        size[small] += 1
+
+    return plan
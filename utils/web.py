@@ -0,0 +1,107 @@
+import math
+import os
+import time
+
+from aiohttp import web
+from discord.ext import commands
+
+from utils import cluster, instrument, metrics
+
+# ==============================
+# ヘルスチェック・メトリクス用HTTPサーバー（Koyeb/Render対策）
+# ==============================
+# Botと同じイベントループ上で aiohttp を動かす（別スレッドのWebサーバーは使わない）。
+#   /         稼働確認用の文字列
+#   /healthz  ゲートウェイの接続状態とレイテンシ（切断中は503）
+#   /readyz   Cogの読み込みとコマンド同期が終わっていれば200
+#   /metrics  utils.metrics の集計を Prometheus 形式で返す
+#   /stats    コマンド・ボタンごとの応答時間などを JSON で返す（/bot-stats と同じ内容）
+#             クラスターではワーカーごとのポートで、そのワーカーの分だけを返す（scope に明記）
+# Cogとして追加し、Botの終了時（cog_unload）にサーバーも止める。
+
+DEFAULT_PORT = 8080
+
+
+class HealthServer(commands.Cog):
+    def __init__(self, bot, host="0.0.0.0", port=None):
+        self.bot = bot
+        self.host = host
+        self.port = int(port or os.environ.get("PORT", DEFAULT_PORT))
+        self.ready = False
+        self.started = time.monotonic()
+        self._runner = None
+
+    async def cog_load(self):
+        app = web.Application()
+        app.router.add_get("/", self.home)
+        app.router.add_get("/healthz", self.healthz)
+        app.router.add_get("/readyz", self.readyz)
+        app.router.add_get("/metrics", self.metrics)
+        app.router.add_get("/stats", self.stats)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        print(f"🌐 HTTP server listening on {self.host}:{self.port}")
+
+    async def cog_unload(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def set_ready(self):
+        self.ready = True
+
+    # ---------- 状態 ----------
+    def gateway_state(self):
+        if self.bot.is_closed():
+            return "closed"
+        ws = self.bot.ws
+        if ws is None or not getattr(ws, "open", False):
+            return "connecting"
+        return "connected" if self.bot.is_ready() else "starting"
+
+    def uptime(self):
+        return time.monotonic() - self.started
+
+    def latency(self):
+        latency = self.bot.latency
+        return None if math.isinf(latency) or math.isnan(latency) else latency
+
+    # ---------- ハンドラ ----------
+    async def home(self, request):
+        return web.Response(text="Regulus-Bot is running!")
+
+    async def healthz(self, request):
+        state = self.gateway_state()
+        latency = self.latency()
+        body = {
+            "gateway": state,
+            "latency_ms": None if latency is None else round(latency * 1000, 1),
+            "guilds": len(self.bot.guilds),
+        }
+        return web.json_response(body, status=503 if state == "closed" else 200)
+
+    async def readyz(self, request):
+        return web.json_response({"ready": self.ready}, status=200 if self.ready else 503)
+
+    async def metrics(self, request):
+        latency = self.latency()
+        gauges = {
+            "bot_ready": int(self.ready),
+            "bot_gateway_connected": int(self.gateway_state() == "connected"),
+            "bot_guilds": len(self.bot.guilds),
+        }
+        if latency is not None:
+            gauges["bot_gateway_latency_seconds"] = latency
+        return web.Response(
+            text=metrics.render_prometheus(gauges),
+            headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+        )
+
+    async def stats(self, request):
+        return web.json_response({
+            "uptime_seconds": round(self.uptime(), 1),
+            "scope": {"cluster_id": cluster.CLUSTER_ID, "shard_ids": cluster.SHARD_IDS,
+                      "shard_count": cluster.SHARD_COUNT, "label": cluster.scope_label()},
+            "interactions": instrument.snapshot(),
+        })